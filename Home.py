@@ -1,14 +1,19 @@
 # app.py
 import streamlit as st
-from corefunc.db import supabase_client
-import pandas as pd
+from corefunc.feedback_cube import get_feedback_cube
+from corefunc.figure_cache import cached_figure
+from components.dashboard import live_update_watcher
+from components.trace_panel import panel_requested, trace_panel
+from corefunc.tracing import begin_trace, end_trace, span
+from corefunc.geo import counties_geojson
 import plotly.express as px
-import json
-import os
 from datetime import datetime, timedelta
 
 st.set_page_config(page_title="CivicSense AI Dashboard", layout="wide", initial_sidebar_state="collapsed")
 
+# Spans for this rerun (corefunc/tracing.py); ?trace=<CIVICSENSE_TRACE_PANEL> shows them as a waterfall at the bottom
+page_trace = begin_trace("Home", force=panel_requested())
+
 # === GLOBAL  CSS ===
 st.markdown("""
 <style>
@@ -48,68 +53,104 @@ render_header()
 st.title("📊 Live Public Participation Dashboard")
 st.markdown("Use the filters below to analyze citizen feedback on bills before Parliament.")
 
-@st.cache_data(ttl=300) # Cache for 5 minutes
-def load_data():
-    """Loads bills and feedback data from Supabase and returns them as pandas DataFrames."""
-    bills_data = supabase_client.table("bills").select("id, title").execute().data
-    feedback_data = supabase_client.table("feedback").select("bill_id, stance, county, created_at").execute().data
-
-    if not feedback_data:
-        return pd.DataFrame(), pd.DataFrame() # Return empty dataframes if no feedback
-
-    bills_df = pd.DataFrame(bills_data)
-    feedback_df = pd.DataFrame(feedback_data)
-
-    # Convert 'created_at' to datetime objects and make it timezone-unaware for easier filtering
-    feedback_df['created_at'] = pd.to_datetime(feedback_df['created_at']).dt.tz_localize(None)
-
-    # Merge to get bill titles in the feedback dataframe
-    feedback_df = feedback_df.merge(bills_df, left_on='bill_id', right_on='id', how='left')
-    feedback_df['title'].fillna('Unknown Bill', inplace=True)
-
-    return bills_df, feedback_df
-
-bills_df, feedback_df = load_data()
+# The (bill, county, stance, day) count cube is shared by all sessions and rebuilt only
+# when the data changes (corefunc/feedback_cube.py). Filters below are slices of it and
+# every metric is a sum, so widget interactions never touch a DataFrame.
+live_update_watcher()  # reruns this page when new feedback arrives (corefunc/live_feed.py)
+with span("feedback cube", kind="data"):
+    cube = get_feedback_cube()
 
-if feedback_df.empty:
+if cube.empty:
     st.info("Awaiting the first piece of public feedback. Once submitted, the dashboard will populate with live data.")
+    end_trace(page_trace)
     st.stop()
 
+# --- Figure builders: run only on a figure-cache miss (corefunc/figure_cache.py) ---
+def build_top_bills_figure(selection):
+    top_bills = selection.by_bill().nlargest(10).sort_values(ascending=True)
+    fig_bar = px.bar(top_bills, x=top_bills.values, y=top_bills.index, orientation='h',
+                     labels={'x': 'Number of Submissions', 'y': 'Bill Title'},
+                     text=top_bills.values)
+    fig_bar.update_traces(textposition='outside', marker_color='#0068C9')
+    fig_bar.update_layout(showlegend=False, margin=dict(t=20, b=0, l=0, r=0), yaxis_title=None)
+    return fig_bar
+
+def build_county_map_figure(selection):
+    """None when the selection has no county feedback or the boundaries are unavailable."""
+    county_counts = selection.by_county()
+    if county_counts.empty:
+        return None
+    county_counts = county_counts.sort_values(ascending=False).rename_axis('county').reset_index()
+
+    # Simplified boundaries keyed by the form's county names, loaded once per process;
+    # only the polygons of counties with feedback are sent to the browser
+    map_geojson = counties_geojson(county_counts['county'])
+    if map_geojson is None:
+        return None
+    # Use the county name for color to get a discrete, colorful map
+    fig_map = px.choropleth_map(county_counts, geojson=map_geojson, locations='county', featureidkey="id",
+                                color='county', # Changed from 'submissions'
+                                map_style="carto-positron", zoom=4.5, center={"lat": 0.0236, "lon": 37.9062},
+                                opacity=0.7, labels={'county':'County'})
+    fig_map.update_layout(margin={"r":0,"t":0,"l":0,"b":0})
+    return fig_map
+
+def build_sentiment_figure(selection):
+    stance_counts = selection.by_stance().sort_values(ascending=False)
+    fig_donut = px.pie(stance_counts, values=stance_counts.values, names=stance_counts.index, hole=0.4,
+                       color=stance_counts.index,
+                       color_discrete_map={'Support':'#28a745', 'Oppose':'#dc3545', 'Neutral':'#ffc107'})
+    fig_donut.update_traces(textposition='inside', textinfo='percent+label')
+    fig_donut.update_layout(showlegend=False, margin=dict(t=0, b=0, l=0, r=0), font_color='#31333F')
+    return fig_donut
+
+def build_volume_figure(selection):
+    daily_counts = selection.by_day().reset_index(name='submissions')
+    fig_area = px.area(daily_counts, x='day', y='submissions', labels={'day': 'Date', 'submissions': 'Submissions'})
+    fig_area.update_layout(margin=dict(t=20, b=0, l=0, r=0), yaxis_title=None, xaxis_title=None)
+    return fig_area
+
+def show_chart(fig):
+    # Serializing the figure for the browser is the render cost of a chart
+    with span("plotly_chart", kind="render"):
+        st.plotly_chart(fig, use_container_width=True)
+
 # --- 1. FILTERS ---
 st.subheader("Filters")
 
 # Bill Filter
-bill_list = ["All Bills (Overview)"] + bills_df['title'].unique().tolist()
+bill_list = ["All Bills (Overview)"] + list(cube.all_titles)
 selected_bill = st.selectbox("Select a Bill to Analyze", bill_list)
 
 # Date Filter
 date_option = st.selectbox("Select Date Range", ["All Time", "Last 30 Days", "Last 90 Days", "Custom Range"])
 
-filtered_df = feedback_df.copy()
-
 # Apply bill filter
+selected_bills = None
 if selected_bill != "All Bills (Overview)":
-    filtered_df = filtered_df[filtered_df['title'] == selected_bill]
+    selected_bills = cube.bills_titled(selected_bill)
 
 # Apply date filter
+start_date, end_date = None, None
 if date_option != "All Time":
-    end_date = datetime.now()
+    today = datetime.now().date()
     if date_option == "Last 30 Days":
-        start_date = end_date - timedelta(days=30)
-        filtered_df = filtered_df[(filtered_df['created_at'] >= start_date) & (filtered_df['created_at'] <= end_date)]
+        start_date, end_date = today - timedelta(days=30), today
     elif date_option == "Last 90 Days":
-        start_date = end_date - timedelta(days=90)
-        filtered_df = filtered_df[(filtered_df['created_at'] >= start_date) & (filtered_df['created_at'] <= end_date)]
+        start_date, end_date = today - timedelta(days=90), today
     elif date_option == "Custom Range":
-        date_range = st.date_input("Enter custom date range", [end_date - timedelta(days=7), end_date])
+        date_range = st.date_input("Enter custom date range", [today - timedelta(days=7), today])
         if len(date_range) == 2: # Ensure user has selected a start and end date
-            custom_start, custom_end = date_range
-            filtered_df = filtered_df[(filtered_df['created_at'].dt.date >= custom_start) & (filtered_df['created_at'].dt.date <= custom_end)]
+            start_date, end_date = date_range
+
+with span("select", kind="transform"):
+    selection = cube.select(selected_bills, start_date, end_date)
+filters = (selected_bill, start_date, end_date)
 
 st.markdown("---")
 
 # --- 2. KPIs & 3. CHARTS ---
-if filtered_df.empty:
+if selection.empty:
     st.warning("No data available for the selected filters.")
 else:
     st.subheader("Key Metrics")
@@ -117,9 +158,9 @@ else:
 
     if selected_bill == "All Bills (Overview)":
         # Calculate metrics for all bills based on the filtered dataframe
-        total_submissions = len(filtered_df)
-        bills_with_feedback = filtered_df['bill_id'].nunique()
-        counties_represented = filtered_df['county'].nunique()
+        total_submissions = selection.total()
+        bills_with_feedback = len(selection.by_bill())
+        counties_represented = len(selection.by_county())
 
         kpi_cols[0].metric("Total Submissions", f"{total_submissions:,}")
         kpi_cols[1].metric("Bills with Feedback", f"{bills_with_feedback:,}")
@@ -132,39 +173,23 @@ else:
 
         with chart_cols[0]:
             st.markdown("#### Most Discussed Bills")
-            top_bills = filtered_df['title'].value_counts().nlargest(10).sort_values(ascending=True)
-            fig_bar = px.bar(top_bills, x=top_bills.values, y=top_bills.index, orientation='h',
-                             labels={'x': 'Number of Submissions', 'y': 'Bill Title'},
-                             text=top_bills.values)
-            fig_bar.update_traces(textposition='outside', marker_color='#0068C9')
-            fig_bar.update_layout(showlegend=False, margin=dict(t=20, b=0, l=0, r=0), yaxis_title=None)
-            st.plotly_chart(fig_bar, use_container_width=True)
+            fig_bar = cached_figure("home.top_bills", filters, cube.version, lambda: build_top_bills_figure(selection))
+            show_chart(fig_bar)
 
         with chart_cols[1]:
             with st.spinner("Loading participation map..."):
                 st.markdown("#### Geographic Participation")
-                county_counts = filtered_df['county'].value_counts().reset_index()
-                county_counts.columns = ['county', 'submissions']
-                county_counts['county'] = county_counts['county'].str.title() # Convert to Title Case for GeoJSON matching
-
-                # Construct an absolute path to the geojson file
-                geojson_path = os.path.join(os.path.dirname(__file__), 'corefunc', 'kenya-counties.geojson')
-                with open(geojson_path) as f:
-                    counties_geojson = json.load(f)
-
-                # Use the county name for color to get a discrete, colorful map
-                fig_map = px.choropleth_mapbox(county_counts, geojson=counties_geojson, locations='county', featureidkey="properties.COUNTY",
-                                               color='county', # Changed from 'submissions'
-                                               mapbox_style="carto-positron", zoom=4.5, center={"lat": 0.0236, "lon": 37.9062},
-                                               opacity=0.7, labels={'county':'County'})
-                fig_map.update_layout(margin={"r":0,"t":0,"l":0,"b":0})
-                st.plotly_chart(fig_map, use_container_width=True)
+                fig_map = cached_figure("home.county_map", filters, cube.version, lambda: build_county_map_figure(selection))
+                if fig_map is None:
+                    st.info("The county map is unavailable right now.")
+                else:
+                    show_chart(fig_map)
 
     else:  # A specific bill is selected
         with st.spinner(f"Loading dashboard for '{selected_bill}'... Please wait for the page to refresh."):
             # Calculate metrics for the selected bill
-            total_submissions = len(filtered_df)
-            stance_counts = filtered_df['stance'].value_counts()
+            total_submissions = selection.total()
+            stance_counts = selection.by_stance().sort_values(ascending=False)
 
             support_count = stance_counts.get('Support', 0)
             oppose_count = stance_counts.get('Oppose', 0)
@@ -183,40 +208,26 @@ else:
 
             with chart_cols[0]:
                 st.markdown("#### Sentiment Breakdown")
-                fig_donut = px.pie(stance_counts, values=stance_counts.values, names=stance_counts.index, hole=0.4,
-                                   color=stance_counts.index,
-                                   color_discrete_map={'Support':'#28a745', 'Oppose':'#dc3545', 'Neutral':'#ffc107'})
-                fig_donut.update_traces(textposition='inside', textinfo='percent+label')
-                fig_donut.update_layout(showlegend=False, margin=dict(t=0, b=0, l=0, r=0), font_color='#31333F')
-                st.plotly_chart(fig_donut, use_container_width=True)
+                fig_donut = cached_figure("home.sentiment", filters, cube.version, lambda: build_sentiment_figure(selection))
+                show_chart(fig_donut)
 
             with chart_cols[1]:
                 st.markdown("#### Feedback Volume Over Time")
-                daily_counts = filtered_df.set_index('created_at').resample('D').size().reset_index(name='submissions')
-                fig_area = px.area(daily_counts, x='created_at', y='submissions', labels={'created_at': 'Date', 'submissions': 'Submissions'})
-                fig_area.update_layout(margin=dict(t=20, b=0, l=0, r=0), yaxis_title=None, xaxis_title=None)
-                st.plotly_chart(fig_area, use_container_width=True)
+                fig_area = cached_figure("home.volume", filters, cube.version, lambda: build_volume_figure(selection))
+                show_chart(fig_area)
 
             st.markdown("---")
             with st.spinner("Loading participation map..."):
                 st.markdown("#### Geographic Participation")
-                # Filter out rows where county is not specified
-                county_df = filtered_df.dropna(subset=['county'])
-                if not county_df.empty:
-                    county_counts = county_df['county'].value_counts().reset_index()
-                    county_counts.columns = ['county', 'submissions']
-                    county_counts['county'] = county_counts['county'].str.title() # Convert to Title Case for GeoJSON matching
-
-                    geojson_path = os.path.join(os.path.dirname(__file__), 'corefunc', 'kenya-counties.geojson')
-                    with open(geojson_path) as f:
-                        counties_geojson = json.load(f)
-
-                    # Use the county name for color to get a discrete, colorful map
-                    fig_map = px.choropleth_mapbox(county_counts, geojson=counties_geojson, locations='county', featureidkey="properties.COUNTY",
-                                                   color='county', # Changed from 'submissions'
-                                                   mapbox_style="carto-positron", zoom=4.5, center={"lat": 0.0236, "lon": 37.9062},
-                                                   opacity=0.7, labels={'county':'County'})
-                    fig_map.update_layout(margin={"r":0,"t":0,"l":0,"b":0})
-                    st.plotly_chart(fig_map, use_container_width=True)
-                else:
+                # Submissions without a county are not part of by_county()
+                if selection.by_county().empty:
                     st.info("No county-specific feedback has been submitted for this bill yet.")
+                else:
+                    fig_map = cached_figure("home.county_map", filters, cube.version, lambda: build_county_map_figure(selection))
+                    if fig_map is None:
+                        st.info("The county map is unavailable right now.")
+                    else:
+                        show_chart(fig_map)
+
+end_trace(page_trace)
+trace_panel(page_trace)
@@ -1,17 +1,85 @@
 # components/dashboard.py
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 
 import sys
 import os
+import time
 
 
 SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
 sys.path.append(os.path.dirname(SCRIPT_DIR))
 
 
-from corefunc.db import supabase_client
+from corefunc.feedback_cube import get_feedback_cube
+from corefunc.figure_cache import cached_figure
+from corefunc.live_feed import get_change_feed
+
+# Each run of the watcher waits on the change feed for up to LIVE_WAIT_SECONDS, so a change
+# that lands while it waits reruns the page at once; one that lands between runs is picked up
+# at the next run, LIVE_CHECK_INTERVAL seconds later at most
+LIVE_CHECK_INTERVAL = float(os.getenv("CIVICSENSE_LIVE_CHECK_INTERVAL", "1"))
+LIVE_WAIT_SECONDS = 0.5
+MIN_RERUN_GAP = 1.0  # seconds; a rerun straight after another waits this long, so bursts fold into one
+
+
+@st.fragment(run_every=LIVE_CHECK_INTERVAL)
+def live_update_watcher(state_key="dashboard_data_version"):
+    """
+    Reruns the page when new feedback reaches the shared dashboard data, usually within a
+    second of the change feed's notification (corefunc/live_feed.py).
+    Each run blocks on the feed's change signal instead of querying the database, so an idle
+    session costs one small fragment run per LIVE_CHECK_INTERVAL; a widget interaction can
+    wait up to LIVE_WAIT_SECONDS for that run to return. Only back-to-back reruns are held
+    back, by MIN_RERUN_GAP, so a burst of submissions becomes one rerun, not one each.
+    Call it before loading the data so no change slips in between.
+    """
+    feed = get_change_feed()
+    seen = st.session_state.setdefault(state_key, feed.version)
+    if time.monotonic() - st.session_state.get(f"{state_key}_rerun_at", 0.0) < MIN_RERUN_GAP:
+        return  # just reran; the next run picks up whatever arrived since
+    version = feed.wait_for_change(seen, LIVE_WAIT_SECONDS)
+    if version != seen:
+        st.session_state[state_key] = version
+        st.session_state[f"{state_key}_rerun_at"] = time.monotonic()
+        st.rerun(scope="app")
+
+
+# Figure builders: run only on a figure-cache miss, then shared by every session
+def _top_bills_figure(selection):
+    top_bills = selection.by_bill().sort_values(ascending=False).head(8).reset_index()
+    top_bills.columns = ['Bill', 'Submissions']
+    # Use a vibrant, multi-color scale
+    fig_bar = px.bar(top_bills, x='Submissions', y='Bill', orientation='h',
+                     color='Submissions', color_continuous_scale='Viridis',
+                     text='Submissions', height=450)
+    fig_bar.update_traces(textposition='outside')
+    fig_bar.update_layout(yaxis={'categoryorder': 'total ascending'}, showlegend=False)
+    return fig_bar
+
+def _sentiment_figure(stance_counts):
+    # Use a new, colorful and distinct palette
+    fig_pie = px.pie(values=stance_counts.values, names=stance_counts.index, hole=0.45,
+                     color_discrete_map={'Support':'#28A745',  # A clear green for support
+                                         'Oppose':'#DC3545',   # A clear red for oppose
+                                         'Neutral':'#FFC107'   # A warm yellow for neutral
+                                        })
+    fig_pie.update_traces(textposition='inside', textinfo='percent+label')
+    return fig_pie
+
+def _county_figure(county_counts):
+    county_data = county_counts.head(10).reset_index() # Use a green continuous scale
+    county_data.columns = ['County', 'Submissions']
+    fig_county = px.bar(county_data, x='Submissions', y='County', orientation='h', # Use a blue scale to match primary color
+                        color='Submissions', color_continuous_scale='Blues')
+    return fig_county
+
+def _trend_figure(selection):
+    trend = selection.by_day().reset_index()
+    trend.columns = ['Date', 'Submissions']
+    # Use the primary blue for the trend line
+    return px.area(trend, x='Date', y='Submissions', color_discrete_sequence=['#0068C9'])
+
 
 def show_dashboard(show_title: bool = True):
     """
@@ -20,50 +88,38 @@ def show_dashboard(show_title: bool = True):
     """
     if show_title:
         st.markdown("<h1 style='text-align:center;'>Live Public Participation in Kenya</h1>", unsafe_allow_html=True) # Let theme handle color
-        st.markdown("<p style='text-align:center; font-size:1.2rem;'>Real-time citizen sentiment on bills before Parliament • Updated every minute</p>", unsafe_allow_html=True) # Let theme handle color
+        st.markdown("<p style='text-align:center; font-size:1.2rem;'>Real-time citizen sentiment on bills before Parliament • Updates live as citizens submit</p>", unsafe_allow_html=True) # Let theme handle color
         st.markdown("---")
 
-    # Load data
-    @st.cache_data(ttl=60, show_spinner=False)
-    def load_data():
-        bills = supabase_client.table("bills").select("id,title").execute().data
-        feedback = supabase_client.table("feedback").select("bill_id,stance,county,created_at").execute().data
-        return bills, feedback
+    live_update_watcher()
 
-    bills, feedback = load_data()
-    if not feedback:
+    # Load data: the (bill, county, stance, day) count cube shared by all sessions
+    cube = get_feedback_cube()
+    if cube.empty:
         st.info("No public feedback yet — be the first to participate!")
         return
-
-    df = pd.DataFrame(feedback)
-    bill_map = {b["id"]: b["title"] for b in bills}
-    df["bill_title"] = df["bill_id"].map(bill_map).fillna("Unknown Bill")
+    everything = cube.select()
+    total = everything.total()
+    stance_counts = everything.by_stance().sort_values(ascending=False)
+    county_counts = everything.by_county().sort_values(ascending=False)
 
     # ==================== BIG METRICS ====================
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("Total Submissions", f"{len(df):,}")
+        st.metric("Total Submissions", f"{total:,}")
     with col2:
-        st.metric("Bills with Feedback", df['bill_id'].nunique())
+        st.metric("Bills with Feedback", len(everything.by_bill()))
     with col3:
-        support_rate = (df['stance'] == 'Support').mean() * 100
+        support_rate = stance_counts.get('Support', 0) / total * 100
         st.metric("National Support Rate", f"{support_rate:.1f}%")
     with col4:
-        counties = df['county'].dropna().nunique() if 'county' in df.columns else 0
-        st.metric("Counties Represented", counties)
+        st.metric("Counties Represented", len(county_counts))
 
     st.markdown("---")
 
     # ==================== MOST DISCUSSED BILLS ====================
     st.subheader("Most Discussed Bills Right Now")
-    top_bills = df['bill_title'].value_counts().head(8).reset_index()
-    top_bills.columns = ['Bill', 'Submissions']
-    # Use a vibrant, multi-color scale
-    fig_bar = px.bar(top_bills, x='Submissions', y='Bill', orientation='h',
-                     color='Submissions', color_continuous_scale='Viridis',
-                     text='Submissions', height=450)
-    fig_bar.update_traces(textposition='outside')
-    fig_bar.update_layout(yaxis={'categoryorder': 'total ascending'}, showlegend=False)
+    fig_bar = cached_figure("dashboard.top_bills", (), cube.version, lambda: _top_bills_figure(everything))
     st.plotly_chart(fig_bar, use_container_width=True)
 
     # ==================== SENTIMENT + COUNTY SIDE-BY-SIDE ====================
@@ -71,23 +127,13 @@ def show_dashboard(show_title: bool = True):
 
     with col_left:
         st.subheader("National Sentiment")
-        stance_counts = df['stance'].value_counts()
-        # Use a new, colorful and distinct palette
-        fig_pie = px.pie(values=stance_counts.values, names=stance_counts.index, hole=0.45,
-                         color_discrete_map={'Support':'#28A745',  # A clear green for support
-                                             'Oppose':'#DC3545',   # A clear red for oppose
-                                             'Neutral':'#FFC107'   # A warm yellow for neutral
-                                            })
-        fig_pie.update_traces(textposition='inside', textinfo='percent+label')
+        fig_pie = cached_figure("dashboard.sentiment", (), cube.version, lambda: _sentiment_figure(stance_counts))
         st.plotly_chart(fig_pie, use_container_width=True)
 
     with col_right:
         st.subheader("Participation by County")
-        if 'county' in df.columns and df['county'].notna().any():
-            county_data = df['county'].value_counts().head(10).reset_index() # Use a green continuous scale
-            county_data.columns = ['County', 'Submissions']
-            fig_county = px.bar(county_data, x='Submissions', y='County', orientation='h', # Use a blue scale to match primary color
-                                color='Submissions', color_continuous_scale='Blues')
+        if not county_counts.empty:
+            fig_county = cached_figure("dashboard.counties", (), cube.version, lambda: _county_figure(county_counts))
             st.plotly_chart(fig_county, use_container_width=True)
         else:
             st.info("County participation will appear here as people submit")
@@ -95,11 +141,7 @@ def show_dashboard(show_title: bool = True):
     # ==================== TREND OVER TIME ====================
     st.markdown("---")
     st.subheader("Daily Participation Trend")
-    df['date'] = pd.to_datetime(df['created_at']).dt.date
-    trend = df['date'].value_counts().sort_index().reset_index()
-    trend.columns = ['Date', 'Submissions']
-    # Use the primary blue for the trend line
-    fig_line = px.area(trend, x='Date', y='Submissions', color_discrete_sequence=['#0068C9'])
+    fig_line = cached_figure("dashboard.trend", (), cube.version, lambda: _trend_figure(everything))
     st.plotly_chart(fig_line, use_container_width=True)
 
     if not show_title:
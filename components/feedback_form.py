@@ -1,33 +1,67 @@
 import streamlit as st
 import sys
 import os
+import uuid
+from datetime import datetime, timezone
 
 SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
 sys.path.append(os.path.dirname(SCRIPT_DIR))
 
-from corefunc.db import supabase_client
+from corefunc.dedup import get_duplicate_registry
+from corefunc.feedback_queue import get_feedback_queue
+from corefunc.geo import KENYA_COUNTIES
+from corefunc.moderation import get_engine
 
-# --- Simple Profanity Filter ---
-# A basic list of words to check against. This is not exhaustive but covers common cases.
-# Words are in lowercase to make the check case-insensitive.
-PROFANITY_LIST = [
-    "fuck", "shit", "bitch", "cunt", "asshole", "motherfucker", "dickhead",
-    "wanker", "bastard", "pussy", "faggot", "dick", "cock",
-    # Common Kiswahili profanities (examples)
-    "kuma", "malaya", "shenzi", "mkundu", "msenge"
-]
 
 def contains_profanity(text):
     """
-    Checks if a given text contains any words from the PROFANITY_LIST.
-    The check is case-insensitive.
+    Checks a submission against the moderation lexicon (see corefunc/moderation.py).
+    The check is case-insensitive, undoes common obfuscations and only matches whole words.
     """
     if not text:
         return False
-    
-    lower_text = text.lower()
-    # Check if any word from the list is a substring in the text.
-    return any(word in lower_text for word in PROFANITY_LIST)
+    return get_engine().contains(text)
+
+
+def submit_feedback(bill_id, stance, comment, amendment, county, user_id, idempotency_key):
+    """
+    The form's submit path without the UI (also driven by tools/feedback_loadtest.py).
+    Validates, fingerprints and enqueues one submission.
+    Returns a message for the citizen if the submission was rejected, None once it is recorded.
+    """
+    comment, amendment = (comment or "").strip(), (amendment or "").strip()
+    if not comment and not amendment:
+        return "Please write something in at least one field."
+
+    # Profanity check
+    if contains_profanity(comment) or contains_profanity(amendment):
+        return "Your submission contains inappropriate language. Please revise your feedback before submitting."
+
+    # Near-duplicates (e.g. pasted campaign texts) are linked to the first copy
+    registry = get_duplicate_registry()
+    try:
+        fingerprint, duplicate_of = registry.assign(bill_id, idempotency_key, comment, amendment, stance)
+    except Exception as e:
+        print(f"Near-duplicate lookup failed, storing as distinct: {e}")
+        fingerprint, duplicate_of = None, None
+
+    # Journaled locally and flushed to the DB in batches by a background thread
+    get_feedback_queue().enqueue({
+        "idempotency_key": idempotency_key,
+        "bill_id": bill_id,
+        "user_id": user_id,
+        "stance": stance,
+        "comment": comment,
+        "suggested_amendment": amendment or None,
+        "county": county or None,
+        "simhash": fingerprint,
+        "duplicate_of": duplicate_of,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    })
+    # Only once it is journaled can later copies point at it
+    if fingerprint is not None and duplicate_of is None:
+        registry.register(bill_id, idempotency_key, fingerprint, stance, comment, amendment)
+    return None
 
 
 def show_feedback_dialog(bill):
@@ -37,6 +71,11 @@ def show_feedback_dialog(bill):
     """
     st.markdown(f"### Giving feedback on: **{bill['title']}**")
 
+    # Generated once per submission attempt, so a retried or double-clicked
+    # submit is recorded only once.
+    key_slot = f"feedback_idempotency_key_{bill['id']}"
+    idempotency_key = st.session_state.setdefault(key_slot, str(uuid.uuid4()))
+
     st.info("""
     Article 118 of the Constitution says Parliament MUST facilitate public participation.
     Your submission here is permanently recorded and will be included in the official synthesis report.
@@ -61,56 +100,7 @@ def show_feedback_dialog(bill):
         )
 
         # Standardized list of all 47 counties for perfect map matching
-        kenyan_counties = [
-                "",
-                "MOMBASA",
-                "KWALE",
-                "KILIFI",
-                "TANA RIVER",
-                "LAMU",
-                "TAITA TAVETA",
-                "GARISSA",
-                "WAJIR",
-                "MANDERA",
-                "MARSABIT",
-                "ISIOLO",
-                "MERU",
-                "THARAKA-NITHI",
-                "EMBU",
-                "KITUI",
-                "MACHAKOS",
-                "MAKUENI",
-                "NYANDARUA",
-                "NYERI",
-                "KIRINYAGA",
-                "MURANG'A",
-                "KIAMBU",
-                "TURKANA",
-                "WEST POKOT",
-                "SAMBURU",
-                "TRANS NZOIA",
-                "UASIN GISHU",
-                "ELGEYO-MARAKWET",
-                "NANDI",
-                "BARINGO",
-                "LAIKIPIA",
-                "NAKURU",
-                "NAROK",
-                "KAJIADO",
-                "KERICHO",
-                "BOMET",
-                "KAKAMEGA",
-                "VIHIGA",
-                "BUNGOMA",
-                "BUSIA",
-                "SIAYA",
-                "KISUMU",
-                "HOMA BAY",
-                "MIGORI",
-                "KISII",
-                "NYAMIRA",
-                "NAIROBI CITY"
-            ]
+        kenyan_counties = [""] + KENYA_COUNTIES
 
 
         county = st.selectbox(
@@ -121,29 +111,22 @@ def show_feedback_dialog(bill):
         submitted = st.form_submit_button("Submit My Feedback to Parliament", type="primary", use_container_width=True)
 
         if submitted:
-            if not comment.strip() and not amendment.strip():
-                st.error("Please write something in at least one field.")
+            try:
+                error = submit_feedback(
+                    bill["id"], stance, comment, amendment, county,
+                    user_id=st.session_state.get("user_id"), # Use a safe get
+                    idempotency_key=idempotency_key,
+                )
+            except Exception as e:
+                st.error(f"An error occurred: {e}")
                 return False
-            
-            # Profanity check
-            if contains_profanity(comment) or contains_profanity(amendment):
-                st.error("Your submission contains inappropriate language. Please revise your feedback before submitting.")
+
+            if error:
+                st.error(error)
                 return False
-            else:
-                data = {
-                    "bill_id": bill["id"],
-                    "user_id": st.session_state.get("user_id"), # Use a safe get
-                    "stance": stance,
-                    "comment": comment.strip(),
-                    "suggested_amendment": amendment.strip() or None,
-                    "county": county or None,
-                }
-                try:
-                    supabase_client.table("feedback").insert(data).execute()
-                    st.success("Thank you! Your voice has been recorded and will be included in the official report.")
-                    st.balloons()
-                    return True # Signal success to the calling page
-                except Exception as e:
-                    st.error(f"An error occurred: {e}")
-                    return False
+
+            st.session_state.pop(key_slot, None)  # the next submission gets a fresh key
+            st.success("Thank you! Your voice has been recorded and will be included in the official report.")
+            st.balloons()
+            return True # Signal success to the calling page
     return False
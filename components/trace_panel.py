@@ -0,0 +1,90 @@
+# components/trace_panel.py
+import hmac
+import html
+import os
+import sys
+
+import streamlit as st
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.dirname(SCRIPT_DIR))
+
+KIND_COLORS = {
+    "page": "#6C757D", "data": "#17A2B8", "db": "#0068C9", "transform": "#6F42C1", "figure": "#FD7E14",
+    "render": "#20C997", "llm": "#DC3545", "tts": "#E83E8C", "http": "#ADB5BD", "app": "#343A40",
+}
+
+
+def _panel_key():
+    key = os.getenv("CIVICSENSE_TRACE_PANEL")
+    if key:
+        return key
+    try:
+        return st.secrets.get("CIVICSENSE_TRACE_PANEL")
+    except Exception:
+        return None
+
+
+def panel_requested() -> bool:
+    """
+    The debug panel shows span names, attributes and errors, so it is for operators only:
+    it is off unless CIVICSENSE_TRACE_PANEL is set (env or secrets), and then needs
+    ?trace=<that value> in the page URL. A bare ?trace=1 on the public site shows nothing.
+    """
+    key = _panel_key()
+    given = st.query_params.get("trace")
+    return bool(key) and given is not None and hmac.compare_digest(given.encode(), str(key).encode())
+
+
+def _depths(spans):
+    depths = []
+    for s in spans:
+        depths.append(0 if s["parent"] is None else depths[s["parent"]] + 1)
+    return depths
+
+
+def time_by_kind(spans) -> dict:
+    """Milliseconds per kind, counting a span only if no enclosing span has the same kind."""
+    totals = {}
+    for i, s in enumerate(spans):
+        if s["parent"] is None or s["duration_ms"] is None:
+            continue
+        parent = s["parent"]
+        while parent is not None and spans[parent]["kind"] != s["kind"]:
+            parent = spans[parent]["parent"]
+        if parent is None:
+            totals[s["kind"]] = totals.get(s["kind"], 0.0) + s["duration_ms"]
+    return dict(sorted(totals.items(), key=lambda t: -t[1]))
+
+
+def trace_panel(trace):
+    """Waterfall of the current rerun's spans, below the page; only when panel_requested()."""
+    if trace is None or trace.duration_ms is None or not panel_requested():
+        return
+    spans = trace.spans
+    total = max(trace.duration_ms, 0.001)
+    depths = _depths(spans)
+
+    rows = []
+    for s, depth in zip(spans, depths):
+        duration = s["duration_ms"] if s["duration_ms"] is not None else total - s["start_ms"]
+        left = s["start_ms"] / total * 100
+        width = max(duration / total * 100, 0.3)
+        attrs = ", ".join(f"{k}={v}" for k, v in s["attrs"].items())
+        label = html.escape(s["name"] + (f" ({attrs})" if attrs else "") + (f" ✗ {s['error']}" if s["error"] else ""))
+        rows.append(
+            f"<div style='display:flex;align-items:center;font:12px monospace;height:18px;'>"
+            f"<div style='width:38%;padding-left:{depth * 12}px;white-space:nowrap;overflow:hidden;"
+            f"text-overflow:ellipsis;' title='{label}'>{label}</div>"
+            f"<div style='width:9%;text-align:right;padding-right:6px;'>{duration:.1f} ms</div>"
+            f"<div style='width:53%;position:relative;height:12px;background:#F1F3F5;'>"
+            f"<div style='position:absolute;left:{left:.2f}%;width:{width:.2f}%;height:12px;"
+            f"background:{KIND_COLORS.get(s['kind'], '#343A40')};'></div></div></div>"
+        )
+
+    with st.expander(f"⏱ Trace: {trace.name} — {total:.0f} ms, {len(spans)} spans", expanded=True):
+        kinds = time_by_kind(spans)
+        if kinds:
+            st.caption(" • ".join(f"{kind} {ms:.0f} ms" for kind, ms in kinds.items()))
+        st.markdown("".join(rows), unsafe_allow_html=True)
+        st.caption(f"Trace {trace.id}" + (" (exported)" if trace.export else ""))
@@ -5,6 +5,14 @@ import os
 
 
 def init_supabase() -> Client:
+    # Local PostgREST stand-in (load tests, offline development): tables and RPCs only, no auth
+    rest_url = os.getenv("SUPABASE_REST_URL")
+    if rest_url:
+        from postgrest import SyncPostgrestClient
+
+        print(f"PostgREST stand-in: {rest_url}")
+        return SyncPostgrestClient(rest_url, timeout=30)
+
     url = os.getenv("SUPABASE_URL") or st.secrets["SUPABASE_URL"]
     key = os.getenv("SUPABASE_KEY") or st.secrets["SUPABASE_KEY"]
 
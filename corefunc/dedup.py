@@ -0,0 +1,208 @@
+# core/dedup.py
+"""
+Near-duplicate detection for citizen submissions.
+
+Each submission gets a 64-bit SimHash over the words of its comment and
+suggested amendment (stopwords dropped). Lightly edited copies of a campaign
+text land within a few bits of each other, while distinct opinions are 20+
+bits apart. The per-bill index answers verbatim copies (the common campaign
+case) from a dict. It finds edited copies with one vectorized XOR/popcount
+pass over a packed uint64 array of that bill's distinct submissions, which
+takes well under a millisecond at 100k entries on NumPy 2.
+
+Near-duplicates are stored with duplicate_of pointing at the first (canonical)
+submission, so the synthesis map step summarizes each distinct opinion once
+with its count. A submission becomes a canonical only after it is journaled
+for storage, and each index regularly reads the canonicals other processes
+stored, so copies sent through different app servers are grouped too.
+"""
+import functools
+import hashlib
+import re
+import threading
+import time
+
+import numpy as np
+
+MAX_DISTANCE = 10
+MIN_TOKENS = 6  # shorter texts only group when their fingerprints are identical
+REFRESH_INTERVAL = 5  # seconds between an index's reads of submissions stored by other processes
+TRAILING_IDS = 1000  # ids re-read below an index's watermark, for rows that committed late
+
+STOPWORDS = frozenset(
+    "a an the i we you it is are was be to of in on at for and or but because that this "
+    "these those will would should with as by from my our "
+    "na ya wa za kwa la cha ni hii huu katika kuwa sana".split()
+)
+
+BIT_POSITIONS = np.arange(64, dtype=np.uint64)
+POPCOUNT_8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+        return np.bitwise_count(values)
+    return POPCOUNT_8[values.view(np.uint8)].reshape(len(values), 8).sum(axis=1)
+
+
+def _tokens(text: str) -> list:
+    return re.findall(r"\w+", (text or "").casefold())
+
+
+def _text(value) -> str:
+    """Text from a frame cell; missing values (None or NaN) become ''."""
+    return value if isinstance(value, str) else ""
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over the words of the text (unsigned)."""
+    features = [t for t in _tokens(text) if t not in STOPWORDS]
+    if not features:
+        return 0
+
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(f.encode(), digest_size=8).digest(), "little") for f in features],
+        dtype=np.uint64,
+    )
+    bits = (hashes[:, None] >> BIT_POSITIONS) & np.uint64(1)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(features)
+    return int(np.sum(np.uint64(1) << BIT_POSITIONS[votes > 0], dtype=np.uint64))
+
+
+def submission_fingerprint(comment, amendment) -> int:
+    return simhash(f"{comment or ''}\n{amendment or ''}")
+
+
+def to_signed(fingerprint: int) -> int:
+    """Postgres bigint is signed; store the same 64 bits."""
+    return fingerprint - (1 << 64) if fingerprint >= 1 << 63 else fingerprint
+
+
+def to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+class NearDuplicateIndex:
+    """SimHash index of the canonical submissions for one bill, split by stance."""
+
+    def __init__(self):
+        self.exact = {}  # (stance, fingerprint) -> canonical key
+        self.arrays = {}  # stance -> [fingerprints (growable uint64 array), keys, size]
+        self.keys = set()
+        self.size = 0
+
+    def add(self, fingerprint: int, key: str, stance, exact_only=False):
+        self.keys.add(key)
+        self.exact.setdefault((stance, fingerprint), key)
+        if exact_only:
+            self.size += 1
+            return
+        slot = self.arrays.setdefault(stance, [np.empty(64, dtype=np.uint64), [], 0])
+        fingerprints, keys, n = slot
+        if n == len(fingerprints):
+            slot[0] = fingerprints = np.concatenate([fingerprints, np.empty(n, dtype=np.uint64)])
+        fingerprints[n] = fingerprint
+        keys.append(key)
+        slot[2] = n + 1
+        self.size += 1
+
+    def find(self, fingerprint: int, stance, exact_only=False):
+        """Returns the canonical key of a near-duplicate with the same stance, if any."""
+        key = self.exact.get((stance, fingerprint))
+        if key is not None or exact_only or stance not in self.arrays:
+            return key
+        fingerprints, keys, n = self.arrays[stance]
+        if not n:
+            return None
+        distances = _popcount(fingerprints[:n] ^ np.uint64(fingerprint))
+        best = int(distances.argmin())
+        return keys[best] if distances[best] <= MAX_DISTANCE else None
+
+
+class DuplicateRegistry:
+    """
+    Process-wide map of bill_id -> NearDuplicateIndex, loaded lazily from the DB.
+    Each index catches up on canonical submissions stored by other processes at most every
+    REFRESH_INTERVAL seconds, re-reading TRAILING_IDS ids below its watermark for rows that
+    committed late.
+    """
+
+    def __init__(self, client=None):
+        self._client = client
+        self._indexes = {}  # bill_id -> [index, id watermark, last refresh]
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            from corefunc.db import supabase_client
+            self._client = supabase_client
+        return self._client
+
+    def _read(self, bill_id, since=None):
+        """Canonical submissions with an id above `since`: [(id, key, fingerprint, stance, short)]."""
+        from corefunc.table_reader import TableReader
+
+        reader = TableReader(
+            lambda: (
+                self.client.table("feedback")
+                .select("id, idempotency_key, simhash, stance, comment, suggested_amendment")
+                .eq("bill_id", bill_id)
+                .is_("duplicate_of", "null")
+                .not_.is_("simhash", "null")
+            ),
+            "id",
+            since=since,
+        )
+        # Streamed a page at a time; only the fingerprints are kept
+        rows = []
+        for page in reader.frames():
+            for row in page.itertuples(index=False):
+                short = len(_tokens(f"{_text(row.comment)} {_text(row.suggested_amendment)}")) < MIN_TOKENS
+                rows.append((int(row.id), row.idempotency_key, to_unsigned(int(row.simhash)), row.stance, short))
+        return rows
+
+    def _index(self, bill_id) -> NearDuplicateIndex:
+        """The bill's index, loaded on first use and topped up from the DB when due."""
+        entry = self._indexes.get(bill_id)
+        if entry is not None and time.monotonic() - entry[2] < REFRESH_INTERVAL:
+            return entry[0]
+        since = None if entry is None else max(entry[1] - TRAILING_IDS, 0)
+        rows = self._read(bill_id, since)  # outside the lock: other bills keep flowing
+        with self._lock:
+            entry = self._indexes.setdefault(bill_id, [NearDuplicateIndex(), 0, 0.0])
+            index = entry[0]
+            for feedback_id, key, fingerprint, stance, short in rows:
+                if key not in index.keys:
+                    index.add(fingerprint, key, stance, exact_only=short)
+                entry[1] = max(entry[1], feedback_id)
+            entry[2] = time.monotonic()
+        return index
+
+    def assign(self, bill_id, key, comment, amendment, stance):
+        """
+        Fingerprints a new submission and looks it up in the bill's index.
+        Returns (signed simhash for storage, canonical key or None if it is new).
+        A new submission is only added to the index by register(), once it is stored.
+        """
+        fingerprint = submission_fingerprint(comment, amendment)
+        short = len(_tokens(f"{comment or ''} {amendment or ''}")) < MIN_TOKENS
+        index = self._index(bill_id)
+        with self._lock:
+            canonical = index.find(fingerprint, stance, exact_only=short)
+        if canonical == key:  # the same submission retried
+            canonical = None
+        return to_signed(fingerprint), canonical
+
+    def register(self, bill_id, key, simhash, stance, comment, amendment):
+        """Adds a submission that assign() found new, after it was enqueued, as a canonical for later copies."""
+        short = len(_tokens(f"{comment or ''} {amendment or ''}")) < MIN_TOKENS
+        with self._lock:
+            entry = self._indexes.get(bill_id)
+            if entry is not None and key not in entry[0].keys:
+                entry[0].add(to_unsigned(simhash), key, stance, exact_only=short)
+
+
+@functools.lru_cache(maxsize=1)
+def get_duplicate_registry() -> DuplicateRegistry:
+    return DuplicateRegistry()
@@ -0,0 +1,166 @@
+# core/feedback_cube.py
+"""
+Process-wide count cube for the dashboards.
+
+The feedback rollup is held as (bill, county, stance, day) coordinates with
+their submission counts, sorted by bill and day. It is rebuilt once per data
+version (corefunc/feedback_data.py) and shared by every session. Dashboard
+filters then become index lookups, and every KPI or chart is a sum over the
+selected rows. No session filters or copies a DataFrame per interaction.
+
+Memory follows the rollup, not bills x counties x days: the bill axis holds
+only bills with feedback, and the counts stay sparse. The all-bills view,
+the default, never touches the rows: per-bill, per-county and per-stance
+totals are kept as running sums over the day axis, so any date range is the
+difference of two rows. A bill filter sums just that bill's rows.
+
+The day axis holds only days that have feedback, in sorted order, so a date
+range is two searchsorted lookups. The county axis ends with an "unspecified"
+slot for submissions without a county.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from corefunc.feedback_data import REFRESH_INTERVAL, load_feedback_rollup
+
+BILL, COUNTY, STANCE, DAY = range(4)
+
+
+def _sum_by(index, weights, size) -> np.ndarray:
+    return np.bincount(index, weights, minlength=size).astype(np.int64)
+
+
+class FeedbackCube:
+    def __init__(self, bills_df, rollup_df, version=0):
+        self.version = version  # identifies the data this cube was built from; a cache key for derived results
+
+        # The bill axis: bills with feedback only. Feedback can reference a bill the
+        # titles list has not caught up with yet.
+        titles = pd.Series(bills_df["title"].to_numpy(dtype=object), index=bills_df["id"].to_numpy())
+        titles = titles[~titles.index.duplicated()]
+        self.bill_ids = np.sort(rollup_df["bill_id"].unique())
+        self.titles = titles.reindex(self.bill_ids).fillna("Unknown Bill").to_numpy(dtype=object)
+        # Every bill, for the bill picker; those without feedback select nothing
+        self.all_titles = pd.unique(np.concatenate([titles.to_numpy(dtype=object), self.titles]))
+
+        county = rollup_df["county"]  # already folded into the form's spelling
+        self.counties = np.array(sorted(county.dropna().unique()), dtype=object)
+        self.stances = np.array(sorted(rollup_df["stance"].unique()), dtype=object)
+        self.days = np.array(sorted(rollup_df["day"].unique()), dtype="datetime64[D]")
+
+        b = pd.Index(self.bill_ids).get_indexer(rollup_df["bill_id"])
+        c = pd.Index(self.counties).get_indexer(county)
+        c[c < 0] = len(self.counties)  # the "unspecified" slot
+        s = pd.Index(self.stances).get_indexer(rollup_df["stance"])
+        d = np.searchsorted(self.days, rollup_df["day"].to_numpy().astype("datetime64[D]"))
+        n = rollup_df["submissions"].to_numpy(dtype=np.int64)
+
+        order = np.lexsort((d, b))
+        self._b, self._c, self._s, self._d, self._n = (a[order] for a in (b, c, s, d, n))
+        self._bill_rows = np.searchsorted(self._b, np.arange(len(self.bill_ids) + 1))  # bill i: rows [i, i+1)
+
+        # Running totals over the day axis for the all-bills view: row k sums days [0, k)
+        sizes = {BILL: len(self.bill_ids), COUNTY: len(self.counties) + 1, STANCE: len(self.stances)}
+        self._running = {}
+        for axis, index in ((BILL, self._b), (COUNTY, self._c), (STANCE, self._s)):
+            size = sizes[axis]
+            grid = _sum_by((self._d + 1) * size + index, self._n, (len(self.days) + 1) * size)
+            self._running[axis] = grid.reshape(len(self.days) + 1, size).cumsum(axis=0)
+        self._per_day = _sum_by(self._d, self._n, len(self.days))
+
+    @property
+    def empty(self):
+        return not self._n.any()
+
+    def bills_titled(self, title) -> np.ndarray:
+        """Bill axis positions for a title (titles are not guaranteed unique)."""
+        return np.flatnonzero(self.titles == title)
+
+    def day_range(self, start=None, end=None) -> slice:
+        """Day axis slice for an inclusive date range; None leaves that side open."""
+        lo = 0 if start is None else np.searchsorted(self.days, np.datetime64(start, "D"), side="left")
+        hi = len(self.days) if end is None else np.searchsorted(self.days, np.datetime64(end, "D"), side="right")
+        return slice(int(lo), int(hi))
+
+    def select(self, bills=None, start=None, end=None) -> "CubeSelection":
+        """
+        The counts for the filters. Without a bill filter they come from the
+        running totals; with one, from that bill's rows.
+        """
+        days = self.day_range(start, end)
+        if bills is None:
+            totals = {axis: running[days.stop] - running[days.start] for axis, running in self._running.items()}
+            return CubeSelection(self, totals[BILL], self.titles, totals[COUNTY], totals[STANCE],
+                                 self._per_day[days], self.days[days])
+
+        bills = np.asarray(bills, dtype=np.int64)
+        rows = np.concatenate([np.arange(self._bill_rows[i], self._bill_rows[i + 1]) for i in bills] or
+                              [np.empty(0, dtype=np.int64)])
+        rows = rows[(self._d[rows] >= days.start) & (self._d[rows] < days.stop)]
+        n = self._n[rows]
+        return CubeSelection(
+            self,
+            _sum_by(self._b[rows], n, len(self.bill_ids))[bills],
+            self.titles[bills],
+            _sum_by(self._c[rows], n, len(self.counties) + 1),
+            _sum_by(self._s[rows], n, len(self.stances)),
+            _sum_by(self._d[rows] - days.start, n, days.stop - days.start),
+            self.days[days],
+        )
+
+
+class CubeSelection:
+    """The bill, county, stance and day totals of a filtered part of the cube."""
+
+    def __init__(self, cube, bill_counts, titles, county_counts, stance_counts, day_counts, days):
+        self.cube = cube
+        self.bill_counts = bill_counts
+        self.titles = titles
+        self.county_counts = county_counts  # last slot: unspecified county
+        self.stance_counts = stance_counts
+        self.day_counts = day_counts
+        self.days = days
+
+    @property
+    def empty(self):
+        return not self.stance_counts.any()
+
+    def total(self) -> int:
+        return int(self.stance_counts.sum())
+
+    # by_bill, by_county and by_stance list only the entries with submissions,
+    # like a groupby over the matching rows would.
+    def by_bill(self) -> pd.Series:
+        """Submissions per bill title."""
+        series = pd.Series(self.bill_counts, index=self.titles, name="submissions")
+        return series[series > 0].groupby(level=0).sum()
+
+    def by_county(self) -> pd.Series:
+        """Submissions per county; submissions without a county are left out."""
+        series = pd.Series(self.county_counts[:-1], index=self.cube.counties, name="submissions")
+        return series[series > 0]
+
+    def by_stance(self) -> pd.Series:
+        series = pd.Series(self.stance_counts, index=self.cube.stances, name="submissions")
+        return series[series > 0]
+
+    def by_day(self) -> pd.Series:
+        """Submissions per day, with days without feedback filled as 0."""
+        series = pd.Series(self.day_counts, index=pd.DatetimeIndex(self.days, name="day"))
+        return series.resample("D").sum() if len(series) else series
+
+
+_cube_lock = threading.Lock()
+_cube = {}
+
+
+def get_feedback_cube(max_age=REFRESH_INTERVAL) -> FeedbackCube:
+    """The shared cube for the current data version; rebuilt only when the data changes."""
+    frames = load_feedback_rollup(max_age=max_age)  # a new tuple exactly when the data version changes
+    with _cube_lock:
+        if _cube.get("frames") is not frames:
+            _cube["cube"] = FeedbackCube(*frames, version=_cube["cube"].version + 1 if _cube else 1)
+            _cube["frames"] = frames
+        return _cube["cube"]
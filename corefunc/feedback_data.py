@@ -0,0 +1,341 @@
+# core/feedback_data.py
+"""
+Shared read access to feedback for every page.
+
+The dashboards never pull raw feedback rows. They read feedback_daily_counts,
+a (bill, stance, county, day) rollup kept up to date by triggers in the database
+(supabase/migrations/20261019120000_feedback_daily_counts.sql). Every chart is
+a sum over its `submissions` column.
+
+The rollup and the bill titles are held in process-wide IncrementalTables. A
+refresh fetches only the rows past the last watermark and merges them in by
+key. Every few minutes a full reload reconciles deletes and anything the deltas
+missed. After a restart they start from the Parquet snapshots
+(corefunc/snapshots.py) when present, so the first render fetches only the
+rows changed since the snapshot. All sessions share one copy, so the refresh
+interval can be seconds without multiplying database load.
+
+Pages that need the submissions themselves (the synthesis report) read them
+per bill through load_bill_feedback, from the same kind of shared cache.
+
+Frames handed out are compact: stance, county and title are categoricals,
+bill ids are int64 and timestamps are datetime64 (int64 underneath), and the
+free text uses Arrow-backed strings. One copy serves every session, and
+group-bys work on category codes instead of Python strings.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from corefunc.geo import normalize_county
+from corefunc.table_reader import TableReader
+from corefunc.tracing import annotate, span
+
+STANCES = ["Support", "Oppose", "Neutral"]
+FEEDBACK_COLUMNS = [
+    "id", "idempotency_key", "bill_id", "stance", "comment", "suggested_amendment",
+    "county", "created_at", "duplicate_of",
+]
+ROLLUP_COLUMNS = ["bill_id", "stance", "county", "day", "submissions", "updated_at"]
+ROLLUP_KEY = ["bill_id", "stance", "county", "day"]
+
+REFRESH_INTERVAL = 5  # seconds; at most one delta query per table per interval per process
+RECONCILE_INTERVAL = 600  # seconds between full reloads
+MAX_CACHED_BILLS = 32  # per-bill feedback tables kept in memory
+TRAILING_IDS = 1000  # ids below a bill's watermark re-checked on each delta, for rows that committed late
+TEXT_DTYPE = "string[pyarrow]"
+
+
+def _client(client):
+    if client is None:
+        from corefunc.db import supabase_client
+        client = supabase_client
+    return client
+
+
+class IncrementalTable:
+    """
+    A cached copy of (part of) a table, kept current with watermark deltas.
+
+    watermark - a column that only grows for new or changed rows (an identity id,
+                or an updated_at set by the database)
+    key       - columns identifying a row; a delta row replaces the cached row with the same key
+    overlap   - for timestamp watermarks, how far back each delta re-reads, so rows
+                committed late with an older timestamp are still picked up
+    trailing_ids - for id watermarks, how many ids below the watermark each delta
+                re-checks. Ids are assigned at insert, not at commit, so a row can
+                commit after a higher id was read; its id is found in this window
+                and the row fetched
+    snapshot  - name of a Parquet snapshot (corefunc/snapshots.py) to start from on a
+                cold start, so the first refresh is a delta instead of a full pull
+    where     - {column: value} equality filters, to cache a slice of the table
+    """
+
+    def __init__(self, table, columns, key, watermark, overlap=None, prepare=None, snapshot=None, where=None,
+                 trailing_ids=None, client=None):
+        self.table = table
+        self.columns = columns
+        self.key = key
+        self.watermark = watermark
+        self.overlap = overlap
+        self.prepare = prepare  # applied to every fetched chunk before it is merged
+        self.snapshot = snapshot
+        self.where = where or {}
+        self.trailing_ids = trailing_ids
+        self._client = client
+
+        self.frame = pd.DataFrame(columns=columns)
+        self.version = 0  # bumped whenever the cached rows change
+        self._watermark_value = None
+        self._last_refresh = 0.0
+        self._last_reconcile = 0.0
+        self._seeded = False
+        self._lock = threading.Lock()
+
+    def _query(self, columns=None):
+        query = _client(self._client).table(self.table).select(", ".join(columns or self.columns))
+        for column, value in self.where.items():
+            query = query.eq(column, value)
+        return query
+
+    def _fetch(self, since=None) -> pd.DataFrame:
+        """
+        All rows past `since` (or all rows), streamed past the PostgREST row cap.
+        Id watermarks page by keyset; timestamp watermarks can tie, so they page by offset.
+        """
+        with span(f"select {self.table}", kind="db", delta=since is not None):
+            reader = TableReader(self._query, self.watermark, self.columns, keyset=self.overlap is None, since=since,
+                                 tiebreak=[column for column in self.key if column != self.watermark])
+            chunk = reader.read()
+            annotate(rows=len(chunk))
+        return self.prepare(chunk) if self.prepare and not chunk.empty else chunk
+
+    def _late_rows(self) -> pd.DataFrame:
+        """Rows in the trailing id window below the watermark that are not cached: they committed late."""
+        top = int(self._watermark_value)
+        with span(f"select {self.table} ids", kind="db", trailing=self.trailing_ids):
+            ids = TableReader(lambda: self._query([self.watermark]).lte(self.watermark, top), self.watermark,
+                              [self.watermark], since=max(top - self.trailing_ids, 0)).read()
+        missing = sorted(set(ids[self.watermark].astype("int64")) - set(self.frame[self.watermark].astype("int64")))
+        if not missing:
+            return pd.DataFrame(columns=self.columns)
+        print(f"{self.table}: picking up {len(missing)} rows that committed late")
+        chunk = pd.DataFrame(self._query().in_(self.watermark, missing).execute().data, columns=self.columns)
+        return self.prepare(chunk) if self.prepare and not chunk.empty else chunk
+
+    def _since(self):
+        if self._watermark_value is None or self.overlap is None:
+            return self._watermark_value
+        return (self._watermark_value - self.overlap).isoformat()
+
+    def _advance(self, chunk):
+        if not chunk.empty:
+            if self.overlap is None:
+                latest = chunk[self.watermark].max()
+            else:
+                latest = pd.to_datetime(chunk[self.watermark], utc=True).max()
+            if self._watermark_value is None or latest > self._watermark_value:
+                self._watermark_value = latest
+
+    def _seed(self) -> bool:
+        """Starts from the snapshot, if there is one. Deltas then cover everything since it was written."""
+        from corefunc.snapshots import read_snapshot
+
+        frame = read_snapshot(self.snapshot, self.columns)
+        if frame is None or frame.empty:
+            return False
+        self.frame = self.prepare(frame) if self.prepare else frame
+        self._advance(self.frame)
+        print(f"{self.table}: seeded {len(frame)} rows from snapshot")
+        return True
+
+    def refresh(self, max_age=REFRESH_INTERVAL) -> bool:
+        """
+        Brings the cache up to date if it is older than max_age seconds.
+        Returns True if the cached rows changed.
+        """
+        now = time.monotonic()
+        if now - self._last_refresh < max_age:
+            return False
+        with self._lock:
+            if now - self._last_refresh < max_age:  # another session refreshed meanwhile
+                return False
+
+            seeded = False
+            if self.snapshot and not self._seeded:
+                self._seeded = True
+                try:
+                    seeded = self._seed()
+                except Exception as e:
+                    print(f"{self.table}: snapshot not used: {e}")
+                if seeded:
+                    self._last_reconcile = now
+
+            if self._watermark_value is None or now - self._last_reconcile >= RECONCILE_INTERVAL:
+                # A row updated while the pages were read can appear twice; keep its last copy
+                chunk = self._fetch().drop_duplicates(subset=self.key, keep="last").reset_index(drop=True)
+                self._watermark_value = None
+                self._advance(chunk)
+                changed = not chunk.equals(self.frame)
+                self.frame = chunk
+                self._last_reconcile = now
+            else:
+                chunk = self._fetch(self._since())
+                if self.trailing_ids and self._watermark_value is not None:
+                    late = self._late_rows()
+                    if not late.empty:
+                        chunk = pd.concat([late, chunk], ignore_index=True)
+                self._advance(chunk)
+                changed = seeded or not chunk.empty
+                if not chunk.empty:
+                    merged = pd.concat([self.frame, chunk], ignore_index=True)
+                    self.frame = merged.drop_duplicates(subset=self.key, keep="last").reset_index(drop=True)
+
+            self._last_refresh = time.monotonic()
+            if changed:
+                self.version += 1
+            return changed
+
+
+def _prepare_bills(chunk):
+    chunk["published_at"] = pd.to_datetime(chunk["published_at"], utc=True, format="ISO8601")
+    return chunk
+
+
+def _prepare_rollup(chunk):
+    chunk["day"] = pd.to_datetime(chunk["day"])
+    chunk["county"] = chunk["county"].replace("", None)
+    return chunk
+
+
+# Process-wide caches shared by every session
+rollup_table = IncrementalTable(
+    "feedback_daily_counts", ROLLUP_COLUMNS, key=ROLLUP_KEY, watermark="updated_at",
+    overlap=pd.Timedelta(seconds=30), prepare=_prepare_rollup, snapshot="feedback_daily_counts",
+)
+bills_table = IncrementalTable(
+    "bills", ["id", "title", "published_at"], key=["id"], watermark="id", prepare=_prepare_bills, snapshot="bills",
+)
+
+_result_lock = threading.Lock()
+_result = {}
+
+
+def data_version():
+    """Changes whenever the dashboard data does; use it as a cache key."""
+    return rollup_table.version, bills_table.version
+
+
+def load_feedback_rollup(client=None, max_age=REFRESH_INTERVAL):
+    """
+    Returns (bills_df, rollup_df):
+        bills_df  - id, title of every bill
+        rollup_df - bill_id, title, stance, county (None if not given), day (datetime64), submissions
+    rollup_df is empty when no feedback has been submitted yet.
+
+    With no client, returns the shared process-wide frames (refreshed at most every
+    max_age seconds). Callers must treat them as read-only. Passing a client does an
+    uncached full read, for tools and tests.
+    """
+    if client is not None:
+        bills = IncrementalTable("bills", ["id", "title"], key=["id"], watermark="id", client=client)
+        rollup = IncrementalTable(
+            "feedback_daily_counts", ROLLUP_COLUMNS, key=ROLLUP_KEY, watermark="updated_at",
+            prepare=_prepare_rollup, client=client,
+        )
+        bills.refresh(max_age=0)
+        rollup.refresh(max_age=0)
+        return _finish(bills.frame, rollup.frame)
+
+    bills_table.refresh(max_age)
+    rollup_table.refresh(max_age)
+    version = data_version()
+    with _result_lock:
+        if _result.get("version") != version:
+            _result["frames"] = _finish(bills_table.frame, rollup_table.frame)
+            _result["version"] = version
+        return _result["frames"]
+
+
+def categorical(values, known=()) -> pd.Series:
+    """A categorical with the known values first, then any others seen, in sorted order."""
+    values = pd.Series(values)
+    extra = sorted(set(values.dropna().unique()) - set(known))
+    return values.astype(pd.CategoricalDtype([*known, *extra]))
+
+
+def _counties(values) -> pd.Series:
+    """Counties folded into the form's spelling; unknown spellings are kept as they are."""
+    values = pd.Series(values)
+    spellings = values.dropna().unique()
+    return categorical(values.map({name: normalize_county(name) or name for name in spellings}))
+
+
+def _finish(bills_df, rollup_df):
+    bills_df = bills_df[["id", "title"]].astype({"id": "int64"})
+    rollup_df = rollup_df[rollup_df["submissions"] > 0].drop(columns="updated_at").reset_index(drop=True)
+    titles = rollup_df["bill_id"].map(bills_df.set_index("id")["title"]).fillna("Unknown Bill")
+    rollup_df = rollup_df.assign(
+        bill_id=rollup_df["bill_id"].astype("int64"),
+        stance=categorical(rollup_df["stance"], STANCES),
+        county=_counties(rollup_df["county"]),
+        submissions=rollup_df["submissions"].astype("int64"),
+        title=categorical(titles),
+    )
+    return bills_df, rollup_df
+
+
+# --- Submissions, per bill ---
+_bill_tables_lock = threading.Lock()
+_bill_tables = OrderedDict()  # bill_id -> [IncrementalTable, (version, frame)]
+
+
+def compact_feedback(df) -> pd.DataFrame:
+    """Feedback rows with categorical stance/county, int64 ids, datetime64 timestamps and Arrow strings."""
+    df = df.reindex(columns=FEEDBACK_COLUMNS)
+    return df.assign(
+        id=df["id"].astype("int64"),
+        bill_id=df["bill_id"].astype("int64"),
+        stance=categorical(df["stance"], STANCES),
+        county=_counties(df["county"]),
+        created_at=pd.to_datetime(df["created_at"], utc=True, format="ISO8601"),
+        comment=df["comment"].astype(TEXT_DTYPE),
+        suggested_amendment=df["suggested_amendment"].astype(TEXT_DTYPE),
+        idempotency_key=df["idempotency_key"].astype(TEXT_DTYPE),
+        duplicate_of=df["duplicate_of"].astype(TEXT_DTYPE),
+    ).sort_values("id", ignore_index=True)
+
+
+def load_bill_feedback(bill_id, max_age=REFRESH_INTERVAL) -> pd.DataFrame:
+    """
+    All submissions for one bill as a compact frame (see compact_feedback), in submission order.
+    Shared by every session and refreshed by id watermark (re-checking the last TRAILING_IDS ids
+    for rows that committed late); callers must treat it as read-only.
+    """
+    with _bill_tables_lock:
+        entry = _bill_tables.get(bill_id)
+        if entry is None:
+            table = IncrementalTable("feedback", FEEDBACK_COLUMNS, key=["id"], watermark="id", where={"bill_id": bill_id},
+                                     trailing_ids=TRAILING_IDS)
+            entry = _bill_tables[bill_id] = [table, (None, None)]
+        _bill_tables.move_to_end(bill_id)
+        while len(_bill_tables) > MAX_CACHED_BILLS:
+            _bill_tables.popitem(last=False)
+
+    table = entry[0]
+    table.refresh(max_age)
+    version, frame = entry[1]
+    if version != table.version:
+        frame = compact_feedback(table.frame)
+        entry[1] = (table.version, frame)
+    return frame
+
+
+def load_bills_with_feedback(max_age=REFRESH_INTERVAL) -> pd.DataFrame:
+    """id, title of the bills that have feedback, newest first; read from the shared rollup, not from feedback."""
+    _, rollup_df = load_feedback_rollup(max_age=max_age)
+    bills = bills_table.frame
+    with_feedback = bills[bills["id"].isin(rollup_df["bill_id"].unique())]
+    return with_feedback.sort_values("published_at", ascending=False)[["id", "title"]].reset_index(drop=True)
@@ -0,0 +1,238 @@
+# core/feedback_queue.py
+"""
+Write-behind queue for citizen feedback.
+
+Submissions are journaled to a local SQLite file and acknowledged
+immediately. A background thread then flushes them to the `feedback`
+table in bulk batches with retries. Each row carries a client-generated
+idempotency_key, which is the primary key locally and a unique column in
+the database, so a row is never stored twice: re-sent batches are upserted
+with ignore_duplicates. A row leaves the journal only after the database
+has accepted it, so a crash or outage loses nothing.
+"""
+import atexit
+import contextlib
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from tenacity import retry, stop_after_attempt, wait_exponential
+
+QUEUE_PATH = os.getenv("CIVICSENSE_QUEUE_PATH", ".civicsense/feedback_queue.sqlite3")
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 1.0  # seconds between flushes when idle
+LEASE_SECONDS = 60  # a claimed batch is released again if its flusher dies
+MAX_BATCH_ATTEMPTS = 5  # after this, rows are sent one by one to isolate bad ones
+MAX_ROW_ATTEMPTS = 20  # after this, a row is parked in dead_feedback for manual replay
+
+
+class FeedbackQueue:
+    def __init__(self, path=QUEUE_PATH, client=None, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, on_flush=None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._client = client
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush  # called after the database accepted rows
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS pending_feedback (
+                    idempotency_key TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    enqueued_at REAL NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    leased_until REAL NOT NULL DEFAULT 0
+                )"""
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS dead_feedback (
+                    idempotency_key TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    error TEXT,
+                    failed_at REAL NOT NULL
+                )"""
+            )
+
+    @property
+    def client(self):
+        if self._client is None:
+            from corefunc.db import supabase_client
+            self._client = supabase_client
+        return self._client
+
+    def _connect(self):
+        return contextlib.closing(sqlite3.connect(self.path, timeout=30, isolation_level=None))
+
+    # --- Producer side ---
+    def enqueue(self, row: dict) -> str:
+        """
+        Journals one feedback row and returns its idempotency key.
+        Enqueuing the same key twice is a no-op.
+        """
+        key = row["idempotency_key"]
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO pending_feedback (idempotency_key, payload, enqueued_at) VALUES (?, ?, ?)",
+                (key, json.dumps(row), time.time()),
+            )
+        self._wake.set()
+        return key
+
+    def pending_count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM pending_feedback").fetchone()[0]
+
+    # --- Flusher side ---
+    def _lease_batch(self):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT idempotency_key, payload, attempts FROM pending_feedback "
+                "WHERE leased_until < ? ORDER BY enqueued_at LIMIT ?",
+                (now, self.batch_size),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE pending_feedback SET leased_until = ? WHERE idempotency_key = ?",
+                [(now + LEASE_SECONDS, key) for key, _, _ in rows],
+            )
+            conn.execute("COMMIT")
+        return rows
+
+    def _post(self, payloads):
+        self.client.table("feedback").upsert(
+            payloads, on_conflict="idempotency_key", ignore_duplicates=True
+        ).execute()
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=0.5, max=8), reraise=True)
+    def _send(self, payloads):
+        self._post(payloads)
+
+    def _ack(self, keys):
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM pending_feedback WHERE idempotency_key = ?", [(k,) for k in keys])
+
+    def _release(self, keys, error=None, park=False):
+        """
+        Hands leased rows back for the next flush. With park=True, rows that
+        have failed on their own MAX_ROW_ATTEMPTS times move to dead_feedback.
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "UPDATE pending_feedback SET attempts = attempts + 1, leased_until = 0 WHERE idempotency_key = ?",
+                [(k,) for k in keys],
+            )
+            if park:
+                for key in keys:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO dead_feedback (idempotency_key, payload, error, failed_at) "
+                        "SELECT idempotency_key, payload, ?, ? FROM pending_feedback "
+                        "WHERE idempotency_key = ? AND attempts >= ?",
+                        (str(error), time.time(), key, MAX_ROW_ATTEMPTS),
+                    )
+                    conn.execute(
+                        "DELETE FROM pending_feedback WHERE idempotency_key = ? AND attempts >= ?",
+                        (key, MAX_ROW_ATTEMPTS),
+                    )
+            conn.execute("COMMIT")
+
+    def flush_once(self) -> int:
+        """Sends one leased batch; returns the number of rows the database accepted."""
+        rows = self._lease_batch()
+        if not rows:
+            return 0
+
+        keys = [key for key, _, _ in rows]
+        payloads = [json.loads(payload) for _, payload, _ in rows]
+        try:
+            self._send(payloads)
+            self._ack(keys)
+            self._flushed()
+            return len(keys)
+        except Exception as e:
+            print(f"Feedback flush failed ({len(rows)} rows, will retry): {e}")
+            if len(rows) == 1 or max(attempts for _, _, attempts in rows) < MAX_BATCH_ATTEMPTS:
+                self._release(keys)
+                return 0
+
+        # The batch keeps failing: send rows one at a time so one bad row can't hold up the rest
+        accepted, failed, error = 0, [], None
+        for key, payload in zip(keys, payloads):
+            try:
+                self._post([payload])
+                self._ack([key])
+                accepted += 1
+            except Exception as e:
+                failed.append(key)
+                error = e
+                if not accepted and len(failed) >= 3:
+                    # Nothing is getting through: the database is down, not the rows
+                    self._release(keys)
+                    return 0
+        if failed:
+            print(f"{len(failed)} feedback rows rejected individually, will retry: {error}")
+            self._release(failed, error, park=True)
+        if accepted:
+            self._flushed()
+        return accepted
+
+    def _flushed(self):
+        if self.on_flush is not None:
+            try:
+                self.on_flush()
+            except Exception as e:
+                print(f"Feedback flush callback failed: {e}")
+
+    def flush(self, timeout: float = 10.0):
+        """Flushes until the queue is empty, the DB stops accepting rows, or the timeout passes."""
+        deadline = time.time() + timeout
+        while time.time() < deadline and self.flush_once():
+            pass
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                sent = self.flush_once()
+            except Exception as e:
+                print(f"Feedback flusher error: {e}")
+                sent = 0
+            if not sent:
+                # Idle (or backing off after a failure): wait for new rows or the next tick
+                self._wake.wait(self.flush_interval)
+                self._wake.clear()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="feedback-flusher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, flush_timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=flush_timeout)
+        self.flush(timeout=flush_timeout)
+
+
+@functools.lru_cache(maxsize=1)
+def get_feedback_queue() -> FeedbackQueue:
+    """
+    The process-wide queue; its flusher starts on first use and drains on exit.
+    Accepted batches wake the live dashboard feed.
+    """
+    from corefunc.live_feed import get_change_feed
+
+    queue = FeedbackQueue(on_flush=lambda: get_change_feed().local_write()).start()
+    atexit.register(queue.stop)
+    return queue
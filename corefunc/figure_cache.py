@@ -0,0 +1,62 @@
+# core/figure_cache.py
+"""
+Process-wide LRU cache of dashboard figures.
+
+A figure is keyed by (chart id, filter values, data version). As long as
+neither the data nor the filters change, every session gets the same figure
+object back instead of re-running the aggregation and plotly express build.
+Cached figures are shared: callers must not modify them.
+"""
+import threading
+from collections import OrderedDict
+
+from corefunc.tracing import annotate, span
+
+MAX_FIGURES = 256
+_MISSING = object()  # lookup default, so a cached None (a chart with nothing to draw) counts as a hit
+
+
+class FigureCache:
+    def __init__(self, maxsize=MAX_FIGURES):
+        self.maxsize = maxsize
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            figure = self._figures.get(key, _MISSING)
+            if figure is not _MISSING:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                annotate(cache="hit")
+                return figure
+            self.misses += 1
+        annotate(cache="miss")
+
+        # Build outside the lock; two sessions racing on a cold key both build, and the last one wins
+        figure = build()
+        with self._lock:
+            self._figures[key] = figure
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.maxsize:
+                self._figures.popitem(last=False)
+        return figure
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
+
+
+figure_cache = FigureCache()
+
+
+def cached_figure(chart_id, filters, data_version, build):
+    """
+    Returns the figure for chart_id under the given filters and data version,
+    calling build() only on a miss. filters must be hashable (a tuple of values).
+    A build() that returns None (nothing to draw) is cached like any figure.
+    """
+    with span(chart_id, kind="figure"):
+        return figure_cache.get_or_build((chart_id, filters, data_version), build)
@@ -0,0 +1,209 @@
+# core/geo.py
+"""
+County boundaries for the choropleth maps.
+
+The raw county GeoJSON is far more detailed than a zoom-4.5 map can show, and
+plotly ships the whole thing to the browser with every figure. A one-time
+preprocessing step simplifies every ring with Douglas-Peucker, rounds the
+coordinates, and keys each feature by its county name as spelled in the
+feedback form (feature "id"):
+
+    python corefunc/geo.py --tolerance 0.005
+
+The maps load the simplified file once per process and send only the features
+of the counties being drawn.
+"""
+import argparse
+import functools
+import json
+import os
+import re
+
+import numpy as np
+
+GEO_DIR = os.path.dirname(os.path.realpath(__file__))
+SOURCE_PATH = os.path.join(GEO_DIR, "kenya-counties.geojson")
+SIMPLIFIED_PATH = os.path.join(GEO_DIR, "kenya-counties.simplified.geojson")
+
+DEFAULT_TOLERANCE = 0.005  # degrees, ~500 m: invisible at the dashboards' zoom level
+DEFAULT_PRECISION = 4  # decimal places kept in coordinates (~10 m)
+NAME_PROPERTIES = ["COUNTY", "COUNTY_NAM", "county", "NAME_1", "ADM1_EN", "shapeName", "name"]
+
+# The 47 counties as the feedback form stores them
+KENYA_COUNTIES = [
+    "MOMBASA", "KWALE", "KILIFI", "TANA RIVER", "LAMU", "TAITA TAVETA",
+    "GARISSA", "WAJIR", "MANDERA", "MARSABIT", "ISIOLO", "MERU",
+    "THARAKA-NITHI", "EMBU", "KITUI", "MACHAKOS", "MAKUENI", "NYANDARUA",
+    "NYERI", "KIRINYAGA", "MURANG'A", "KIAMBU", "TURKANA", "WEST POKOT",
+    "SAMBURU", "TRANS NZOIA", "UASIN GISHU", "ELGEYO-MARAKWET", "NANDI", "BARINGO",
+    "LAIKIPIA", "NAKURU", "NAROK", "KAJIADO", "KERICHO", "BOMET",
+    "KAKAMEGA", "VIHIGA", "BUNGOMA", "BUSIA", "SIAYA", "KISUMU",
+    "HOMA BAY", "MIGORI", "KISII", "NYAMIRA", "NAIROBI CITY",
+]
+
+# Other spellings found in boundary files and older submissions, by compact key
+COUNTY_ALIASES = {
+    "NAIROBI": "NAIROBI CITY",
+    "KEIYOMARAKWET": "ELGEYO-MARAKWET",
+    "THARAKA": "THARAKA-NITHI",
+}
+
+
+def _compact(name):
+    name = re.sub(r"\b(COUNTY|CITY COUNTY)\b", "", name.upper())
+    return re.sub(r"[^A-Z]", "", name)
+
+
+_BY_COMPACT = {_compact(c): c for c in KENYA_COUNTIES}
+_BY_COMPACT.update(COUNTY_ALIASES)
+
+
+def normalize_county(name):
+    """Maps a county name in any common spelling to the form's spelling; None if unknown."""
+    if not name or not isinstance(name, str):
+        return None
+    return _BY_COMPACT.get(_compact(name))
+
+
+# --- Simplification ---
+def simplify_line(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Douglas-Peucker: the subset of points within `tolerance` of the original line."""
+    if len(points) < 3:
+        return points
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        segment = points[last] - points[first]
+        inner = points[first + 1:last] - points[first]
+        length = np.hypot(*segment)
+        if length == 0:  # closed ring: measure from the shared endpoint
+            distances = np.hypot(inner[:, 0], inner[:, 1])
+        else:
+            distances = np.abs(segment[0] * inner[:, 1] - segment[1] * inner[:, 0]) / length
+        farthest = int(distances.argmax())
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return points[keep]
+
+
+def simplify_polygon(rings, tolerance, precision):
+    """Simplifies a polygon's rings; holes that collapse are dropped, the outer ring never is."""
+    simplified = []
+    for i, ring in enumerate(rings):
+        points = np.asarray(ring, dtype=float)[:, :2]
+        reduced = simplify_line(points, tolerance)
+        if len(reduced) < 4:
+            if i:
+                continue
+            reduced = points
+        simplified.append(np.round(reduced, precision).tolist())
+    return simplified
+
+
+def simplify_geojson(geojson, tolerance=DEFAULT_TOLERANCE, precision=DEFAULT_PRECISION, name_property=None):
+    """
+    Returns a FeatureCollection of simplified county features with id set to the
+    form's county name. Features whose name can't be matched are reported and skipped.
+    """
+    features = {}
+    for feature in geojson["features"]:
+        props = feature.get("properties") or {}
+        names = [name_property] if name_property else NAME_PROPERTIES
+        raw = next((props[p] for p in names if props.get(p)), None)
+        county = normalize_county(raw)
+        if county is None:
+            print(f"Skipping boundary feature with unrecognised county name: {raw!r}")
+            continue
+
+        geometry = feature["geometry"]
+        if geometry["type"] == "Polygon":
+            polygons = [geometry["coordinates"]]
+        elif geometry["type"] == "MultiPolygon":
+            polygons = geometry["coordinates"]
+        else:
+            print(f"Skipping {county}: unsupported geometry {geometry['type']}")
+            continue
+        polygons = [simplify_polygon(p, tolerance, precision) for p in polygons]
+        if county in features:  # some sources split a county across features
+            polygons = features[county]["geometry"]["coordinates"] + polygons
+        features[county] = {
+            "type": "Feature",
+            "id": county,
+            "properties": {"COUNTY": county},
+            "geometry": {"type": "MultiPolygon", "coordinates": polygons},
+        }
+
+    missing = sorted(set(KENYA_COUNTIES) - set(features))
+    if missing:
+        print(f"No boundary found for: {', '.join(missing)}")
+    return {"type": "FeatureCollection", "features": list(features.values())}
+
+
+# --- Loading ---
+@functools.lru_cache(maxsize=1)
+def load_counties_geojson():
+    """
+    The simplified county boundaries, read once per process.
+    Falls back to simplifying the raw file in-process, and returns None if neither exists.
+    """
+    try:
+        if os.path.exists(SIMPLIFIED_PATH):
+            with open(SIMPLIFIED_PATH) as f:
+                return json.load(f)
+        if os.path.exists(SOURCE_PATH):
+            print(f"{SIMPLIFIED_PATH} not found; simplifying {SOURCE_PATH} in-process")
+            with open(SOURCE_PATH) as f:
+                return simplify_geojson(json.load(f))
+    except Exception as e:
+        print(f"Error loading county boundaries: {e}")
+        return None
+    print("County boundaries not found; maps are disabled")
+    return None
+
+
+@functools.lru_cache(maxsize=1)
+def _features_by_county():
+    geojson = load_counties_geojson()
+    return {f["id"]: f for f in geojson["features"]} if geojson else {}
+
+
+def counties_geojson(counties):
+    """
+    The FeatureCollection for just the given counties, so a figure only carries
+    the polygons it draws. Returns None when the boundaries are unavailable.
+    """
+    by_county = _features_by_county()
+    if not by_county:
+        return None
+    return {"type": "FeatureCollection", "features": [by_county[c] for c in counties if c in by_county]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write the simplified county GeoJSON used by the maps.")
+    parser.add_argument("--source", default=SOURCE_PATH)
+    parser.add_argument("--output", default=SIMPLIFIED_PATH)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="simplification tolerance in degrees")
+    parser.add_argument("--precision", type=int, default=DEFAULT_PRECISION, help="decimal places kept in coordinates")
+    parser.add_argument("--name-property", help="feature property holding the county name (default: auto-detect)")
+    args = parser.parse_args(argv)
+
+    with open(args.source) as f:
+        source = json.load(f)
+    simplified = simplify_geojson(source, args.tolerance, args.precision, args.name_property)
+    with open(args.output, "w") as f:
+        json.dump(simplified, f, separators=(",", ":"))
+
+    before, after = os.path.getsize(args.source), os.path.getsize(args.output)
+    print(f"Wrote {len(simplified['features'])} counties to {args.output}: "
+          f"{before / 1024:.0f} KB -> {after / 1024:.0f} KB ({after / before:.1%})")
+
+
+if __name__ == "__main__":
+    main()
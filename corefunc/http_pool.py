@@ -0,0 +1,188 @@
+# core/http_pool.py
+"""
+Shared, pooled HTTP transport for the app's outbound traffic.
+
+Each destination (the Parliament site, OpenRouter, Google Translate's TTS
+endpoint) gets one process-wide httpx.Client. Its connection pool is
+sized for that destination, and connections are kept alive between
+requests, so the scraper's PDF downloads, LLM calls and audio summaries
+no longer pay a TCP and TLS handshake on every request. When the `h2`
+package is installed (`pip install httpx[http2]`), the clients speak
+HTTP/2 to servers that support it.
+
+Timeouts and retries are the same everywhere: connection failures are
+retried by the transport for any request; get() also retries idempotent
+GETs on 429 and 5xx responses with backoff.
+
+Every request is recorded per destination, and as an "http" span of the
+current page trace (corefunc/tracing.py). http_metrics() reports request
+and error counts, connections and TLS handshakes opened, the open and idle
+connections in the pool, and latency percentiles.
+
+    from corefunc.http_pool import client, get, http_metrics
+    pdf = get("parliament", url).content
+"""
+import atexit
+import functools
+import importlib.util
+import os
+import threading
+import time
+from collections import deque
+
+import httpx
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+
+from corefunc.tracing import annotate, span
+
+CONNECT_TIMEOUT = 10.0
+RETRIES = int(os.getenv("CIVICSENSE_HTTP_RETRIES", "3"))  # connection attempts, and GET retries on 429/5xx
+HTTP2 = importlib.util.find_spec("h2") is not None and os.getenv("CIVICSENSE_HTTP2", "1") != "0"
+LATENCY_SAMPLES = 1000  # recent requests kept per destination for percentiles
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
+
+# destination -> (max connections, idle connections kept alive, read timeout in seconds).
+# Override the connection limit with CIVICSENSE_HTTP_<DESTINATION>_CONNECTIONS.
+DESTINATIONS = {
+    "parliament": (4, 4, 90.0),  # bills page and PDFs; be gentle with the site
+    "openrouter": (16, 8, 120.0),  # LLM calls, already paced by corefunc/llm.py's rate limiter
+    "tts": (4, 2, 30.0),  # gTTS audio summaries
+    "collector": (2, 2, 10.0),  # trace export (corefunc/tracing.py)
+}
+
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class _Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.statuses = {}
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def trace(self, event, info):
+        # httpcore's trace hook: one "...started"/"...complete" pair per step of each request
+        if event == "connection.connect_tcp.complete":
+            with self.lock:
+                self.connections_opened += 1
+        elif event == "connection.start_tls.complete":
+            with self.lock:
+                self.tls_handshakes += 1
+
+
+class _MeteredTransport(httpx.BaseTransport):
+    """Times every request and counts the connections the pool opens for it."""
+
+    def __init__(self, transport: httpx.HTTPTransport, metrics: _Metrics, destination):
+        self.transport = transport
+        self.metrics = metrics
+        self.destination = destination
+
+    def handle_request(self, request):
+        request.extensions.setdefault("trace", self.metrics.trace)
+        started = time.perf_counter()
+        try:
+            with span(f"{request.method} {request.url.host}", kind="http", destination=self.destination):
+                response = self.transport.handle_request(request)
+                annotate(status=response.status_code)
+        except Exception:
+            with self.metrics.lock:
+                self.metrics.requests += 1
+                self.metrics.errors += 1
+            raise
+        # Time to the response headers; bodies are streamed by the caller
+        with self.metrics.lock:
+            self.metrics.requests += 1
+            self.metrics.statuses[response.status_code] = self.metrics.statuses.get(response.status_code, 0) + 1
+            self.metrics.latencies.append(time.perf_counter() - started)
+        return response
+
+    def close(self):
+        self.transport.close()
+
+
+_metrics = {name: _Metrics() for name in DESTINATIONS}
+_transports = {}
+
+
+@functools.lru_cache(maxsize=None)
+def client(destination) -> httpx.Client:
+    """The process-wide client for a destination in DESTINATIONS; thread-safe, closed at exit."""
+    connections, keepalive, read_timeout = DESTINATIONS[destination]
+    connections = int(os.getenv(f"CIVICSENSE_HTTP_{destination.upper()}_CONNECTIONS", connections))
+    transport = httpx.HTTPTransport(
+        http2=HTTP2,
+        retries=RETRIES,
+        limits=httpx.Limits(max_connections=connections, max_keepalive_connections=min(keepalive, connections),
+                            keepalive_expiry=30.0),
+    )
+    _transports[destination] = transport
+    http_client = httpx.Client(
+        transport=_MeteredTransport(transport, _metrics[destination], destination),
+        timeout=httpx.Timeout(read_timeout, connect=CONNECT_TIMEOUT),
+        headers={"User-Agent": USER_AGENT},
+        follow_redirects=True,
+    )
+    atexit.register(http_client.close)
+    return http_client
+
+
+def _retryable(e) -> bool:
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code in _RETRY_STATUSES
+    return isinstance(e, httpx.TransportError)
+
+
+def get(destination, url, **kwargs) -> httpx.Response:
+    """GET through the destination's pool; retries transport errors, 429 and 5xx; raises on any other error status."""
+
+    @retry(retry=retry_if_exception(_retryable), stop=stop_after_attempt(RETRIES),
+           wait=wait_exponential(multiplier=0.5, max=8), reraise=True)
+    def fetch():
+        response = client(destination).get(url, **kwargs)
+        response.raise_for_status()
+        return response
+
+    return fetch()
+
+
+def _percentile(samples, q):
+    return samples[min(len(samples) - 1, int(q * len(samples)))] if samples else None
+
+
+def http_metrics() -> dict:
+    """Per destination: requests, errors, statuses, connections opened, pool state and latency (ms)."""
+    report = {}
+    for name, m in _metrics.items():
+        with m.lock:
+            latencies = sorted(m.latencies)
+            entry = {
+                "requests": m.requests,
+                "errors": m.errors,
+                "statuses": dict(m.statuses),
+                "connections_opened": m.connections_opened,
+                "tls_handshakes": m.tls_handshakes,
+            }
+        pool = getattr(_transports.get(name), "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        entry["open_connections"] = len(connections)
+        entry["idle_connections"] = sum(1 for c in connections if c.is_idle())
+        for label, q in (("p50_ms", 0.5), ("p95_ms", 0.95)):
+            value = _percentile(latencies, q)
+            entry[label] = round(value * 1000, 1) if value is not None else None
+        report[name] = entry
+    return report
+
+
+def format_http_metrics(metrics=None) -> str:
+    """One line per destination that has seen traffic, for CLI output."""
+    lines = []
+    for name, m in (metrics or http_metrics()).items():
+        if m["requests"]:
+            lines.append(f"{name}: {m['requests']} requests ({m['errors']} errors) over "
+                         f"{m['connections_opened']} connections, p50 {m['p50_ms']} ms, p95 {m['p95_ms']} ms")
+    return "\n".join(lines)
@@ -0,0 +1,167 @@
+# core/live_feed.py
+"""
+Change feed that pushes new feedback into the shared dashboard data.
+
+With SUPABASE_DB_URL set, a background thread LISTENs on the
+`feedback_changes` channel. The channel is notified by a trigger on the
+rollup table (supabase/migrations/20261019130000_feedback_change_notify.sql).
+Each notification refreshes the shared rollup (corefunc/feedback_data.py),
+which moves the shared data version and wakes the dashboard sessions
+waiting in wait_for_change(). They rerun only when it moves. The path from
+submission to chart is then the write-behind flush (which starts on
+enqueue), the notification, one delta query and the rerun: under a second
+while the session's watcher is waiting.
+
+Without a database URL (tests, local development, the PostgREST stand-in),
+LocalChangeFeed takes its place. It is fed by this process's write-behind
+queue and polls the rollup every few seconds for writes from elsewhere.
+"""
+import abc
+import functools
+import os
+import select
+import threading
+import time
+
+LISTEN_CHANNEL = "feedback_changes"
+DEBOUNCE_SECONDS = 0.05  # bursts of notifications within this window cause one refresh
+LOCAL_POLL_INTERVAL = 5  # seconds; LocalChangeFeed's check for writes from other processes
+
+
+class ChangeFeed(abc.ABC):
+    """Base feed: keeps the shared dashboard data current and wakes waiters when it changes."""
+
+    def __init__(self):
+        self._changed = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def version(self):
+        """The shared data version; it moves whenever the dashboard data changed, whoever refreshed it."""
+        from corefunc.feedback_data import data_version
+        return data_version()
+
+    def _refresh(self, force=True) -> bool:
+        from corefunc.feedback_data import REFRESH_INTERVAL, rollup_table
+
+        try:
+            changed = rollup_table.refresh(max_age=0 if force else REFRESH_INTERVAL)
+        except Exception as e:
+            print(f"Live feed refresh failed: {e}")
+            return False
+        if changed:
+            with self._changed:
+                self._changed.notify_all()
+        return changed
+
+    def wait_for_change(self, seen, timeout: float):
+        """
+        Blocks until version moves past `seen` or the timeout passes; returns the version.
+        Dashboard watchers (components/dashboard.py) wait here, so they wake on the refresh itself.
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != seen, timeout)
+            return self.version
+
+    def local_write(self):
+        """Called after this process wrote feedback to the database."""
+
+    @abc.abstractmethod
+    def _run(self):
+        """The feed's thread: refreshes the shared data as changes arrive, until stop()."""
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+class PostgresChangeFeed(ChangeFeed):
+    """LISTEN/NOTIFY subscriber on a direct Postgres connection."""
+
+    def __init__(self, dsn):
+        super().__init__()
+        self.dsn = dsn
+
+    def _listen(self):
+        import psycopg2
+        import psycopg2.extensions
+
+        conn = psycopg2.connect(self.dsn)
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {LISTEN_CHANNEL}")
+        return conn
+
+    def _run(self):
+        backoff = 1
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self._listen()
+                backoff = 1
+                self._refresh()  # catch up on anything missed while disconnected
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    if not conn.notifies:
+                        continue
+                    time.sleep(DEBOUNCE_SECONDS)
+                    conn.poll()
+                    conn.notifies.clear()
+                    self._refresh()
+            except Exception as e:
+                print(f"Live feed connection lost, reconnecting in {backoff}s: {e}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+
+class LocalChangeFeed(ChangeFeed):
+    """In-process stand-in: refreshes on this process's own writes and on a slow poll."""
+
+    def __init__(self, poll_interval=LOCAL_POLL_INTERVAL):
+        super().__init__()
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+
+    def local_write(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            woken = self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            self._refresh(force=woken)
+
+
+def _database_url():
+    url = os.getenv("SUPABASE_DB_URL")
+    if url:
+        return url
+    try:
+        import streamlit as st
+        return st.secrets.get("SUPABASE_DB_URL")
+    except Exception:
+        return None
+
+
+@functools.lru_cache(maxsize=1)
+def get_change_feed() -> ChangeFeed:
+    """The process-wide feed, started on first use."""
+    dsn = _database_url()
+    if dsn:
+        try:
+            import psycopg2  # noqa: F401
+            return PostgresChangeFeed(dsn).start()
+        except ImportError:
+            print("psycopg2 is not installed; falling back to the local change feed")
+    return LocalChangeFeed().start()
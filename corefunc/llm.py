@@ -1,13 +1,29 @@
 # core/llm.py
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.rate_limiters import InMemoryRateLimiter
 import streamlit as st
+import os
+
+from corefunc.http_pool import client as http_client
+from corefunc.tracing import span
+
+# One request budget for every caller in the process: all sessions, report workers and
+# the batch report CLI (llm/batch_reports.py) share this limiter through `llm`
+rate_limiter = InMemoryRateLimiter(
+    requests_per_second=float(os.getenv("OPENROUTER_REQUESTS_PER_SECOND", "5")),
+    check_every_n_seconds=0.05,
+    max_bucket_size=10,
+)
 
 llm = ChatOpenAI(
     base_url="https://openrouter.ai/api/v1",
-    api_key=st.secrets["OPENROUTER_API_KEY"],
+    api_key=os.getenv("OPENROUTER_API_KEY") or st.secrets["OPENROUTER_API_KEY"],
     model="openai/gpt-3.5-turbo",  # fastree, cheap, excellent Kiswahili
     temperature=0.3,
+    rate_limiter=rate_limiter,
+    # Pooled keep-alive connections (and HTTP/2 where available) shared by every LLM call
+    http_client=http_client("openrouter"),
 )
 
 prompt_en = ChatPromptTemplate.from_template(
@@ -46,10 +62,11 @@ def generate_summary(bill_text: str, lang: str = "English") -> str:
     ]  # Gemini Flash handles up to 1M tokens, but we keep it fast
 
     try:
-        if lang == "Kiswahili":
-            result = chain_sw.invoke({"text": text})
-        else:
-            result = chain_en.invoke({"text": text})
+        with span("generate summary", kind="llm", lang=lang):
+            if lang == "Kiswahili":
+                result = chain_sw.invoke({"text": text})
+            else:
+                result = chain_en.invoke({"text": text})
         return result.content
     except Exception as e:
         return f"Summary failed: {str(e)}"
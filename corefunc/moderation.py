@@ -0,0 +1,194 @@
+# core/moderation.py
+"""
+Profanity screening for citizen submissions.
+
+The lexicon is compiled once per process into an Aho-Corasick automaton, so
+checking a submission is a single linear pass over its normalized text no
+matter how many terms the lexicon holds.
+
+Normalization undoes the usual obfuscations before matching:
+    - case, accents and compatibility forms (NFKD + casefold)
+    - leetspeak digits/symbols (f4gg0t, $h1t, @sshole)
+    - spaced or dotted letters (f u c k, s.h.i.t)
+    - stretched letters (fuuuuck, shiiit)
+Terms only match on word boundaries, so "Scunthorpe" and "Dickens" pass.
+
+Stretched letters are matched on the collapsed text, but a match only counts
+if every letter run in the submission is at least as long as in the term: a
+stretched spelling of the term, never a shorter word. So "nigger*" catches
+"niiigger" while "Nigeria" and "the Niger Delta" pass.
+"""
+import functools
+import os
+import re
+import unicodedata
+from collections import deque
+from pathlib import Path
+
+LEXICON_DIR = Path(__file__).parent / "lexicon"
+DEFAULT_LEXICONS = [LEXICON_DIR / "profanity.txt"]
+
+# Extra lexicon files (os.pathsep-separated), e.g. the full moderation list
+# maintained outside the repo.
+LEXICON_PATHS_ENV = "CIVICSENSE_LEXICON_PATHS"
+
+LEET_MAP = str.maketrans({
+    "0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b", "9": "g",
+    "@": "a", "$": "s", "!": "i", "|": "i", "+": "t", "€": "e",
+})
+# Only substitute inside words: a leet character followed by a letter, or a
+# digit right after a letter. "sh!t" and "d1ck5" are decoded, while "kuma!"
+# and "Section 14" keep their punctuation and numbers.
+LEET_RE = re.compile(r"[01345789@$!|+€](?=[a-z])|(?<=[a-z])[01345789]")
+
+
+def _collapse_repeats(token: str):
+    """The token with runs of a repeated character collapsed, and the length of each run."""
+    out, runs = [], []
+    for ch in token:
+        if out and out[-1] == ch:
+            runs[-1] += 1
+        else:
+            out.append(ch)
+            runs.append(1)
+    return "".join(out), runs
+
+
+def normalize_runs(text: str):
+    """
+    Maps text to the canonical form the automaton runs on: lowercase letters
+    and digits, single spaces between words, and a space at each end so every
+    word is delimited on both sides. Repeated characters are collapsed; the
+    second value gives, per character of the result, how many it stood for.
+    """
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    text = LEET_RE.sub(lambda m: m.group().translate(LEET_MAP), text)
+    tokens = "".join(ch if ch.isalnum() else " " for ch in text).split()
+
+    # Re-join runs of three or more single letters: "f u c k" -> "fuck"
+    words, run = [], []
+    for token in tokens + [""]:
+        if len(token) == 1:
+            run.append(token)
+            continue
+        if len(run) >= 3:
+            words.append("".join(run))
+        else:
+            words.extend(run)
+        run = []
+        if token:
+            words.append(token)
+
+    collapsed, runs = [" "], [1]
+    for word in words:
+        chars, lengths = _collapse_repeats(word)
+        collapsed += [chars, " "]
+        runs += lengths + [1]
+    return "".join(collapsed), runs
+
+
+def normalize(text: str) -> str:
+    """The canonical, collapsed form of the text (see normalize_runs)."""
+    return normalize_runs(text)[0]
+
+
+class ModerationEngine:
+    """
+    Aho-Corasick automaton over normalized lexicon terms.
+
+    A term ending in "*" also matches as a word prefix ("fuck*" catches
+    "fucking"); every other term must be a whole word.
+    """
+
+    def __init__(self, terms):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        self.terms = []
+        self.term_runs = []  # per term, the run length of each pattern character
+
+        for raw in terms:
+            prefix = raw.endswith("*")
+            core, runs = normalize_runs(raw.rstrip("*"))
+            if not core.strip():
+                continue
+            # Boundaries are part of the pattern: a leading space anchors the
+            # term to a word start, a trailing one to a word end.
+            if prefix:
+                core, runs = core[:-1], runs[:-1]
+            self._add(core, len(self.terms))
+            self.terms.append(raw.rstrip("*"))
+            self.term_runs.append(runs)
+        self._build_failure_links()
+
+    def _add(self, pattern: str, term_index: int):
+        node = 0
+        for ch in pattern:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            node = nxt
+        self.output[node].append(term_index)
+
+    def _build_failure_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and ch not in self.goto[state]:
+                    state = self.fail[state]
+                self.fail[child] = self.goto[state].get(ch, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def _scan(self, text: str):
+        goto, fail, output, term_runs = self.goto, self.fail, self.output, self.term_runs
+        normalized, runs = normalize_runs(text)
+        node = 0
+        for end, ch in enumerate(normalized, 1):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for term in output[node]:
+                # Collapsing must not shorten the term: "Nigeria" collapses like "nigger" but has one g
+                needed = term_runs[term]
+                if all(have >= need for have, need in zip(runs[end - len(needed):end], needed)):
+                    yield term
+
+    def find(self, text: str) -> list:
+        """Returns the distinct lexicon terms found in the text."""
+        seen = dict.fromkeys(self._scan(text))
+        return [self.terms[i] for i in seen]
+
+    def contains(self, text: str) -> bool:
+        return next(self._scan(text), None) is not None
+
+
+def load_lexicon(paths) -> list:
+    """
+    Reads lexicon files: one term per line, '#' starts a comment,
+    '[section]' headers (language tags) are ignored by the matcher.
+    """
+    terms = []
+    for path in paths:
+        for line in Path(path).read_text(encoding="utf-8").splitlines():
+            line = line.split("#", 1)[0].strip()
+            if line and not line.startswith("["):
+                terms.append(line)
+    return terms
+
+
+@functools.lru_cache(maxsize=1)
+def get_engine() -> ModerationEngine:
+    """The process-wide engine, compiled on first use."""
+    paths = list(DEFAULT_LEXICONS)
+    extra = os.getenv(LEXICON_PATHS_ENV)
+    if extra:
+        paths += [p for p in extra.split(os.pathsep) if p]
+    return ModerationEngine(load_lexicon(paths))
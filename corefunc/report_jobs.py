@@ -0,0 +1,218 @@
+# core/report_jobs.py
+"""
+Background jobs for the synthesis report (llm/report.py).
+
+Jobs are journaled in a local SQLite file and run by a small pool of worker
+threads, so a report keeps going when the clerk navigates away or closes the
+tab. Each job records its current stage for progress display. A running job
+holds a lease that its worker renews; if the process dies, the job is picked
+up again after a restart.
+
+Finished PDFs are stored under REPORT_DIR, keyed by the bill, the feedback
+they were built from and the prompt versions (llm/report.py report_key).
+Requesting a report whose key already has a PDF returns it at once. A
+report whose AI summary failed is kept only for the job that built it, so
+the next request builds it again.
+Requesting one that another clerk's job is already building joins that job.
+"""
+import atexit
+import contextlib
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+JOBS_PATH = os.getenv("CIVICSENSE_REPORT_JOBS_PATH", ".civicsense/report_jobs.sqlite3")
+REPORT_DIR = os.getenv("CIVICSENSE_REPORT_DIR", ".civicsense/reports")
+WORKERS = 2
+POLL_INTERVAL = 1.0  # seconds between checks for queued jobs when idle
+LEASE_SECONDS = 120  # a running job is handed to another worker if its lease is not renewed
+MAX_ATTEMPTS = 3  # jobs that crash their worker this often are marked failed
+
+ACTIVE = ("queued", "running")
+
+
+class ReportJobs:
+    def __init__(self, path=JOBS_PATH, report_dir=REPORT_DIR, workers=WORKERS, run=None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.report_dir = Path(report_dir)
+        self.report_dir.mkdir(parents=True, exist_ok=True)
+        self.workers = workers
+        self._run_report = run  # (bill_id, title, progress) -> result dict; default llm/report.py generate_report
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS report_jobs (
+                    id TEXT PRIMARY KEY,
+                    bill_id INTEGER NOT NULL,
+                    title TEXT NOT NULL,
+                    report_key TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    leased_until REAL NOT NULL DEFAULT 0
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS report_jobs_key ON report_jobs (report_key, created_at)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return contextlib.closing(conn)
+
+    def _pdf_path(self, report_key) -> Path:
+        return self.report_dir / f"{report_key}.pdf"
+
+    # --- Clerk side ---
+    def submit(self, bill_id, title, report_key) -> dict:
+        """
+        The job for this report: a finished one if its PDF is stored, the active one if
+        another request is already building it, otherwise a newly queued job.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            existing = conn.execute(
+                "SELECT * FROM report_jobs WHERE report_key = ? AND status IN ('queued', 'running', 'done') "
+                "ORDER BY created_at DESC",
+                (report_key,),
+            ).fetchall()
+            for job in existing:
+                if job["status"] == "done" and json.loads(job["result"] or "{}").get("error"):
+                    continue  # a fallback report from a failed AI summary is not reused; build it again
+                if job["status"] in ACTIVE or self._pdf_path(report_key).exists():
+                    conn.execute("COMMIT")
+                    return dict(job)
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO report_jobs (id, bill_id, title, report_key, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                (job_id, bill_id, title, report_key, now, now),
+            )
+            conn.execute("COMMIT")
+        self._wake.set()
+        return self.get(job_id)
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM report_jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def result(self, job) -> dict:
+        """The finished job's summary, notes and error, plus the PDF bytes ("pdf": None if the file is gone)."""
+        result = json.loads(job["result"] or "{}")
+        path = self._pdf_path(job["report_key"])
+        result["pdf"] = path.read_bytes() if path.exists() else None
+        return result
+
+    # --- Worker side ---
+    def _lease(self):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            job = conn.execute(
+                "SELECT * FROM report_jobs WHERE (status = 'queued' OR (status = 'running' AND leased_until < ?)) "
+                "ORDER BY created_at LIMIT 1",
+                (now,),
+            ).fetchone()
+            if job is not None:
+                conn.execute(
+                    "UPDATE report_jobs SET status = 'running', attempts = attempts + 1, leased_until = ?, "
+                    "updated_at = ? WHERE id = ?",
+                    (now + LEASE_SECONDS, now, job["id"]),
+                )
+            conn.execute("COMMIT")
+        return dict(job) if job else None
+
+    def _update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE report_jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def _keep_leased(self, job_id, done: threading.Event):
+        while not done.wait(LEASE_SECONDS / 3):
+            self._update(job_id, leased_until=time.time() + LEASE_SECONDS)
+
+    def _store(self, report_key, pdf: bytes):
+        tmp = self._pdf_path(report_key).with_suffix(f".{uuid.uuid4().hex}.tmp")
+        tmp.write_bytes(pdf)
+        os.replace(tmp, self._pdf_path(report_key))
+
+    def run_once(self) -> bool:
+        """Runs one queued job to completion; returns False if there was none."""
+        job = self._lease()
+        if job is None:
+            return False
+        if job["attempts"] > MAX_ATTEMPTS:
+            self._update(job["id"], status="failed", error="The report job stopped unexpectedly too many times.")
+            return True
+
+        done = threading.Event()
+        threading.Thread(target=self._keep_leased, args=(job["id"], done), daemon=True).start()
+        try:
+            run = self._run_report
+            if run is None:
+                from llm.report import generate_report as run
+            result = run(job["bill_id"], job["title"], lambda stage: self._update(job["id"], stage=stage))
+
+            # Stored under the feedback actually used, which may be newer than at submission
+            from llm.report import report_key
+            key = report_key(job["bill_id"], result["watermark"])
+            if result["error"]:
+                # The fallback PDF (no AI summary) is kept for this job only, under its own key,
+                # so it never answers a later request or replaces a good stored report
+                key = f"{key}-{job['id']}"
+            self._store(key, result.pop("pdf"))
+            self._update(job["id"], status="done", report_key=key, result=json.dumps(result), leased_until=0)
+        except Exception as e:
+            print(f"Report job {job['id']} for bill {job['bill_id']} failed: {e}")
+            self._update(job["id"], status="failed", error=f"{type(e).__name__}: {e}", leased_until=0)
+        finally:
+            done.set()
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                ran = self.run_once()
+            except Exception as e:
+                print(f"Report worker error: {e}")
+                ran = False
+            if not ran:
+                self._wake.wait(POLL_INTERVAL)
+                self._wake.clear()
+
+    def start(self):
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._run, name=f"report-worker-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        """Stops taking new jobs. Jobs still running are resumed after a restart, once their lease lapses."""
+        self._stop.set()
+        self._wake.set()
+
+
+@functools.lru_cache(maxsize=1)
+def get_report_jobs() -> ReportJobs:
+    """The process-wide job queue; its workers start on first use."""
+    jobs = ReportJobs().start()
+    atexit.register(jobs.stop)
+    return jobs
@@ -0,0 +1,336 @@
+# core/report_pdf.py
+"""
+PDF renderer for the Article 118 synthesis report (pages/4_Synthesis_Report.py).
+
+The submissions annex can run to thousands of pages, so it is laid out
+directly with fpdf2 rather than through HTML. Rows are read from the feedback
+frame a batch at a time. Text is wrapped with a cached per-word width table
+and drawn with low-level text/line calls, a page at a time, so no per-row
+objects or HTML accumulate. The finished page streams still grow with the
+row count (fpdf2 keeps them until output), roughly 10-15 KB per page of the
+annex, and 50k submissions render in seconds.
+
+Drawing cells as single text objects uses fpdf2 internals (font subsets,
+text escaping, per-page font state), so requirements.txt pins fpdf2 to 2.8.x
+and tests/test_report_pdf.py renders a small report as a smoke test.
+"""
+import math
+import os
+import re
+from datetime import datetime
+
+from fpdf import FPDF
+
+FONT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "static", "fonts", "DejaVuSans.ttf")
+FONT = "DejaVu"
+
+PRIMARY = (0, 104, 201)
+MUTED = (153, 153, 153)
+TEXT = (51, 51, 51)
+SUGGESTION = (85, 85, 85)
+PIE_COLORS = {"Support": (40, 167, 69), "Oppose": (220, 53, 69), "Neutral": (255, 193, 7)}  # the dashboard's pie
+STANCE_COLORS = {"Support": (40, 167, 69), "Oppose": (220, 53, 69), "Neutral": (108, 117, 125)}
+
+TABLE_FONT_SIZE = 8
+LINE_HEIGHT = 3.6  # mm, for TABLE_FONT_SIZE
+CELL_PADDING = 1.5
+ROW_BATCH = 2000  # feedback rows converted to Python objects at a time
+CHART_COUNTIES = 10
+COLUMNS = [("#", 14), ("Stance", 20), ("County", 32)]  # the comment column takes the rest
+
+
+class ReportPDF(FPDF):
+    def __init__(self, report_date):
+        super().__init__(format="A4")
+        self.report_date = report_date
+        self.add_font(FONT, "", FONT_PATH)
+        self.set_auto_page_break(False, margin=18)  # page breaks are placed by hand; keep clear of the footer
+        self.set_margins(15, 18, 15)
+        self.alias_nb_pages("{pages}")  # reserves room for page counts up to 7 digits
+        self._word_widths = {}
+        self._glyphs = {}  # code point -> character in the embedded font subset (None: no glyph)
+        self._known = set()
+
+    def header(self):
+        self.set_font(FONT, size=8)
+        self.set_text_color(*MUTED)
+        self.set_xy(self.l_margin, 8)
+        self.cell(self.epw, 4, "Public Participation Synthesis Report · Generated by CivicSense AI", align="C")
+        self.set_xy(self.l_margin, self.t_margin)
+
+    def footer(self):
+        self.set_font(FONT, size=8)
+        self.set_text_color(*MUTED)
+        self.set_xy(self.l_margin, self.h - 12)
+        self.cell(self.epw, 4, f"Page {self.page_no()} of {{pages}} | {self.report_date}", align="C")
+
+    # --- Text wrapping ---
+    def _width(self, word):
+        width = self._word_widths.get(word)
+        if width is None:
+            width = self._word_widths[word] = self.get_string_width(word)
+        return width
+
+    def wrap(self, text, width) -> list:
+        """Greedy word wrap at the current font; words wider than a line are split."""
+        lines = []
+        space = self._width(" ")
+        for paragraph in text.split("\n"):
+            line, used = [], 0.0
+            for word in paragraph.split():
+                w = self._width(word)
+                while w > width:  # a single overlong word, e.g. a URL
+                    if line:
+                        lines.append(" ".join(line))
+                        line, used = [], 0.0
+                    cut = max(1, int(len(word) * width / w))
+                    lines.append(word[:cut])
+                    word = word[cut:]
+                    w = self.get_string_width(word)
+                if line and used + space + w > width:
+                    lines.append(" ".join(line))
+                    line, used = [], 0.0
+                used += (space if line else 0) + w
+                line.append(word)
+            lines.append(" ".join(line))
+        return lines
+
+    def _encode(self, line):
+        """Same output as the font's encode_text, via one str.translate over a cached glyph map."""
+        font = self.current_font
+        for char in set(line).difference(self._known):
+            glyph = font.subset.pick(ord(char))
+            self._glyphs[ord(char)] = chr(glyph) if glyph is not None else None
+            self._known.add(char)
+        return f"({font.escape_text(line.translate(self._glyphs))}) Tj"
+
+    def text_lines(self, x, y, lines, color=TEXT):
+        """
+        Draws lines from baseline y down, LINE_HEIGHT apart, as one PDF text object. This is
+        what keeps the annex fast: FPDF.text() would emit a separate object for every line.
+        """
+        font = self.current_font
+        if not self.current_font_is_set_on_page:
+            self._out(self._set_font_for_page(font, self.font_size_pt))
+        r, g, b = (c / 255 for c in color)
+        ops = [f"q {r:.3f} {g:.3f} {b:.3f} rg BT {x * self.k:.2f} {(self.h - y) * self.k:.2f} Td "
+               f"{LINE_HEIGHT * self.k:.2f} TL"]
+        for i, line in enumerate(lines):
+            if i:
+                ops.append("T*")
+            ops.append(self._encode(line))
+        ops.append("ET Q")
+        self._out(" ".join(ops))
+
+    def paragraph(self, text, size=10, color=TEXT, line_height=5, align="L"):
+        self.set_font(FONT, size=size)
+        self.set_text_color(*color)
+        for line in self.wrap(text, self.epw):
+            if self.get_y() + line_height > self.page_break_trigger:
+                self.add_page()
+            self.set_x(self.l_margin)
+            self.cell(self.epw, line_height, line, align=align, new_x="LMARGIN", new_y="NEXT")
+
+
+def _text(value) -> str:
+    return value.strip() if isinstance(value, str) else ""
+
+
+def _cover(pdf, title, stats):
+    pdf.add_page()
+    pdf.set_y(80)
+    pdf.paragraph(title, size=22, color=PRIMARY, line_height=10, align="C")
+    pdf.ln(4)
+    pdf.paragraph(f"Report Generated: {pdf.report_date}", size=11, color=MUTED, align="C")
+    pdf.ln(12)
+
+    top = pdf.get_y()
+    pdf.set_draw_color(*PRIMARY)
+    pdf.rect(pdf.l_margin + 30, top, pdf.epw - 60, 48, round_corners=True)
+    pdf.set_y(top + 6)
+    pdf.set_font(FONT, size=13)
+    pdf.set_text_color(*PRIMARY)
+    pdf.cell(pdf.epw, 7, "Participation at a Glance", align="C", new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font(FONT, size=11)
+    pdf.set_text_color(*TEXT)
+    total = stats["total"]
+    pdf.cell(pdf.epw, 7, f"Total Submissions: {total:,}", align="C", new_x="LMARGIN", new_y="NEXT")
+    for stance in ("Support", "Oppose", "Neutral"):
+        count = stats[stance.lower()]
+        pdf.cell(pdf.epw, 7, f"{stance}: {count:,} ({count / total * 100:.1f}%)", align="C",
+                 new_x="LMARGIN", new_y="NEXT")
+
+
+# --- Charts, drawn as vector paths: no image export, so they cost next to nothing ---
+def draw_donut(pdf, x, y, diameter, counts: dict, colors=PIE_COLORS, hole=0.4):
+    """Stance donut with percent and label inside each slice, like the dashboard's pie; (x, y) is the top left."""
+    total = sum(counts.values())
+    if not total:
+        return
+    radius = diameter / 2
+    cx, cy = x + radius, y + radius
+    angle = -90.0  # start at 12 o'clock, going clockwise
+    labels = []
+    for name, count in counts.items():
+        if not count:
+            continue
+        sweep = 360 * count / total
+        pdf.set_fill_color(*colors.get(name, MUTED))
+        if sweep >= 359.99:
+            pdf.circle(cx, cy, radius, style="F")
+        else:
+            pdf.solid_arc(x, y, diameter, angle, angle + sweep, style="F")
+        middle = math.radians(angle + sweep / 2)
+        if sweep >= 18:  # too thin a slice to hold its label
+            labels.append((cx + math.cos(middle) * radius * 0.7, cy + math.sin(middle) * radius * 0.7,
+                           name, count / total))
+        angle += sweep
+    pdf.set_fill_color(255, 255, 255)
+    pdf.circle(cx, cy, radius * hole, style="F")
+
+    pdf.set_font(FONT, size=8)
+    pdf.set_text_color(255, 255, 255)
+    for lx, ly, name, share in labels:
+        for i, line in enumerate((name, f"{share:.0%}")):
+            pdf.text(lx - pdf.get_string_width(line) / 2, ly - 0.5 + i * 3.4, line)
+
+
+def draw_bars(pdf, x, y, width, items, color=PRIMARY, bar_height=4.5, label_width=34):
+    """Horizontal bars for [(label, value)], largest first, with the value after each bar."""
+    if not items:
+        return
+    largest = max(value for _, value in items) or 1
+    pdf.set_font(FONT, size=7)
+    value_width = pdf.get_string_width(f"{largest:,}") + 2
+    bar_space = width - label_width - value_width
+    for i, (label, value) in enumerate(items):
+        top = y + i * (bar_height + 1.5)
+        pdf.set_text_color(*TEXT)
+        label = pdf.wrap(label, label_width - 2)[0]
+        pdf.text(x + label_width - 2 - pdf.get_string_width(label), top + bar_height * 0.75, label)
+        pdf.set_fill_color(*color)
+        length = max(bar_space * value / largest, 0.3)
+        pdf.rect(x + label_width, top, length, bar_height, style="F")
+        pdf.text(x + label_width + length + 1, top + bar_height * 0.75, f"{value:,}")
+
+
+def _charts(pdf, stats, feedback_df):
+    top = pdf.get_y()
+    half = pdf.epw / 2
+    pdf.set_font(FONT, size=9)
+    pdf.set_text_color(*MUTED)
+    pdf.text(pdf.l_margin, top + 3, "Sentiment")
+    pdf.text(pdf.l_margin + half + 4, top + 3, f"Submissions by county (top {CHART_COUNTIES})")
+
+    diameter = 56
+    counts = {stance: stats[stance.lower()] for stance in ("Support", "Oppose", "Neutral")}
+    draw_donut(pdf, pdf.l_margin + (half - diameter) / 2, top + 7, diameter, counts)
+
+    counties = feedback_df["county"].astype(object).where(feedback_df["county"].notna(), "N/A").value_counts()
+    items = [(str(name), int(n)) for name, n in counties.head(CHART_COUNTIES).items()]
+    draw_bars(pdf, pdf.l_margin + half + 4, top + 7, half - 4, items)
+    pdf.set_y(top + 7 + diameter + 6)
+
+
+def _summary(pdf, summary, stats, feedback_df):
+    pdf.add_page()
+    pdf.paragraph("Executive Summary & Sentiment", size=16, color=PRIMARY, line_height=9)
+    pdf.ln(3)
+    _charts(pdf, stats, feedback_df)
+    pdf.paragraph(re.sub(r"\s*•", "\n•", summary).strip(), size=10)  # every bullet on its own line
+
+
+def _table_header(pdf, widths):
+    pdf.set_font(FONT, size=TABLE_FONT_SIZE)
+    pdf.set_fill_color(*PRIMARY)
+    pdf.set_text_color(255, 255, 255)
+    x = pdf.l_margin
+    for (name, _), width in zip(COLUMNS + [("Comment & Suggestions", 0)], widths):
+        pdf.set_xy(x, pdf.get_y())
+        pdf.cell(width, LINE_HEIGHT + 2 * CELL_PADDING, name, fill=True, border=1)
+        x += width
+    pdf.set_xy(pdf.l_margin, pdf.get_y() + LINE_HEIGHT + 2 * CELL_PADDING)
+
+
+def _row_batches(df):
+    """Yields (number, stance, county, comment text) for each submission, ROW_BATCH rows at a time."""
+    number = 0
+    for start in range(0, len(df), ROW_BATCH):
+        batch = df.iloc[start:start + ROW_BATCH]
+        for stance, county, comment, amendment in zip(
+            batch["stance"].astype(object), batch["county"].astype(object),
+            batch["comment"].astype(object), batch["suggested_amendment"].astype(object),
+        ):
+            number += 1
+            text = _text(comment)
+            if _text(amendment):
+                text += f"\nSuggestion: {_text(amendment)}"
+            yield number, _text(stance), _text(county) or "N/A", text
+
+
+def _submissions(pdf, df):
+    pdf.add_page()
+    pdf.paragraph("Full Citizen Submissions", size=16, color=PRIMARY, line_height=9)
+    pdf.ln(2)
+
+    widths = [w for _, w in COLUMNS]
+    widths.append(pdf.epw - sum(widths))
+    text_width = widths[-1] - 2 * CELL_PADDING
+    bottom = pdf.page_break_trigger
+    pdf.set_draw_color(221, 221, 221)
+    _table_header(pdf, widths)
+
+    for number, stance, county, text in _row_batches(df):
+        pdf.set_font(FONT, size=TABLE_FONT_SIZE)
+        lines = pdf.wrap(text, text_width)
+        county_lines = pdf.wrap(county, widths[2] - 2 * CELL_PADDING)
+
+        # Rows taller than the rest of the page continue on the next one
+        while lines or county_lines:
+            y = pdf.get_y()
+            fit = int((bottom - y - 2 * CELL_PADDING) // LINE_HEIGHT)
+            if fit < 1 or (fit < min(len(lines), 3) and y > pdf.t_margin + 20):
+                pdf.add_page()
+                _table_header(pdf, widths)
+                continue
+            page_lines, lines = lines[:fit], lines[fit:]
+            page_county, county_lines = county_lines[:fit], county_lines[fit:]
+            height = max(len(page_lines), len(page_county), 1) * LINE_HEIGHT + 2 * CELL_PADDING
+
+            if number % 2 == 0:
+                pdf.set_fill_color(242, 242, 242)
+                pdf.rect(pdf.l_margin, y, pdf.epw, height, style="F")
+            pdf.rect(pdf.l_margin, y, pdf.epw, height)
+            x = pdf.l_margin
+            for width in widths[:-1]:
+                x += width
+                pdf.line(x, y, x, y + height)
+
+            baseline = y + CELL_PADDING + LINE_HEIGHT * 0.75
+            x = pdf.l_margin + CELL_PADDING
+            pdf.text_lines(x, baseline, [str(number)])
+            pdf.text_lines(x + widths[0], baseline, [stance], STANCE_COLORS.get(stance, TEXT))
+            pdf.text_lines(x + widths[0] + widths[1], baseline, page_county)
+            # The suggestion, if any, is the tail of the comment cell and is set in grey
+            split = next((i for i, line in enumerate(page_lines) if line.startswith("Suggestion:")), len(page_lines))
+            pdf.text_lines(x + sum(widths[:-1]), baseline, page_lines[:split])
+            if split < len(page_lines):
+                pdf.text_lines(x + sum(widths[:-1]), baseline + split * LINE_HEIGHT, page_lines[split:], SUGGESTION)
+            pdf.set_y(y + height)
+
+
+def render_report(title, stats, summary, feedback_df, report_date=None) -> bytes:
+    """
+    The report as PDF bytes: cover page, executive summary with the sentiment and county
+    charts, and the full submissions annex.
+
+    stats       - {"total", "support", "oppose", "neutral"} submission counts
+    feedback_df - the bill's feedback frame (corefunc/feedback_data.py load_bill_feedback)
+    """
+    pdf = ReportPDF(report_date or datetime.now().strftime("%d %B %Y"))
+    pdf.set_title(f"Public Participation Synthesis Report: {title}")
+    pdf.set_author("CivicSense AI")
+    _cover(pdf, title, stats)
+    _summary(pdf, summary, stats, feedback_df)
+    _submissions(pdf, feedback_df)
+    return bytes(pdf.output())
@@ -0,0 +1,256 @@
+# core/snapshots.py
+"""
+Parquet snapshots of feedback, bill metadata and the dashboard rollup.
+
+    python corefunc/snapshots.py                 # top up the snapshots with new rows
+    python corefunc/snapshots.py --full          # rewrite them from scratch
+    python corefunc/snapshots.py --every 900     # keep topping up every 15 minutes
+
+Layout under SNAPSHOT_DIR:
+    feedback/month=YYYY-MM/part-<last id>-<n>.parquet  hive-partitioned by submission month;
+                                                        each top-up adds one file per month
+    bills.parquet                                  bill metadata (no full text)
+    feedback_daily_counts.parquet                  the dashboard rollup
+    manifest.json                                  watermarks and write times
+
+On a cold start the dashboards memory-map the bills and rollup snapshots and
+then fetch only the rows changed since (corefunc/feedback_data.py). Analysts
+can query history without touching the production database, e.g. with
+open_feedback_history() or DuckDB:
+
+    select bill_id, stance, count(*) from '.civicsense/snapshots/feedback/*/*.parquet' group by all
+
+Feedback snapshots leave out user_id. Top-ups only append, so deleted
+feedback stays in the history until the next --full run.
+
+Feedback ids are assigned at insert but become visible at commit, so a row
+can commit after a higher id was already snapshotted. Each top-up therefore
+re-reads the last TRAILING_IDS ids below the watermark and appends the rows
+in that window the history doesn't have yet.
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.dirname(SCRIPT_DIR))
+
+from corefunc.table_reader import TableReader
+
+SNAPSHOT_DIR = os.getenv("CIVICSENSE_SNAPSHOT_DIR", ".civicsense/snapshots")
+TRAILING_IDS = 5000  # ids below the watermark re-read on each top-up, for rows that committed out of order
+
+FEEDBACK_COLUMNS = [
+    "id", "idempotency_key", "bill_id", "stance", "comment", "suggested_amendment",
+    "county", "created_at", "simhash", "duplicate_of",
+]
+BILL_COLUMNS = [
+    "id", "title", "status", "published_at", "bill_number", "sponsor", "bill_date",
+    "participation_start", "participation_end", "in_public_participation", "word_count", "char_count",
+]
+ROLLUP_COLUMNS = ["bill_id", "stance", "county", "day", "submissions", "updated_at"]
+
+FEEDBACK_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("idempotency_key", pa.string()),
+    ("bill_id", pa.int64()),
+    ("stance", pa.string()),
+    ("comment", pa.string()),
+    ("suggested_amendment", pa.string()),
+    ("county", pa.string()),
+    ("created_at", pa.timestamp("us", tz="UTC")),
+    ("simhash", pa.int64()),
+    ("duplicate_of", pa.string()),
+])
+
+
+def _path(*parts):
+    return os.path.join(SNAPSHOT_DIR, *parts)
+
+
+def read_manifest() -> dict:
+    try:
+        with open(_path("manifest.json")) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_manifest(manifest):
+    tmp = _path("manifest.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, default=str)
+    os.replace(tmp, _path("manifest.json"))
+
+
+def _write_table(df, name):
+    """Writes one snapshot file atomically, so readers never see a partial file."""
+    tmp = _path(f"{name}.parquet.tmp")
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp, compression="zstd")
+    os.replace(tmp, _path(f"{name}.parquet"))
+
+
+def _read(client, table, columns, order, keyset=True, since=None, **options) -> TableReader:
+    return TableReader(lambda: client.table(table).select(", ".join(columns)), order, columns, keyset=keyset,
+                       since=since, **options)
+
+
+def _timestamps(df, columns):
+    for column in columns:
+        if column in df:
+            df[column] = pd.to_datetime(df[column], utc=True, errors="coerce")
+    return df
+
+
+def _feedback_files():
+    return sorted(glob.glob(_path("feedback", "month=*", "part-*.parquet")))
+
+
+def _snapshotted_ids(above) -> set:
+    """Ids already in the feedback history that are greater than `above`."""
+    files = _feedback_files()
+    if not files:
+        return set()
+    table = ds.dataset(files, format="parquet").to_table(columns=["id"], filter=ds.field("id") > above)
+    return set(table.column("id").to_pylist())
+
+
+# --- Writing ---
+def snapshot_feedback(client, manifest, full=False) -> int:
+    """
+    Appends feedback rows missing from the snapshot; returns how many were written.
+    Rows are streamed page by page into one Parquet writer per month, so memory stays
+    bounded however much history there is.
+    """
+    root = _path("feedback")
+    watermark = None if full else manifest.get("feedback_max_id")
+    if full and os.path.exists(root):
+        shutil.rmtree(root)
+    since = None if watermark is None else max(watermark - TRAILING_IDS, 0)
+    known = set() if since is None else _snapshotted_ids(since)
+
+    writers, written, last_id = {}, 0, watermark
+    try:
+        # simhash is a signed 64-bit fingerprint and often null: read it as Int64, not float64
+        pages = _read(client, "feedback", FEEDBACK_COLUMNS, "id", since=since, dtypes={"simhash": "Int64"}).frames()
+        for page in pages:
+            if known:
+                page = page[~page["id"].isin(known)]
+                if page.empty:
+                    continue
+            page = _timestamps(page, ["created_at"])
+            months = page["created_at"].dt.strftime("%Y-%m").fillna("unknown")
+            for month, part in page.groupby(months):
+                if month not in writers:
+                    directory = os.path.join(root, f"month={month}")
+                    os.makedirs(directory, exist_ok=True)
+                    writers[month] = pq.ParquetWriter(
+                        os.path.join(directory, "part-inprogress.parquet.tmp"), FEEDBACK_SCHEMA, compression="zstd"
+                    )
+                writers[month].write_table(pa.Table.from_pandas(part, schema=FEEDBACK_SCHEMA, preserve_index=False))
+            written += len(page)
+            last_id = max(last_id or 0, int(page["id"].max()))
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    # Publish the new files only once every page has been written. A top-up that only
+    # found late rows keeps the watermark, so the name also carries the file count.
+    for month in writers:
+        directory = os.path.join(root, f"month={month}")
+        name = f"part-{last_id}-{len(os.listdir(directory))}.parquet"
+        os.replace(os.path.join(directory, "part-inprogress.parquet.tmp"), os.path.join(directory, name))
+    if written:
+        manifest["feedback_max_id"] = last_id
+    return written
+
+
+def snapshot_bills(client, manifest) -> int:
+    bills = _read(client, "bills", BILL_COLUMNS, "id").read()
+    _write_table(_timestamps(bills, ["published_at"]), "bills")
+    manifest["bills_max_id"] = int(bills["id"].max()) if not bills.empty else None
+    return len(bills)
+
+
+def snapshot_rollup(client, manifest) -> int:
+    rollup = _read(client, "feedback_daily_counts", ROLLUP_COLUMNS, "updated_at", keyset=False,
+                   tiebreak=["bill_id", "stance", "county", "day"]).read()
+    rollup = _timestamps(rollup, ["updated_at"])
+    rollup["day"] = pd.to_datetime(rollup["day"]).dt.date
+    _write_table(rollup, "feedback_daily_counts")
+    manifest["rollup_updated_at"] = rollup["updated_at"].max().isoformat() if not rollup.empty else None
+    return len(rollup)
+
+
+def write_snapshots(client=None, full=False):
+    if client is None:
+        from corefunc.db import supabase_client
+        client = supabase_client
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    manifest = read_manifest()
+    started = time.perf_counter()
+    counts = {
+        "feedback": snapshot_feedback(client, manifest, full=full),
+        "bills": snapshot_bills(client, manifest),
+        "feedback_daily_counts": snapshot_rollup(client, manifest),
+    }
+    manifest["written_at"] = datetime.now(timezone.utc).isoformat()
+    _write_manifest(manifest)
+    print(f"Snapshots written to {SNAPSHOT_DIR} in {time.perf_counter() - started:.1f}s: "
+          + ", ".join(f"{n} {name}" for name, n in counts.items()))
+    return counts
+
+
+# --- Reading ---
+def read_snapshot(name, columns=None):
+    """
+    A memory-mapped snapshot table as a DataFrame, or None if it hasn't been written.
+    name is "bills" or "feedback_daily_counts".
+    """
+    path = _path(f"{name}.parquet")
+    if not os.path.exists(path):
+        return None
+    try:
+        return pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+    except Exception as e:
+        print(f"Ignoring unreadable snapshot {path}: {e}")
+        return None
+
+
+def open_feedback_history() -> ds.Dataset:
+    """
+    The feedback history as a pyarrow dataset, for analysis. Filters on `month`
+    prune whole partitions, e.g.
+        open_feedback_history().to_table(filter=ds.field("month") >= "2026-01").to_pandas()
+    """
+    return ds.dataset(_path("feedback"), format="parquet", partitioning="hive")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write Parquet snapshots of feedback and bills.")
+    parser.add_argument("--full", action="store_true", help="rewrite the feedback history from scratch")
+    parser.add_argument("--every", type=float, help="keep running, topping up every N seconds")
+    args = parser.parse_args(argv)
+
+    write_snapshots(full=args.full)
+    while args.every:
+        time.sleep(args.every)
+        try:
+            write_snapshots()
+        except Exception as e:
+            print(f"Snapshot failed, will retry: {e}")
+
+
+if __name__ == "__main__":
+    main()
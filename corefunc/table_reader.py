@@ -0,0 +1,140 @@
+# core/table_reader.py
+"""
+Streaming reader for Supabase/PostgREST tables.
+
+PostgREST caps every response (1000 rows by default), so an unbounded
+select silently returns only the first page. TableReader walks the whole
+result page by page:
+
+    keyset - `order > last seen value`, for unique, indexed columns (ids).
+             Every page is an index range scan, however deep into the table.
+    range  - offset/limit, for order columns that can tie (timestamps). Ties
+             are broken by `tiebreak` columns (the table's key), since offset
+             pages over an order Postgres may vary can repeat or skip rows.
+
+The reader stops at the first empty page, so it doesn't depend on the
+server's max-rows setting matching PAGE_SIZE.
+
+A background thread fetches the next page while the current one is being
+processed. At most `prefetch` pages wait in memory, so memory stays bounded
+by page size, not table size. Each page is converted to columns as soon as
+it arrives; the per-row dicts from the JSON response are not kept.
+
+    reader = TableReader(lambda: client.table("feedback").select("id, stance").eq("bill_id", 7), "id")
+    for frame in reader.frames():   # bounded memory
+        ...
+    df = reader.read()              # or everything, in one DataFrame
+"""
+import queue
+import threading
+
+import pandas as pd
+
+PAGE_SIZE = 1000  # PostgREST's default max-rows
+PREFETCH_PAGES = 2
+
+_DONE = object()
+
+
+class ColumnarBuffer:
+    """Accumulates pages as per-page column frames and concatenates them once at the end."""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self._frames = []
+        self.rows = 0
+
+    def append(self, frame: pd.DataFrame):
+        if len(frame):
+            self._frames.append(frame)
+            self.rows += len(frame)
+
+    def to_frame(self) -> pd.DataFrame:
+        if not self._frames:
+            return pd.DataFrame(columns=self.columns)
+        frames, self._frames = self._frames, []
+        return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+
+class TableReader:
+    def __init__(self, query, order, columns=None, keyset=True, since=None, tiebreak=(), dtypes=None,
+                 page_size=PAGE_SIZE, prefetch=PREFETCH_PAGES):
+        """
+        query    - callable returning a fresh filtered select (PostgREST builders are single-use)
+        order    - column to page by
+        columns  - column names of the select, for the frames (default: as returned)
+        keyset   - page by `order > last value` (order must be unique) instead of offsets
+        since    - only rows with order > since
+        tiebreak - further order columns making the row order total, for range paging
+        dtypes   - {column: dtype} built straight from the JSON values, e.g. "Int64" for
+                   nullable 64-bit ints, which would otherwise go through float64
+        """
+        self.query = query
+        self.order = order
+        self.columns = columns
+        self.keyset = keyset
+        self.since = since
+        self.tiebreak = list(tiebreak)
+        self.dtypes = dtypes or {}
+        self.page_size = page_size
+        self.prefetch = prefetch
+
+    def _fetch_page(self, after, offset):
+        q = self.query()
+        if after is not None:
+            q = q.gt(self.order, after)
+        q = q.order(self.order)
+        if self.keyset:
+            return q.limit(self.page_size).execute().data
+        for column in self.tiebreak:
+            q = q.order(column)
+        return q.range(offset, offset + self.page_size - 1).execute().data
+
+    def _produce(self, pages, stop):
+        after, offset = self.since, 0
+        try:
+            while not stop.is_set():
+                rows = self._fetch_page(after, offset)
+                if not rows:
+                    break
+                frame = pd.DataFrame(rows, columns=self.columns)
+                for column, dtype in self.dtypes.items():
+                    frame[column] = pd.array([row.get(column) for row in rows], dtype=dtype)
+                if self.keyset:
+                    after = rows[-1][self.order]
+                offset += len(rows)
+                del rows
+                pages.put(frame)
+        except Exception as e:
+            pages.put(e)
+        pages.put(_DONE)
+
+    def frames(self):
+        """Yields one DataFrame per page, in order. Raises if a page fetch fails."""
+        pages = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        producer = threading.Thread(target=self._produce, args=(pages, stop), name="table-reader", daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = pages.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Consumer stopped early or failed: let the producer finish its current page and exit
+            stop.set()
+            while producer.is_alive():
+                try:
+                    pages.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+    def read(self) -> pd.DataFrame:
+        """The whole result as one DataFrame."""
+        buffer = ColumnarBuffer(self.columns)
+        for frame in self.frames():
+            buffer.append(frame)
+        return buffer.to_frame()
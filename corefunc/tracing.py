@@ -0,0 +1,216 @@
+# core/tracing.py
+"""
+Span tracing for page reruns: where a slow render spends its time.
+
+A trace covers one rerun of a page (or one run of a fragment). Inside it,
+span(name, kind) records nested, timed spans: database reads, transforms,
+figure builds, rendering, LLM and TTS calls. Every outbound HTTP request
+through corefunc/http_pool.py is recorded as an "http" span too. Nesting
+follows contextvars, so spans opened in LangChain's batch threads land under
+the span that started the batch.
+
+Tracing is off unless CIVICSENSE_TRACE=1, or a page asks for it (the debug
+panel in components/trace_panel.py). When off, span() returns at once and
+records nothing. Finished traces are written in the background, one JSON
+object per line, to CIVICSENSE_TRACE_FILE (default .civicsense/traces.jsonl),
+and also POSTed to CIVICSENSE_TRACE_COLLECTOR when that URL is set.
+
+    page_trace = begin_trace("Home")
+    with span("feedback cube", kind="data"):
+        cube = get_feedback_cube()
+    ...
+    end_trace(page_trace)
+
+trace() does the same as a context manager or decorator. Inside an active
+trace it opens a plain span instead, so a fragment traces its own reruns and
+still nests under the page on a full rerun.
+"""
+import atexit
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from pathlib import Path
+
+ENABLED = os.getenv("CIVICSENSE_TRACE", "0").lower() in ("1", "true", "yes")
+TRACE_FILE = os.getenv("CIVICSENSE_TRACE_FILE", ".civicsense/traces.jsonl")
+COLLECTOR_URL = os.getenv("CIVICSENSE_TRACE_COLLECTOR")
+
+# (trace, index of the innermost open span) for the running rerun, if it is traced
+_active = contextvars.ContextVar("civicsense_trace", default=None)
+
+
+class Trace:
+    """One traced rerun: a flat list of spans, each pointing at its parent by index."""
+
+    def __init__(self, name, export=True, **attrs):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.export = export
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self.spans = []
+        self.open(name, "page", None, attrs)
+
+    def _ms(self) -> float:
+        return (time.perf_counter() - self._t0) * 1000
+
+    def open(self, name, kind, parent, attrs) -> int:
+        s = {"name": name, "kind": kind, "parent": parent, "start_ms": self._ms(),
+             "duration_ms": None, "attrs": attrs, "error": None}
+        # Spans open from several threads (LLM batches, the table reader); append and
+        # index under one lock, or a thread could take another thread's index
+        with self._lock:
+            self.spans.append(s)
+            return len(self.spans) - 1
+
+    def close(self, index, error=None):
+        s = self.spans[index]
+        s["duration_ms"] = self._ms() - s["start_ms"]
+        if error is not None:
+            s["error"] = f"{type(error).__name__}: {error}"[:200]
+
+    @property
+    def duration_ms(self):
+        return self.spans[0]["duration_ms"]
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "spans": [{**s, "start_ms": round(s["start_ms"], 3),
+                       "duration_ms": None if s["duration_ms"] is None else round(s["duration_ms"], 3)}
+                      for s in self.spans],
+        }
+
+
+def begin_trace(name, force=False, **attrs):
+    """
+    Starts the trace for this rerun and returns it, or None if tracing is off.
+    force=True traces even when CIVICSENSE_TRACE is off (for the debug panel), without exporting.
+    """
+    stale = current_trace()
+    if stale is not None:  # the previous rerun stopped before end_trace (an exception, st.stop)
+        end_trace(stale, RuntimeError("rerun ended early (st.rerun, st.stop or an error)"))
+    if not (ENABLED or force):
+        return None
+    trace = Trace(name, export=ENABLED, **attrs)
+    _active.set((trace, 0))
+    return trace
+
+
+def end_trace(trace, error=None):
+    """Closes the trace, detaches it from this context and queues its export."""
+    if trace is None or trace.duration_ms is not None:
+        return
+    trace.close(0, error)
+    active = _active.get()
+    if active is not None and active[0] is trace:
+        _active.set(None)
+    if trace.export:
+        _exporter().put(trace.to_dict())
+
+
+def current_trace():
+    active = _active.get()
+    return active[0] if active else None
+
+
+@contextlib.contextmanager
+def span(name, kind="app", **attrs):
+    """Times the block as a child of the innermost open span; a no-op outside a trace."""
+    active = _active.get()
+    if active is None:
+        yield
+        return
+    trace, parent = active
+    index = trace.open(name, kind, parent, attrs)
+    token = _active.set((trace, index))
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _active.reset(token)
+        trace.close(index, error)
+
+
+@contextlib.contextmanager
+def trace(name, force=False, **attrs):
+    """A trace for the block, or a span of the enclosing trace if there is one. Yields the Trace, or None."""
+    if _active.get() is not None:
+        with span(name, kind="page", **attrs):
+            yield None
+        return
+    root = begin_trace(name, force=force, **attrs)
+    error = None
+    try:
+        yield root
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        end_trace(root, error)
+
+
+def annotate(**attrs):
+    """Adds attributes to the innermost open span, if any."""
+    active = _active.get()
+    if active is not None:
+        trace, index = active
+        trace.spans[index]["attrs"].update(attrs)
+
+
+# --- Export ---
+class _Exporter:
+    """Writes finished traces off the request path: JSONL file, plus the collector if configured."""
+
+    def __init__(self, path=TRACE_FILE, collector=COLLECTOR_URL):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.collector = collector
+        self._queue = queue.Queue(maxsize=1000)
+        threading.Thread(target=self._run, name="trace-exporter", daemon=True).start()
+
+    def put(self, record):
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            print("Trace export queue full; dropping a trace")
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, default=str) + "\n")
+                if self.collector:
+                    from corefunc.http_pool import client
+
+                    client("collector").post(self.collector, json=record)
+            except Exception as e:
+                print(f"Trace export failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+@functools.lru_cache(maxsize=1)
+def _exporter() -> _Exporter:
+    exporter = _Exporter()
+    atexit.register(exporter.flush)
+    return exporter
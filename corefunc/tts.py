@@ -0,0 +1,40 @@
+# core/tts.py
+"""
+Audio summaries with gTTS, sent through the shared "tts" connection pool
+(corefunc/http_pool.py) instead of a new requests.Session per text part.
+"""
+import base64
+import re
+
+from gtts import gTTS, gTTSError
+
+from corefunc.http_pool import client
+from corefunc.tracing import span
+
+_AUDIO = re.compile(r'jQ1olc","\[\\"(.*)\\"]')
+
+
+class PooledTTS(gTTS):
+    """gTTS with the same requests and response parsing, over the pooled client."""
+
+    def stream(self):
+        for prepared in self._prepare_requests():
+            headers = {k: v for k, v in prepared.headers.items() if k.lower() != "content-length"}
+            try:
+                r = client("tts").post(prepared.url, content=prepared.body, headers=headers)
+                r.raise_for_status()
+            except Exception as e:
+                raise gTTSError(tts=self) from e
+
+            for line in r.iter_lines():
+                if "jQ1olc" in line:
+                    match = _AUDIO.search(line)
+                    if not match:
+                        raise gTTSError(tts=self)
+                    yield base64.b64decode(match.group(1).encode("ascii"))
+
+
+def speech_mp3(text, lang="en") -> bytes:
+    """The MP3 for `text`, read aloud in `lang` ("en" or "sw")."""
+    with span("speech", kind="tts", lang=lang, chars=len(text)):
+        return b"".join(PooledTTS(text=text, lang=lang, slow=False).stream())
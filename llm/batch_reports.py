@@ -0,0 +1,173 @@
+# llm/batch_reports.py
+"""
+Generates synthesis reports for many bills at once, without the Streamlit app.
+
+    python llm/batch_reports.py --out reports/                  # every bill with feedback
+    python llm/batch_reports.py --out reports/ --bills 12 15    # just these bills
+    python llm/batch_reports.py --out reports/ --concurrency 6 --rps 8
+
+Each bill goes through the same pipeline as the Synthesis Report page
+(llm/report.py), several bills at a time. Every LLM call in the process goes
+through the shared rate limiter in corefunc/llm.py, so --rps is the budget
+for the whole batch, not per bill. A bill whose report in --out was built
+from the same feedback and prompts, with its AI summary, is skipped unless
+--force is given.
+
+The output directory holds one PDF per bill and a manifest.json. The
+manifest records each bill's report key, feedback watermark, participation
+figures, status, whether the report was reused, and total and per-stage
+timings, plus the batch's HTTP metrics (corefunc/http_pool.py).
+
+Needs OPENROUTER_API_KEY and SUPABASE_URL/SUPABASE_KEY in the environment
+(or .streamlit/secrets.toml).
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.dirname(SCRIPT_DIR))
+
+from llm.report import STAGES, feedback_watermark, generate_report, report_key
+
+DEFAULT_CONCURRENCY = 4
+
+
+def _filename(bill_id, title) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", title).strip("_")[:60]
+    return f"{bill_id}_{slug}.pdf"
+
+
+def _read_manifest(out_dir) -> dict:
+    try:
+        with open(os.path.join(out_dir, "manifest.json")) as f:
+            return {r["bill_id"]: r for r in json.load(f).get("reports", [])}
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_manifest(out_dir, manifest):
+    tmp = os.path.join(out_dir, "manifest.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, default=str)
+    os.replace(tmp, os.path.join(out_dir, "manifest.json"))
+
+
+def run_bill(bill_id, title, out_dir, previous=None, force=False) -> dict:
+    """Generates (or reuses) one bill's report in out_dir; returns its manifest entry."""
+    from corefunc.feedback_data import load_bill_feedback
+
+    started = time.perf_counter()
+    entry = {"bill_id": bill_id, "title": title, "file": _filename(bill_id, title)}
+    path = os.path.join(out_dir, entry["file"])
+
+    watermark = feedback_watermark(load_bill_feedback(bill_id))
+    key = report_key(bill_id, watermark)
+    # Only a complete report is reused; one built without its AI summary is generated again
+    if (not force and previous and previous.get("status") == "done" and not previous.get("ai_error")
+            and previous.get("report_key") == key and os.path.exists(path)):
+        return {**previous, "reused": True, "seconds": round(time.perf_counter() - started, 2)}
+
+    stage_started = {}
+
+    def progress(stage):
+        stage_started[stage] = time.perf_counter()
+
+    try:
+        result = generate_report(bill_id, title, progress)
+    except Exception as e:
+        return {**entry, "status": "failed", "error": f"{type(e).__name__}: {e}",
+                "seconds": round(time.perf_counter() - started, 2)}
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(result["pdf"])
+    os.replace(tmp, path)
+
+    finished = time.perf_counter()
+    order = [name for name, _ in STAGES if name in stage_started]
+    ends = [stage_started[name] for name in order[1:]] + [finished]
+    return {
+        **entry,
+        "status": "done",
+        "reused": False,
+        "report_key": report_key(bill_id, result["watermark"]),
+        "watermark": result["watermark"],
+        "stats": result["stats"],
+        "ai_error": result["error"],
+        "notes": result["notes"],
+        "seconds": round(finished - started, 2),
+        "stages": {name: round(end - stage_started[name], 2) for name, end in zip(order, ends)},
+    }
+
+
+def run_batch(bills, out_dir, concurrency=DEFAULT_CONCURRENCY, force=False) -> dict:
+    """Reports for [(bill_id, title)], `concurrency` bills at a time; writes and returns the manifest."""
+    os.makedirs(out_dir, exist_ok=True)
+    previous = _read_manifest(out_dir)
+    started = time.perf_counter()
+    manifest = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "concurrency": concurrency,
+        # Bills outside this batch keep their earlier entries, as their PDFs stay in out_dir
+        "reports": [r for bill_id, r in previous.items() if bill_id not in dict(bills)],
+    }
+    done = 0
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-report") as pool:
+        futures = {pool.submit(run_bill, bill_id, title, out_dir, previous.get(bill_id), force): bill_id
+                   for bill_id, title in bills}
+        for future in as_completed(futures):
+            entry = future.result()
+            done += 1
+            manifest["reports"].append(entry)
+            manifest["reports"].sort(key=lambda r: r["bill_id"])
+            _write_manifest(out_dir, manifest)  # progress survives an interrupted batch
+            print(f"[{done}/{len(bills)}] bill {entry['bill_id']}: {'reused' if entry.get('reused') else entry['status']} "
+                  f"in {entry['seconds']}s" + (f" ({entry['error']})" if entry.get("error") else ""))
+
+    from corefunc.http_pool import http_metrics
+
+    manifest["finished_at"] = datetime.now(timezone.utc).isoformat()
+    manifest["seconds"] = round(time.perf_counter() - started, 2)
+    manifest["http"] = http_metrics()  # requests, connections and latency per destination for the whole batch
+    _write_manifest(out_dir, manifest)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthesis reports for many bills in parallel.")
+    parser.add_argument("--out", required=True, help="directory for the PDFs and manifest.json")
+    parser.add_argument("--bills", type=int, nargs="+", help="bill ids (default: every bill with feedback)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="bills generated at once")
+    parser.add_argument("--rps", type=float, help="LLM requests per second shared by the whole batch")
+    parser.add_argument("--force", action="store_true", help="regenerate reports even if unchanged")
+    args = parser.parse_args(argv)
+
+    from corefunc.feedback_data import load_bills_with_feedback
+    from corefunc.llm import rate_limiter
+
+    if args.rps:
+        rate_limiter.requests_per_second = args.rps
+    bills = load_bills_with_feedback()
+    if args.bills:
+        bills = bills[bills["id"].isin(args.bills)]
+    if bills.empty:
+        print("No bills with feedback to report on.")
+        return 1
+
+    manifest = run_batch(list(zip(bills["id"].astype(int), bills["title"])), args.out, args.concurrency, args.force)
+    batch = set(bills["id"].astype(int))
+    failed = [r for r in manifest["reports"] if r["bill_id"] in batch and r["status"] == "failed"]
+    print(f"{len(batch) - len(failed)} reports in {args.out} after {manifest['seconds']}s"
+          + (f", {len(failed)} failed" if failed else ""))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
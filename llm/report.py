@@ -0,0 +1,137 @@
+# llm/report.py
+"""
+The synthesis report pipeline, from a bill's feedback to the finished PDF.
+
+Runs outside Streamlit (corefunc/report_jobs.py runs it on background
+workers) and reports its progress as it moves through STAGES. A report is
+identified by report_key(): the bill, the feedback it was built from
+(feedback_watermark) and the prompt versions. An unchanged key means the
+stored PDF can be served as is.
+"""
+import hashlib
+
+import pandas as pd
+
+from llm.synthesis import MAP_PROMPT_VERSION
+
+REPORT_PROMPT_VERSION = "report-v1"  # bump when COMBINE_PROMPT or REPORT_PROMPT changes
+REPORT_PROMPT = """
+You are the Clerk of the National Assembly preparing the official Article 118 public participation report for the "{title}" bill.
+You have been provided with several summaries of citizen feedback. Your task is to synthesize these into a single, formal executive report.
+
+Start with the overall participation statistics:
+- Total submissions: {total}
+- Support: {support} ({support_pct:.1f}%)
+- Oppose: {oppose} ({oppose_pct:.1f}%)
+- Neutral: {neutral} ({neutral_pct:.1f}%)
+
+Synthesized summaries of citizen feedback:
+{chunk_summaries}
+
+Based on all the information above, write a neutral, formal executive summary (250–350 words) in parliamentary language.
+After the summary, list the top 5 most common concerns or suggested amendments as clear, numbered points.
+"""
+
+# (stage, label shown to the clerk), in the order they run
+STAGES = [
+    ("feedback", "Loading feedback"),
+    ("chunks", "Grouping submissions into themes and chunks"),
+    ("map", "Summarizing feedback chunks"),
+    ("reduce", "Condensing summaries"),
+    ("summary", "Drafting the executive summary"),
+    ("pdf", "Assembling the PDF"),
+]
+STAGE_LABELS = dict(STAGES)
+
+
+def feedback_watermark(df: pd.DataFrame) -> str:
+    """
+    Identifies the feedback a report was built from. Ids only grow, so new submissions move
+    the highest id; deletions change the count.
+    """
+    if df.empty:
+        return "0-0"
+    return f"{int(df['id'].max())}-{len(df)}"
+
+
+def report_key(bill_id, watermark) -> str:
+    raw = f"{bill_id}:{watermark}:{MAP_PROMPT_VERSION}:{REPORT_PROMPT_VERSION}"
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def stance_stats(df: pd.DataFrame) -> dict:
+    stance_totals = df["stance"].value_counts()
+    return {
+        "total": len(df),
+        "support": int(stance_totals.get("Support", 0)),
+        "oppose": int(stance_totals.get("Oppose", 0)),
+        "neutral": int(stance_totals.get("Neutral", 0)),
+    }
+
+
+def summarize_feedback(bill_id, title, df, stats, progress):
+    """The executive summary: map over stable chunks, tree reduce, final report prompt. Returns (summary, notes)."""
+    from langchain_core.prompts import PromptTemplate
+    from langchain_core.runnables import RunnablePassthrough
+
+    from corefunc.llm import llm
+    from llm.synthesis import COMBINE_PROMPT, MAP_PROMPT, map_chunks, reduce_summaries, stable_chunks, synthesis_entries
+
+    # Near-duplicates are summarized once, busy bills are clustered into stable themes (llm/themes.py),
+    # and chunks are cut at stable, id-based boundaries so new feedback only changes a few of them
+    progress("chunks")
+    feedback_chunks = stable_chunks(synthesis_entries(df, bill_id))
+
+    # 1. Map step: only new or changed chunks go to the LLM
+    progress("map")
+    map_chain = {"text": RunnablePassthrough()} | PromptTemplate.from_template(MAP_PROMPT) | llm
+    chunk_summaries, mapped = map_chunks(bill_id, feedback_chunks, map_chain)
+
+    # 2. Tree reduce: condense the summaries in parallel, bounded groups until they fit one prompt
+    progress("reduce")
+    combine_chain = {"text": RunnablePassthrough()} | PromptTemplate.from_template(COMBINE_PROMPT) | llm
+    intermediate_summaries, levels = reduce_summaries(chunk_summaries, combine_chain)
+    notes = f"Summarized {mapped} new of {len(feedback_chunks)} feedback chunks" + (
+        f", condensed in {levels} reduce levels." if levels else ".")
+
+    # 3. Final reduce: the formal executive summary
+    progress("summary")
+    total = stats["total"]
+    prompt = REPORT_PROMPT.format(
+        title=title, chunk_summaries=intermediate_summaries,
+        **stats, **{f"{s}_pct": stats[s] / total * 100 for s in ("support", "oppose", "neutral")},
+    )
+    return llm.invoke(prompt).content.strip(), notes
+
+
+def generate_report(bill_id, title, progress=None) -> dict:
+    """
+    Builds the report for a bill from its current feedback.
+    progress(stage) is called as each of STAGES starts.
+    Returns {"pdf", "summary", "notes", "error", "watermark", "stats"}; error is set when the
+    AI summary failed and the report fell back to the participation figures.
+    """
+    from corefunc.feedback_data import load_bill_feedback
+    from corefunc.report_pdf import render_report
+
+    progress = progress or (lambda stage: None)
+    progress("feedback")
+    df = load_bill_feedback(bill_id)
+    if df.empty:
+        raise ValueError(f"No public feedback submitted for bill {bill_id} yet.")
+    stats = stance_stats(df)
+
+    error = None
+    try:
+        summary, notes = summarize_feedback(bill_id, title, df, stats, progress)
+    except Exception as e:
+        print(f"AI summary failed for bill {bill_id}: {e}")
+        error = f"{type(e).__name__}: {e}"
+        summary = (f"{stats['total']} submissions received ({stats['support']} support, {stats['oppose']} oppose, "
+                   f"{stats['neutral']} neutral). Full feedback attached below.")
+        notes = ""
+
+    progress("pdf")
+    pdf = render_report(title, stats, summary, df)
+    return {"pdf": pdf, "summary": summary, "notes": notes, "error": error,
+            "watermark": feedback_watermark(df), "stats": stats}
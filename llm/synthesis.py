@@ -1 +1,257 @@
-    
\ No newline at end of file
+# llm/synthesis.py
+"""
+Map step of the synthesis report, done incrementally.
+
+Distinct submissions (or, on very busy bills, theme digests from
+llm/themes.py) are formatted in feedback-id order and cut into chunks at
+content-defined boundaries: a chunk ends after a submission whose id hashes
+to 0 mod CHUNK_SIZE, or at MAX_CHUNK_SIZE. Boundaries depend only on the ids
+around them. New submissions therefore land in the last chunk, and a deleted
+or edited one changes only its own chunk.
+
+Each chunk summary is stored in report_chunk_summaries under a hash of the
+chunk text and the map prompt version. Regenerating a report sends only the
+chunks whose hash has no summary yet to the LLM. On clustered bills the
+entries are themes; llm/themes.py keeps their texts stable between
+re-clusters, so new feedback changes only the chunks of the themes it joins.
+
+The reduce step is a tree: summaries are packed in order into groups of at
+most REDUCE_TOKEN_BUDGET tokens, each group is condensed by COMBINE_PROMPT
+(groups of one level in parallel), and this repeats until everything fits
+into one final prompt. Every LLM call therefore sees a bounded input, and
+the number of levels grows with the log of the number of chunks.
+"""
+import functools
+import hashlib
+
+import pandas as pd
+
+CHUNK_SIZE = 10  # average submissions per chunk
+MAX_CHUNK_SIZE = 30
+
+LOOKUP_BATCH = 100  # hashes per stored-summary query; 64 hex characters each keeps the URL under 8 KB
+MAP_PROMPT_VERSION = "map-v1"  # bump when MAP_PROMPT changes, so stored summaries are not reused
+MAP_PROMPT = """
+You are a policy analyst. The following are citizen submissions for a parliamentary bill.
+Summarize the key themes, arguments, and specific suggestions in this chunk of feedback.
+
+Feedback chunk:
+"{text}"
+
+CONCISE SUMMARY OF THEMES:
+"""
+
+REDUCE_TOKEN_BUDGET = 6000  # tokens of summaries per reduce call, well inside the model's context
+REDUCE_CONCURRENCY = 8
+SUMMARY_SEPARATOR = "\n\n---\n\n"
+COMBINE_PROMPT = """
+You are a policy analyst. The following are summaries of citizen feedback on a parliamentary bill,
+each covering a different part of the submissions. Merge them into one consolidated summary.
+Keep every distinct theme, argument and specific suggested amendment, and keep any counts or
+shares of citizens mentioned. Merge repeated points instead of listing them twice.
+
+Summaries:
+"{text}"
+
+CONSOLIDATED SUMMARY OF THEMES:
+"""
+
+
+def _client(client):
+    if client is None:
+        from corefunc.db import supabase_client
+        client = supabase_client
+    return client
+
+
+def _text(value) -> str:
+    return value.strip() if isinstance(value, str) else ""
+
+
+def distinct_submissions(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    The submissions to synthesize, in id order, with a `submitted_by` count. Near-duplicates
+    (e.g. pasted campaign texts) are folded into their canonical submission.
+    """
+    keys = df["idempotency_key"].dropna()
+    duplicate_of = df["duplicate_of"]
+    canonical_keys = set(keys[duplicate_of[keys.index].isna()])
+    is_copy = duplicate_of.isin(canonical_keys)
+    copies = duplicate_of[is_copy].value_counts()
+
+    distinct = df[~is_copy].sort_values("id", ignore_index=True)
+    submitted_by = distinct["idempotency_key"].map(copies).fillna(0).astype("int64") + 1
+    return distinct.assign(submitted_by=submitted_by.to_numpy())
+
+
+def format_submissions(distinct: pd.DataFrame) -> list:
+    """
+    [(feedback id, text)] for the map step, one per distinct submission (see
+    distinct_submissions), noting how many citizens sent it.
+    """
+    entries = []
+    for row in distinct.itertuples(index=False):
+        county = row.county if isinstance(row.county, str) else "N/A"
+        entry = f"• Stance: {row.stance}, County: {county}"
+        entry += f" (submitted by {row.submitted_by} citizens)\n" if row.submitted_by > 1 else "\n"
+        if _text(row.comment):
+            entry += f"  Comment: {_text(row.comment)}\n"
+        if _text(row.suggested_amendment):
+            entry += f"  Suggestion: {_text(row.suggested_amendment)}\n"
+        entries.append((int(row.id), entry))
+    return entries
+
+
+def synthesis_entries(df: pd.DataFrame, bill_id=None) -> list:
+    """
+    What the map step summarizes: every distinct submission for ordinary volumes, or
+    theme digests (llm/themes.py) once a bill has more than CLUSTER_THRESHOLD of them,
+    so LLM cost stops growing with volume. bill_id keeps the bill's themes stable across runs.
+    """
+    from llm.themes import CLUSTER_THRESHOLD, theme_entries
+
+    distinct = distinct_submissions(df)
+    if len(distinct) <= CLUSTER_THRESHOLD:
+        return format_submissions(distinct)
+    return theme_entries(distinct, bill_id)
+
+
+def _is_boundary(feedback_id: int) -> bool:
+    digest = hashlib.blake2b(str(feedback_id).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % CHUNK_SIZE == 0
+
+
+def stable_chunks(entries) -> list:
+    """Groups [(id, text)] into chunk texts at content-defined boundaries."""
+    chunks, current = [], []
+    for feedback_id, text in entries:
+        current.append(text)
+        if _is_boundary(feedback_id) or len(current) >= MAX_CHUNK_SIZE:
+            chunks.append("\n".join(current))
+            current = []
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def chunk_hash(chunk: str) -> str:
+    return hashlib.sha256(f"{MAP_PROMPT_VERSION}\n{chunk}".encode()).hexdigest()
+
+
+def load_chunk_summaries(bill_id, hashes, client=None) -> dict:
+    """
+    {content_hash: summary} for the hashes already summarized for this bill. Only the wanted
+    hashes are queried, so summaries of older chunk versions are never read.
+    """
+    client = _client(client)
+    wanted = list(dict.fromkeys(hashes))
+    stored = {}
+    for start in range(0, len(wanted), LOOKUP_BATCH):
+        rows = (
+            client.table("report_chunk_summaries").select("content_hash, summary")
+            .eq("bill_id", bill_id).in_("content_hash", wanted[start:start + LOOKUP_BATCH])
+            .execute().data
+        )
+        stored.update((row["content_hash"], row["summary"]) for row in rows)
+    return stored
+
+
+def save_chunk_summaries(bill_id, summaries: dict, client=None):
+    if not summaries:
+        return
+    rows = [{"bill_id": bill_id, "content_hash": h, "summary": s} for h, s in summaries.items()]
+    _client(client).table("report_chunk_summaries").upsert(rows, on_conflict="bill_id,content_hash").execute()
+
+
+def map_chunks(bill_id, chunks, map_chain, client=None):
+    """
+    Summaries for every chunk, in order, calling map_chain only for chunks not summarized before.
+    Returns (summaries, number of chunks sent to the LLM).
+    """
+    hashes = [chunk_hash(c) for c in chunks]
+    try:
+        stored = load_chunk_summaries(bill_id, hashes, client)
+    except Exception as e:
+        print(f"Stored chunk summaries unavailable, mapping every chunk: {e}")
+        stored = {}
+
+    missing = {}  # hash -> chunk; identical chunks are mapped once
+    for h, chunk in zip(hashes, chunks):
+        if h not in stored:
+            missing.setdefault(h, chunk)
+    if missing:
+        results = map_chain.batch(list(missing.values()))
+        new = {h: r.content for h, r in zip(missing, results)}
+        try:
+            save_chunk_summaries(bill_id, new, client)
+        except Exception as e:
+            print(f"Could not store chunk summaries: {e}")
+        stored.update(new)
+    return [stored[h] for h in hashes], len(missing)
+
+
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return -(-len(text) // 4)  # about 4 characters per token in English
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _truncate(text: str, budget: int) -> str:
+    encoding = _encoding()
+    if encoding is None:
+        return text[: budget * 4]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:budget])
+
+
+def pack_summaries(summaries, budget=REDUCE_TOKEN_BUDGET) -> list:
+    """
+    Groups summaries, in order, so each group's text stays within budget tokens.
+    Groups hold at least two summaries, so every reduce level shrinks the list; a
+    summary that alone exceeds the budget is truncated to fit.
+    """
+    separator = count_tokens(SUMMARY_SEPARATOR)
+    cap = (budget - separator) // 2
+    groups, current, used = [], [], 0
+    for summary in summaries:
+        tokens = count_tokens(summary)
+        if tokens > cap:
+            summary = _truncate(summary, cap)
+            tokens = count_tokens(summary)
+        if current and used + separator + tokens > budget:
+            groups.append(current)
+            current, used = [], 0
+        current.append(summary)
+        used += tokens + (separator if len(current) > 1 else 0)
+    if current:
+        groups.append(current)
+    return groups
+
+
+def reduce_summaries(summaries, combine_chain, budget=REDUCE_TOKEN_BUDGET, max_concurrency=REDUCE_CONCURRENCY):
+    """
+    Condenses chunk summaries level by level until they fit one prompt of `budget` tokens.
+    Returns (text for the final reduce prompt, number of combine levels that ran).
+    """
+    summaries = [s for s in summaries if s and s.strip()]
+    levels = 0
+    while len(summaries) > 1 and count_tokens(SUMMARY_SEPARATOR.join(summaries)) > budget:
+        groups = pack_summaries(summaries, budget)
+        results = combine_chain.batch(
+            [SUMMARY_SEPARATOR.join(group) for group in groups], config={"max_concurrency": max_concurrency}
+        )
+        summaries = [r.content.strip() for r in results]
+        levels += 1
+    text = SUMMARY_SEPARATOR.join(summaries)
+    if count_tokens(text) > budget:
+        text = _truncate(text, budget)
+    return text, levels
@@ -0,0 +1,286 @@
+# llm/themes.py
+"""
+Theme clustering of citizen feedback ahead of the LLM synthesis.
+
+Past CLUSTER_THRESHOLD distinct submissions, sending every comment to the
+map step makes report cost and latency grow with volume. Instead:
+
+1. Each comment + suggested amendment becomes a hashed TF-IDF vector:
+   words minus stopwords, signed feature hashing into VECTOR_DIM buckets,
+   sublinear tf, idf, L2-normalized.
+2. Submissions are grouped by (stance, county). Each group is clustered
+   with spherical k-means. Every group gets one theme and the rest of
+   THEME_BUDGET is split by citizens (largest remainder), so the total is
+   exactly the budget; past that many groups, the smallest counties of a
+   stance are folded into "Other counties".
+3. Each theme becomes one map-step entry, keyed by its lowest feedback id.
+   It carries the theme's size, its most frequent words, and the
+   REPRESENTATIVES comments nearest its centroid.
+
+The LLM sees roughly THEME_BUDGET entries whatever the volume, so synthesis
+for 100k submissions costs about the same as for 1k. Everything is NumPy;
+clustering 100k submissions takes seconds.
+
+Themes are kept stable so the chunk-summary cache (llm/synthesis.py) keeps
+working on busy bills. The fitted idf and centroids are saved per bill
+under THEME_DIR. Until the bill's distinct submissions grow by
+RECLUSTER_GROWTH, new feedback is only assigned to the nearest saved
+centroid, so it changes just the entry of the theme it joins; entries carry
+no group-wide figures for the same reason. A re-cluster starts from the
+saved centroids, so most themes keep their place.
+"""
+import json
+import os
+import uuid
+import zlib
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from corefunc.dedup import STOPWORDS, _tokens
+
+CLUSTER_THRESHOLD = 1000  # distinct submissions; below this every submission goes to the LLM
+THEME_BUDGET = 300  # themes across all (stance, county) groups
+VECTOR_DIM = 256
+REPRESENTATIVES = 3
+KMEANS_ITERATIONS = 15
+TOP_TERMS = 8
+RECLUSTER_GROWTH = 0.25  # re-cluster once a bill has this much more distinct feedback than at the last fit
+OTHER_COUNTIES = "Other counties"
+THEME_DIR = os.getenv("CIVICSENSE_THEME_DIR", ".civicsense/themes")
+
+
+def _text(value) -> str:
+    return value.strip() if isinstance(value, str) else ""
+
+
+def vectorize(texts, idf=None) -> tuple:
+    """
+    Hashed TF-IDF vectors (float32, one row per text, L2-normalized), each text's tokens and the idf.
+    Feature hashing needs no vocabulary; pass an earlier run's idf to place texts in that run's space.
+    """
+    tokens = [[t for t in _tokens(text) if t not in STOPWORDS and len(t) > 1] for text in texts]
+    rows, cols, signs = [], [], []
+    for i, words in enumerate(tokens):
+        for word in words:
+            h = zlib.crc32(word.encode())
+            rows.append(i)
+            cols.append(h % VECTOR_DIM)
+            signs.append(1.0 if h & 0x80000000 else -1.0)
+
+    counts = np.zeros((len(tokens), VECTOR_DIM), dtype=np.float32)
+    if rows:
+        np.add.at(counts, (np.array(rows), np.array(cols)), np.array(signs, dtype=np.float32))
+    if idf is None:
+        document_frequency = np.count_nonzero(counts, axis=0)
+        idf = np.log((1 + len(tokens)) / (1 + document_frequency)).astype(np.float32) + 1
+    vectors = np.sign(counts) * np.log1p(np.abs(counts)) * idf
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors, tokens, idf
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, weights=None, seed=0, initial=None) -> tuple:
+    """
+    Cosine k-means on unit vectors; returns (labels, unit centroids). Deterministic for a seed.
+    initial - centroids to start from (the previous fit); k-means++ seeds any others
+    """
+    n = len(vectors)
+    k = max(1, min(k, n))
+    rng = np.random.default_rng(seed)
+    weights = np.ones(n, dtype=np.float32) if weights is None else np.asarray(weights, dtype=np.float32)
+
+    # k-means++ seeding on cosine distance, after the initial centroids
+    centroids = np.empty((k, vectors.shape[1]), dtype=np.float32)
+    seeded = 0 if initial is None else min(len(initial), k)
+    if seeded:
+        centroids[:seeded] = initial[:seeded]
+    else:
+        centroids[0] = vectors[rng.choice(n, p=weights / weights.sum())]
+        seeded = 1
+    closest = (1 - vectors @ centroids[:seeded].T).min(axis=1)
+    for j in range(seeded, k):
+        p = np.clip(closest, 0, None) * weights
+        total = p.sum()
+        centroids[j] = vectors[rng.choice(n, p=p / total) if total > 0 else rng.integers(n)]
+        closest = np.minimum(closest, 1 - vectors @ centroids[j])
+
+    labels = np.zeros(n, dtype=np.int64)
+    for _ in range(KMEANS_ITERATIONS):
+        new_labels = (vectors @ centroids.T).argmax(axis=1)
+        if np.array_equal(new_labels, labels) and _ > 0:
+            break
+        labels = new_labels
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors * weights[:, None])
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        empty = norms[:, 0] == 0
+        centroids = np.where(empty[:, None], centroids, sums / np.where(norms > 0, norms, 1))
+    return labels, centroids
+
+
+def allocate_themes(group_sizes: pd.Series, budget=THEME_BUDGET) -> pd.Series:
+    """
+    Themes per group: one each, and the rest of the budget split in proportion to the
+    citizens in each group by largest remainder, so the total is exactly the budget
+    (one per group if there are more groups than that; cap_groups prevents it).
+    """
+    spare = max(budget - len(group_sizes), 0)
+    quota = group_sizes / group_sizes.sum() * spare
+    themes = np.floor(quota)
+    leftover = int(round(spare - themes.sum()))
+    themes.iloc[np.argsort(-(quota - themes).to_numpy(), kind="stable")[:leftover]] += 1
+    return (themes + 1).astype("int64")
+
+
+def cap_groups(stance: pd.Series, county: pd.Series, weights, budget=THEME_BUDGET) -> pd.Series:
+    """County labels, with each stance's smallest groups folded into OTHER_COUNTIES past `budget` groups."""
+    sizes = pd.Series(weights, index=county.index).groupby([stance, county]).sum()
+    if len(sizes) <= budget:
+        return county
+    keep = set(sizes.sort_values(ascending=False, kind="stable").index[: max(budget - stance.nunique(), 0)])
+    folded = np.array([(s, c) not in keep for s, c in zip(stance, county)])
+    return county.where(~folded, OTHER_COUNTIES)
+
+
+# --- The saved fit, per bill ---
+def _model_path(bill_id) -> Path:
+    return Path(THEME_DIR) / f"bill-{bill_id}.npz"
+
+
+def load_model(bill_id):
+    """The bill's last fit, {"fitted_on", "idf", "centroids": {(stance, county): array}}, or None."""
+    if bill_id is None:
+        return None
+    try:
+        with np.load(_model_path(bill_id)) as f:
+            if int(f["dim"]) != VECTOR_DIM:
+                return None
+            groups = [tuple(g) for g in json.loads(str(f["groups"]))]
+            bounds = np.concatenate([[0], np.cumsum(f["sizes"])])
+            centroids = f["centroids"]
+            return {
+                "fitted_on": int(f["fitted_on"]),
+                "idf": f["idf"],
+                "centroids": {g: centroids[a:b] for g, a, b in zip(groups, bounds[:-1], bounds[1:])},
+            }
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Theme model for bill {bill_id} unreadable, re-clustering: {e}")
+        return None
+
+
+def save_model(bill_id, fitted_on, idf, centroids: dict):
+    if bill_id is None:
+        return
+    path = _model_path(bill_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, dim=VECTOR_DIM, fitted_on=fitted_on, idf=idf,
+                 groups=json.dumps([list(g) for g in centroids]),
+                 sizes=np.array([len(c) for c in centroids.values()], dtype=np.int64),
+                 centroids=np.concatenate(list(centroids.values())))
+    os.replace(tmp, path)
+
+
+def _saved_groups(model, stance, county):
+    """County labels matching the saved fit's groups, or None if a submission fits none of them."""
+    known = model["centroids"]
+    labels = []
+    for s, c in zip(stance, county):
+        if (s, c) not in known:
+            c = OTHER_COUNTIES
+            if (s, c) not in known:
+                return None
+        labels.append(c)
+    return pd.Series(labels, index=county.index, dtype=object)
+
+
+def _fit(distinct, texts, weights, stance, county, bill_id, previous):
+    """Clusters every group afresh, seeded from the previous fit, and saves the fit."""
+    vectors, tokens, idf = vectorize(texts)
+    groups = cap_groups(stance, county, weights)
+    themes_per_group = allocate_themes(pd.Series(weights, index=groups.index).groupby([stance, groups]).sum())
+    seeds = previous["centroids"] if previous is not None else {}
+
+    labels, centroids = {}, {}
+    for key, positions in pd.Series(np.arange(len(distinct))).groupby([stance, groups]):
+        positions = positions.to_numpy()
+        labels[key], centroids[key] = spherical_kmeans(vectors[positions], int(themes_per_group[key]),
+                                                       weights[positions], initial=seeds.get(key))
+    save_model(bill_id, len(distinct), idf, centroids)
+    return vectors, tokens, groups, labels, centroids
+
+
+def _place(distinct, texts, stance, groups, model):
+    """Assigns every submission to the nearest centroid of the saved fit, without re-clustering."""
+    vectors, tokens, _ = vectorize(texts, model["idf"])
+    centroids = model["centroids"]
+    labels = {}
+    for key, positions in pd.Series(np.arange(len(distinct))).groupby([stance, groups]):
+        labels[key] = (vectors[positions.to_numpy()] @ centroids[key].T).argmax(axis=1)
+    return vectors, tokens, labels, centroids
+
+
+def theme_entries(distinct: pd.DataFrame, bill_id=None) -> list:
+    """
+    [(representative feedback id, theme text)] for the map step, from the distinct
+    submissions (llm/synthesis.py distinct_submissions), ordered by id. With a bill_id,
+    the fit is saved and reused until the bill grows by RECLUSTER_GROWTH.
+    """
+    texts = [f"{_text(c)} {_text(a)}" for c, a in zip(distinct["comment"], distinct["suggested_amendment"])]
+    weights = distinct["submitted_by"].to_numpy(dtype=np.float32)
+    ids = distinct["id"].to_numpy()
+    stance = distinct["stance"].astype(object)
+    county = distinct["county"].astype(object).where(distinct["county"].notna(), "N/A")
+
+    previous = load_model(bill_id)
+    groups = None
+    if previous is not None and len(distinct) < previous["fitted_on"] * (1 + RECLUSTER_GROWTH):
+        groups = _saved_groups(previous, stance, county)
+    if groups is not None:
+        vectors, tokens, labels, centroids = _place(distinct, texts, stance, groups, previous)
+    else:
+        vectors, tokens, groups, labels, centroids = _fit(distinct, texts, weights, stance, county, bill_id, previous)
+
+    entries = []
+    for (stance_name, county_name), positions in pd.Series(np.arange(len(distinct))).groupby([stance, groups]):
+        positions = positions.to_numpy()
+        group_labels = labels[(stance_name, county_name)]
+        group_centroids = centroids[(stance_name, county_name)]
+
+        for theme in np.unique(group_labels):
+            members = positions[group_labels == theme]
+            theme_citizens = int(weights[members].sum())
+            similarity = vectors[members] @ group_centroids[theme]
+            nearest, seen = [], set()
+            for m in members[np.lexsort((ids[members], -similarity))]:  # ties by id, so the pick is stable
+                if texts[m] not in seen:
+                    seen.add(texts[m])
+                    nearest.append(m)
+                    if len(nearest) == REPRESENTATIVES:
+                        break
+
+            words = Counter()
+            for m in members:
+                words.update(tokens[m])
+            top = ", ".join(w for w, _ in sorted(words.items(), key=lambda t: (-t[1], t[0]))[:TOP_TERMS])
+
+            entry = (f"• Theme — Stance: {stance_name}, County: {county_name}: {theme_citizens} citizens "
+                     f"({len(members)} distinct submissions)\n")
+            if top:
+                entry += f"  Frequent words: {top}\n"
+            for m in nearest:
+                row = distinct.iloc[m]
+                if _text(row["comment"]):
+                    entry += f"  Example comment: {_text(row['comment'])}\n"
+                if _text(row["suggested_amendment"]):
+                    entry += f"  Example suggestion: {_text(row['suggested_amendment'])}\n"
+            entries.append((int(ids[members].min()), entry))
+
+    entries.sort(key=lambda e: e[0])
+    return entries
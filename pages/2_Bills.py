@@ -9,31 +9,18 @@ sys.path.append(os.path.dirname(SCRIPT_DIR))
 
 from corefunc import db
 from components.feedback_form import show_feedback_dialog
-# Conditional import for LLM chain components with error handling
-# The user has identified the correct import for PromptTemplate.
-try:
-    from gtts import gTTS
-    from io import BytesIO
-    # Removed the problematic 'from langchain.chains.summarize import load_summarize_chain'
-    # The map-reduce logic will be built explicitly using LCEL components.
-except ModuleNotFoundError:
-    st.error("Error: Required AI modules (like 'langchain.chains') were not found.")
-    st.markdown("""
-        This usually means the `langchain` library or its components are not correctly installed. Please ensure your virtual environment is activated and run: `pip install --upgrade -r requirements.txt`
-        Then, restart your Streamlit application.
-    """)
-    st.stop()
-
-from langchain_core.prompts import PromptTemplate
-from langchain_core.runnables import RunnableMap, RunnablePassthrough
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.documents import Document
+from components.trace_panel import panel_requested, trace_panel
+from corefunc.tracing import span, trace
+from io import BytesIO
+# gTTS, LangChain and the text splitter are imported where they are used (render_summary),
+# so opening the page doesn't pay for them; tools/import_budget.py keeps it that way.
 import datetime
 
 st.set_page_config(page_title="CivicSense AI – All Bills", layout="wide")
 
-# Wrap the entire page content in a spinner to show a loading state from the very beginning
-with st.spinner("Loading Bills page... Please wait."):
+# Wrap the entire page content in a spinner to show a loading state from the very beginning,
+# and in a trace of this rerun (corefunc/tracing.py); ?trace=<CIVICSENSE_TRACE_PANEL> shows it as a waterfall below
+with trace("Bills", force=panel_requested()) as page_trace, st.spinner("Loading Bills page... Please wait."):
     # === GLOBAL  CSS ===
     st.markdown("""
     <style>
@@ -73,19 +60,32 @@ with st.spinner("Loading Bills page... Please wait."):
     st.markdown("<p style='text-align:center; font-size:1.2rem;'>Real-time tracker of all National Assembly bills • Plain-language explanations • Give your input</p>", unsafe_allow_html=True)
     st.markdown("---")
 
-    # Fetch all bills
+    # Fetch all bills (listing columns only; derived fields are computed by the scraper at ingest)
+    BILL_LIST_COLUMNS = (
+        "id, title, pdf_url, published_at, summary_en, summary_sw, "
+        "bill_number, sponsor, bill_date, participation_start, participation_end, "
+        "in_public_participation, word_count, char_count, preview"
+    )
+
     @st.cache_data(ttl=600)  # refresh every 10 minutes
     def load_bills():
         result = (
             db.supabase_client.table("bills")
-            .select("*")
+            .select(BILL_LIST_COLUMNS)
             .order("published_at", desc=True)
             .execute()
         )
         return result.data
 
+    @st.cache_data(ttl=3600)
+    def load_bill_text(bill_id):
+        """Full text is only needed when a summary has to be generated."""
+        result = db.supabase_client.table("bills").select("full_text").eq("id", bill_id).execute()
+        return (result.data[0]["full_text"] if result.data else None) or ""
+
 
-    bills = load_bills() # The data loading is now covered by the outer spinner
+    with span("load_bills", kind="db"):
+        bills = load_bills() # The data loading is now covered by the outer spinner
     if not bills:
         st.info("No bills found yet. Run the scraper first!")
         st.stop()
@@ -97,7 +97,7 @@ with st.spinner("Loading Bills page... Please wait."):
             b
             for b in bills
             if search.lower() in b["title"].lower()
-            or search.lower() in (b["full_text"] or "")[:500].lower()
+            or search.lower() in (b["preview"] or "").lower()
         ]
 
     # Metrics
@@ -107,39 +107,141 @@ with st.spinner("Loading Bills page... Please wait."):
     with col2:
         st.metric(
             "In Public Participation",
-            len(
-                [
-                    b
-                    for b in bills
-                    if "public participation" in (b["full_text"] or "").lower()
-                ]
-            ),
+            sum(1 for b in bills if b["in_public_participation"]),
         )
     with col3:
         st.metric("Latest Bill", bills[0]["title"][:40] + "..." if bills else "N/A")
 
-    # Initialize session state for dialogs
-    if "show_dialog_for_bill" not in st.session_state:
-        st.session_state.show_dialog_for_bill = None
-        st.session_state.dialog_lang = None
-        st.session_state.show_feedback_for_bill = None
+    BILLS_PER_PAGE = 20
 
-    # Beautiful cards
-    for bill in bills:
+    # --- Dialogs ---
+    # Defined once at module level and opened straight from a card's fragment, so
+    # opening a dialog reruns only that card instead of the whole bill list.
+    @trace("Bills: summary dialog")  # its own trace on a fragment rerun
+    def render_summary(bill, lang):
+        close_button_text = "Close" if lang == "English" else "Funga"
+
+        st.subheader(f"Summary of: {bill['title']}")
+
+        db_column = "summary_en" if lang == "English" else "summary_sw"
+        summary_text = bill.get(db_column)
+
+        if not summary_text:
+            with st.spinner(f"🤖 Generating {lang} summary... (This will be saved for future use)"):
+                try:
+                    from corefunc.llm import llm # Ensure LLM is imported here
+                    from langchain_core.documents import Document
+                    from langchain_core.prompts import PromptTemplate
+                    from langchain_core.runnables import RunnablePassthrough
+                    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+                    # 1. Split the document into smaller, manageable chunks
+                    text_splitter = RecursiveCharacterTextSplitter(chunk_size=4000, chunk_overlap=200)
+                    with span("load_bill_text", kind="db"):
+                        bill_text = load_bill_text(bill['id'])
+                    docs = [Document(page_content=t) for t in text_splitter.split_text(bill_text)]
+
+                    # 2. Define the "Map" prompt for summarizing individual chunks
+                    map_prompt_template = f"""
+                    You are a policy analyst. Summarize the following chunk of a Kenyan parliamentary bill in simple, clear {lang}.
+                    Focus on the main purpose, key actions, and who it will affect.
+                    Text: "{{page_content}}"
+                    CONCISE SUMMARY:
+                    """
+                    map_prompt = PromptTemplate.from_template(map_prompt_template)
+                    map_chain = {"page_content": RunnablePassthrough()} | map_prompt | llm
+
+                    # Execute the map step: summarize each chunk
+                    # The .batch() method is efficient for processing multiple inputs
+                    with span("map chunks", kind="llm", chunks=len(docs)):
+                        chunk_summaries_raw = map_chain.batch(docs)
+                    chunk_summaries = [s.content for s in chunk_summaries_raw]
+                    combined_chunk_summaries = "\n\n".join(chunk_summaries)
+
+                    # 3. Define the "Reduce" prompt for combining chunk summaries into a final summary
+                    reduce_prompt_template = f"""
+                    You are a policy analyst. Combine the following concise summaries of sections of a Kenyan parliamentary bill into a single, coherent, and comprehensive executive summary (around 200-250 words) in {lang}.
+                    Explain the bill's overall main purpose and who it will affect.
+                    Summaries of sections:
+                    {{combined_chunk_summaries}}
+                    FINAL EXECUTIVE SUMMARY:
+                    """
+                    reduce_prompt = PromptTemplate.from_template(reduce_prompt_template)
+                    reduce_chain = {"combined_chunk_summaries": RunnablePassthrough()} | reduce_prompt | llm
+                    with span("reduce", kind="llm"):
+                        summary_text = reduce_chain.invoke(combined_chunk_summaries).content.strip()
+
+                    # Save the newly generated summary to the database
+                    with span("save summary", kind="db"):
+                        db.supabase_client.table("bills").update({db_column: summary_text}).eq("id", bill['id']).execute()
+                    bill[db_column] = summary_text  # reopening this card's dialog reuses it
+                    st.success("Summary generated and saved!")
+
+                except Exception as e:
+                    print(f"An error occurred while generating summary: {e}")
+                    st.error(
+                        "**Oops! We couldn't generate the summary right now.**\n\nThis can happen when our AI service is experiencing high demand. Please try again in a few minutes."
+                    )
+                    st.stop()
+        else:
+            st.success("Loaded existing summary.")
+
+        # Display the summary and audio
+        st.markdown("---")
+        st.markdown("#### 🔊 Audio Summary")
+        with st.spinner("Generating audio..."):
+            try:
+                from corefunc.tts import speech_mp3
+            except ModuleNotFoundError:
+                st.error("Audio summaries need the `gtts` package: `pip install --upgrade -r requirements.txt`")
+                st.stop()
+            tts_lang = 'en' if lang == 'English' else 'sw'
+            mp3_fp = BytesIO(speech_mp3(summary_text, tts_lang))
+            st.audio(mp3_fp, format="audio/mp3")
+        st.markdown("---")
+        st.markdown(summary_text)
+
+        if st.button(close_button_text):
+            st.rerun()
+
+    @st.dialog("Plain English Summary", width="large")
+    def english_summary_dialog(bill):
+        render_summary(bill, "English")
+
+    @st.dialog("Muhtasari wa Kiswahili Rahisi", width="large")
+    def kiswahili_summary_dialog(bill):
+        render_summary(bill, "Kiswahili")
+
+    @st.dialog("📢 Your Voice Matters", width="large")
+    def feedback_form_dialog(bill):
+        submitted = show_feedback_dialog(bill)
+        if st.button("Done" if submitted else "Cancel"):
+            st.rerun()
+
+    # --- Beautiful cards ---
+    @st.fragment
+    def render_bill_card(bill):
+        """One card per fragment: its buttons rerun only this card."""
         with st.container():
             col1, col2 = st.columns([3, 1])
 
             with col1:
                 st.subheader(f"📜 {bill['title']}")
                 st.caption(
-                    f"Published: {bill['published_at'][:10] if bill['published_at'] else 'Recently'} • {len(bill['full_text'] or '')//1000}k characters extracted"
+                    f"Published: {bill['published_at'][:10] if bill['published_at'] else 'Recently'} • {(bill['char_count'] or 0)//1000}k characters extracted"
+                    + (f" • {bill['bill_number']}" if bill["bill_number"] else "")
+                    + (f" • Sponsor: {bill['sponsor']}" if bill["sponsor"] else "")
                 )
+                if bill["participation_end"]:
+                    st.caption(
+                        f"📣 Public participation: {bill['participation_start'] or 'open'} → {bill['participation_end']}"
+                    )
 
                 # Quick preview of first 300 chars
                 preview = (
-                    bill["full_text"][:300] + "..."
-                    if bill["full_text"] and len(bill["full_text"]) > 300
-                    else bill["full_text"] or "No text extracted"
+                    bill["preview"][:300] + "..."
+                    if bill["preview"] and len(bill["preview"]) > 300
+                    else bill["preview"] or "No text extracted"
                 )
                 with st.expander("Quick preview of bill text"):
                     st.text(preview)
@@ -150,13 +252,10 @@ with st.spinner("Loading Bills page... Please wait."):
                 )
 
                 if st.button("Explain in Plain English", key=f"eng_{bill['id']}", use_container_width=True):
-                    st.session_state.show_dialog_for_bill = bill
-                    st.session_state.dialog_lang = "English"
+                    english_summary_dialog(bill)
 
                 if st.button("Eleza kwa Kiswahili Rahisi", key=f"swa_{bill['id']}", use_container_width=True):
-                    st.session_state.show_dialog_for_bill = bill
-                    st.session_state.dialog_lang = "Kiswahili"
-
+                    kiswahili_summary_dialog(bill)
 
                 if st.button(
                     "Give Feedback on This Bill →",
@@ -164,104 +263,42 @@ with st.spinner("Loading Bills page... Please wait."):
                     type="primary",
                     use_container_width=True,
                 ):
-                    st.session_state.show_feedback_for_bill = bill
+                    feedback_form_dialog(bill)
 
             st.divider()
 
-    # This part must be outside the main loop
-    if st.session_state.show_dialog_for_bill:
-        bill = st.session_state.show_dialog_for_bill
-        lang = st.session_state.dialog_lang
-
-        title = "Plain English Summary" if lang == "English" else "Muhtasari wa Kiswahili Rahisi"
-        close_button_text = "Close" if lang == "English" else "Funga"
-
-        @st.dialog(title, width="large")
-        def show_summary_dialog():
-            st.subheader(f"Summary of: {bill['title']}")
-            
-            db_column = "summary_en" if lang == "English" else "summary_sw"
-            summary_text = bill.get(db_column)
-
-            if not summary_text:
-                with st.spinner(f"🤖 Generating {lang} summary... (This will be saved for future use)"):
-                    try:
-                        from corefunc.llm import llm # Ensure LLM is imported here
-
-                        # 1. Split the document into smaller, manageable chunks
-                        text_splitter = RecursiveCharacterTextSplitter(chunk_size=4000, chunk_overlap=200)
-                        docs = [Document(page_content=t) for t in text_splitter.split_text(bill['full_text'])]
-
-                        # 2. Define the "Map" prompt for summarizing individual chunks
-                        map_prompt_template = f"""
-                        You are a policy analyst. Summarize the following chunk of a Kenyan parliamentary bill in simple, clear {lang}.
-                        Focus on the main purpose, key actions, and who it will affect.
-                        Text: "{{page_content}}"
-                        CONCISE SUMMARY:
-                        """
-                        map_prompt = PromptTemplate.from_template(map_prompt_template)
-                        map_chain = {"page_content": RunnablePassthrough()} | map_prompt | llm
-
-                        # Execute the map step: summarize each chunk
-                        # The .batch() method is efficient for processing multiple inputs
-                        chunk_summaries_raw = map_chain.batch(docs)
-                        chunk_summaries = [s.content for s in chunk_summaries_raw]
-                        combined_chunk_summaries = "\n\n".join(chunk_summaries)
-
-                        # 3. Define the "Reduce" prompt for combining chunk summaries into a final summary
-                        reduce_prompt_template = f"""
-                        You are a policy analyst. Combine the following concise summaries of sections of a Kenyan parliamentary bill into a single, coherent, and comprehensive executive summary (around 200-250 words) in {lang}.
-                        Explain the bill's overall main purpose and who it will affect.
-                        Summaries of sections:
-                        {{combined_chunk_summaries}}
-                        FINAL EXECUTIVE SUMMARY:
-                        """
-                        reduce_prompt = PromptTemplate.from_template(reduce_prompt_template)
-                        reduce_chain = {"combined_chunk_summaries": RunnablePassthrough()} | reduce_prompt | llm
-                        summary_text = reduce_chain.invoke(combined_chunk_summaries).content.strip()
-
-                        # Save the newly generated summary to the database
-                        db.supabase_client.table("bills").update({db_column: summary_text}).eq("id", bill['id']).execute()
-                        st.success("Summary generated and saved!")
-
-                    except Exception as e:
-                        print(f"An error occurred while generating summary: {e}")
-                        st.error(
-                            "**Oops! We couldn't generate the summary right now.**\n\nThis can happen when our AI service is experiencing high demand. Please try again in a few minutes."
-                        )
-                        st.stop()
-            else:
-                st.success("Loaded existing summary.")
-
-            # Display the summary and audio
-            st.markdown("---")
-            st.markdown("#### 🔊 Audio Summary")
-            with st.spinner("Generating audio..."):
-                tts_lang = 'en' if lang == 'English' else 'sw'
-                tts = gTTS(text=summary_text, lang=tts_lang, slow=False)
-                mp3_fp = BytesIO()
-                tts.write_to_fp(mp3_fp)
-                mp3_fp.seek(0)
-                st.audio(mp3_fp, format="audio/mp3")
-            st.markdown("---")
-            st.markdown(summary_text)
-
-            if st.button(close_button_text):
-                st.session_state.show_dialog_for_bill = None
-                st.session_state.dialog_lang = None
+    # --- Windowed list: only one page of cards is rendered per run ---
+    page_count = max(1, -(-len(bills) // BILLS_PER_PAGE))
+    if st.session_state.get("bills_search") != search:
+        # A new search starts again from the first page
+        st.session_state.bills_search = search
+        st.session_state.bills_page = 0
+    page = min(st.session_state.get("bills_page", 0), page_count - 1)
+
+    def render_pager(position):
+        prev_col, label_col, next_col = st.columns([1, 2, 1])
+        with prev_col:
+            if st.button("← Previous", key=f"prev_{position}", disabled=page == 0, use_container_width=True):
+                st.session_state.bills_page = page - 1
                 st.rerun()
-
-        show_summary_dialog()
-
-    # This part handles the feedback dialog
-    if st.session_state.show_feedback_for_bill:
-        bill = st.session_state.show_feedback_for_bill
-
-        @st.dialog("📢 Your Voice Matters", width="large")
-        def show_feedback_form_dialog():
-            submitted = show_feedback_dialog(bill)
-            if st.button("Cancel") or submitted:
-                st.session_state.show_feedback_for_bill = None
+        with label_col:
+            first = page * BILLS_PER_PAGE + 1
+            last = min(len(bills), (page + 1) * BILLS_PER_PAGE)
+            st.markdown(
+                f"<p style='text-align:center;'>Bills {first}–{last} of {len(bills)} • Page {page + 1} of {page_count}</p>",
+                unsafe_allow_html=True,
+            )
+        with next_col:
+            if st.button("Next →", key=f"next_{position}", disabled=page >= page_count - 1, use_container_width=True):
+                st.session_state.bills_page = page + 1
                 st.rerun()
 
-        show_feedback_form_dialog()
\ No newline at end of file
+    if bills:
+        render_pager("top")
+        with span("bill cards", kind="render"):
+            for bill in bills[page * BILLS_PER_PAGE:(page + 1) * BILLS_PER_PAGE]:
+                render_bill_card(bill)
+        if page_count > 1:
+            render_pager("bottom")
+
+trace_panel(page_trace)
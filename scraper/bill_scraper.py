@@ -1,5 +1,5 @@
 # scraper/bill_scraper.py
-import requests
+import httpx
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import datetime
@@ -11,7 +11,6 @@ import logging
 import sys
 import os
 
-from unstructured.partition.pdf import partition_pdf
 from urllib.parse import quote, urlencode
 
 SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
@@ -19,14 +18,12 @@ sys.path.append(os.path.dirname(SCRIPT_DIR))
 
 # Supabase
 from corefunc.db import supabase_client
+from corefunc.http_pool import format_http_metrics, get
 
 
 BILLS_PAGE_URL = "https://parliament.go.ke/the-national-assembly/house-business/bills"
 BASE_URL = "https://parliament.go.ke"
 
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
-}
 
 
 def clean_title_from_text(raw_text: str) -> str:
@@ -84,10 +81,9 @@ def download_pdf(pdf_url: str) -> bytes:
     # Encode special characters in the URL
     try:
         print(f"Downloading from: {pdf_url}")
-        r = requests.get(pdf_url, headers=HEADERS, timeout=90)
-        r.raise_for_status()
-        return r.content
-    except requests.exceptions.RequestException as e:
+        # Pooled keep-alive connections to the site; retries 429/5xx (corefunc/http_pool.py)
+        return get("parliament", pdf_url).content
+    except httpx.HTTPError as e:
         print(f"Download failed for {pdf_url}: {e}")
         raise
 
@@ -116,6 +112,9 @@ def extract_text_from_pdf_fallback(pdf_bytes: bytes) -> str:
         path = Path(temp_dir) / "bill.pdf"
         path.write_bytes(pdf_bytes)
         try:
+            # Imported here: unstructured takes seconds to load and is only needed when PyMuPDF fails
+            from unstructured.partition.pdf import partition_pdf
+
             # Try auto strategy first
             elements = partition_pdf(
                 filename=str(path),
@@ -129,12 +128,117 @@ def extract_text_from_pdf_fallback(pdf_bytes: bytes) -> str:
             return "[Text extraction failed]"
 
 
+# --- Derived bill metadata ---
+# Computed once at ingest so the Bills page never has to scan full_text on render.
+PREVIEW_CHARS = 500  # the page shows the first 300 and searches the first 500
+
+MONTHS = (
+    "january|february|march|april|may|june|july|august|"
+    "september|october|november|december"
+)
+DATE_RE = re.compile(
+    rf"\b(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:day\s+of\s+)?({MONTHS}),?\s+(\d{{4}})\b",
+    re.IGNORECASE,
+)
+BILL_NUMBER_RE = re.compile(
+    r"\b((?:National\s+Assembly|Senate)\s+Bills?\s+No\.?\s*\d+(?:\s+of\s+\d{4})?)",
+    re.IGNORECASE,
+)
+SPONSOR_RES = [
+    re.compile(r"\(\s*(?:sponsored|introduced)\s+by\s+(?:the\s+)?([^)]{3,120})\)", re.IGNORECASE),
+    re.compile(r"\bsponsor(?:ed\s+by)?\s*[:\-–]\s*(?:the\s+)?([^\n]{3,120})", re.IGNORECASE),
+]
+PARTICIPATION_KEYWORDS_RE = re.compile(
+    r"public\s+participation|memorand[au]m?|written\s+submissions|views\s+of\s+the\s+public",
+    re.IGNORECASE,
+)
+
+
+def _parse_date(match) -> str | None:
+    day, month, year = match.groups()
+    try:
+        return datetime.datetime.strptime(f"{day} {month} {year}", "%d %B %Y").date().isoformat()
+    except ValueError:
+        return None
+
+
+def _find_participation_window(text: str):
+    """
+    Looks for dates near a public-participation / memoranda notice.
+    Returns (start, end) ISO dates; either may be None.
+    """
+    for keyword in PARTICIPATION_KEYWORDS_RE.finditer(text):
+        window = text[keyword.start():keyword.end() + 400]
+        dates = [d for d in (_parse_date(m) for m in DATE_RE.finditer(window)) if d]
+        if not dates:
+            continue
+        if re.search(r"on\s+or\s+before|not\s+later\s+than|by\s+\w+day", window, re.IGNORECASE) and len(dates) == 1:
+            return None, dates[0]
+        if len(dates) >= 2:
+            return min(dates[:2]), max(dates[:2])
+        return dates[0], None
+    return None, None
+
+
+def extract_bill_metadata(full_text: str) -> dict:
+    """
+    Derives the listing fields the Bills page needs from the extracted text.
+    Regex-based and best-effort: fields that cannot be found are None.
+    """
+    text = full_text or ""
+    bill_number = BILL_NUMBER_RE.search(text)
+
+    sponsor = None
+    for sponsor_re in SPONSOR_RES:
+        match = sponsor_re.search(text)
+        if match:
+            sponsor = re.sub(r"\s+", " ", match.group(1)).strip(" .,;")
+            break
+
+    first_date = next((d for d in (_parse_date(m) for m in DATE_RE.finditer(text[:20_000])) if d), None)
+    participation_start, participation_end = _find_participation_window(text)
+
+    return {
+        "bill_number": re.sub(r"\s+", " ", bill_number.group(1)) if bill_number else None,
+        "sponsor": sponsor,
+        "bill_date": first_date,
+        "participation_start": participation_start,
+        "participation_end": participation_end,
+        "in_public_participation": "public participation" in text.lower(),
+        "word_count": len(text.split()),
+        "char_count": len(text),
+        "preview": text[:PREVIEW_CHARS],
+    }
+
+
+def backfill_bill_metadata(batch_size: int = 50):
+    """Computes derived metadata for bills saved before the columns existed."""
+    print("Backfilling derived bill metadata...")
+    updated = 0
+    while True:
+        rows = (
+            supabase_client.table("bills")
+            .select("id, full_text")
+            .is_("char_count", "null")
+            .limit(batch_size)
+            .execute()
+            .data
+        )
+        if not rows:
+            break
+        for row in rows:
+            supabase_client.table("bills").update(
+                extract_bill_metadata(row["full_text"])
+            ).eq("id", row["id"]).execute()
+            updated += 1
+    print(f"Done! {updated} bills backfilled.")
+
+
 def scrape_and_save_bills():
     print("Scraping Kenyan Parliament bills...")
     try:
-        resp = requests.get(BILLS_PAGE_URL, headers=HEADERS, timeout=60)
-        resp.raise_for_status()
-    except requests.exceptions.RequestException as e:
+        resp = get("parliament", BILLS_PAGE_URL, timeout=60)
+    except httpx.HTTPError as e:
         print(f"Failed to fetch bills page: {e}")
         return
 
@@ -185,16 +289,17 @@ def scrape_and_save_bills():
                 print("   (already in DB – skipping)")
                 continue
 
-            full_text = extract_text_from_pdf(pdf_bytes)
+            full_text = extract_text_from_pdf(pdf_bytes)[:500_000]
 
             supabase_client.table("bills").insert(
                 {
                     "title": title,
                     "pdf_url": pdf_url,
                     "pdf_hash": pdf_hash,
-                    "full_text": full_text[:500_000],
+                    "full_text": full_text,
                     "status": "Published",
                     "published_at": datetime.datetime.utcnow().isoformat(),
+                    **extract_bill_metadata(full_text),
                 }
             ).execute()
 
@@ -210,7 +315,11 @@ def scrape_and_save_bills():
             traceback.print_exc()
 
     print(f"\nDone! {new_bills} new bills saved, {failed_bills} failed.")
+    print(format_http_metrics())
 
 
 if __name__ == "__main__":
-    scrape_and_save_bills()
+    if "--backfill" in sys.argv:
+        backfill_bill_metadata()
+    else:
+        scrape_and_save_bills()
@@ -0,0 +1,16 @@
+-- Derived bill metadata, computed once by scraper/bill_scraper.py at ingest.
+-- The Bills page reads these columns instead of scanning full_text on every render.
+-- Existing rows: run `python scraper/bill_scraper.py --backfill`.
+
+alter table bills
+    add column if not exists bill_number text,
+    add column if not exists sponsor text,
+    add column if not exists bill_date date,
+    add column if not exists participation_start date,
+    add column if not exists participation_end date,
+    add column if not exists in_public_participation boolean not null default false,
+    add column if not exists word_count integer,
+    add column if not exists char_count integer,
+    add column if not exists preview text;
+
+create index if not exists bills_published_at_idx on bills (published_at desc);
@@ -0,0 +1,11 @@
+-- Client-generated idempotency key for write-behind feedback ingestion
+-- (corefunc/feedback_queue.py). Batches are upserted with
+-- on_conflict=idempotency_key / ignore_duplicates, so a re-sent batch never
+-- stores a submission twice. created_at is sent by the client so it reflects
+-- submission time, not flush time.
+
+alter table feedback
+    add column if not exists idempotency_key uuid;
+
+create unique index if not exists feedback_idempotency_key_key
+    on feedback (idempotency_key);
@@ -0,0 +1,30 @@
+-- Near-duplicate grouping of submissions (corefunc/dedup.py).
+-- simhash: 64-bit SimHash of comment + suggested amendment (stored signed).
+-- duplicate_of: idempotency_key of the canonical submission this one copies;
+-- null for distinct submissions. Every submission is still kept as part of
+-- the permanent record.
+
+alter table feedback
+    add column if not exists simhash bigint,
+    add column if not exists duplicate_of uuid;
+
+create index if not exists feedback_bill_canonical_idx
+    on feedback (bill_id)
+    include (idempotency_key, simhash, stance)
+    where duplicate_of is null;
+
+create index if not exists feedback_duplicate_of_idx
+    on feedback (duplicate_of)
+    where duplicate_of is not null;
+
+-- One row per distinct opinion, with the number of citizens who submitted it.
+create or replace view feedback_duplicate_groups as
+select
+    c.bill_id,
+    c.idempotency_key,
+    c.stance,
+    1 + count(d.idempotency_key) as submissions
+from feedback c
+left join feedback d on d.duplicate_of = c.idempotency_key
+where c.duplicate_of is null
+group by c.bill_id, c.idempotency_key, c.stance;
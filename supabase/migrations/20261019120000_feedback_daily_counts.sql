@@ -0,0 +1,92 @@
+-- Incrementally maintained (bill x stance x county x day) submission counts.
+-- The dashboards read this table instead of pulling every feedback row, so
+-- their cost grows with bills x counties x active days, not with submissions.
+-- Days are Kenyan calendar days; a missing county is stored as ''.
+
+create table if not exists feedback_daily_counts (
+    bill_id bigint not null,
+    stance text not null,
+    county text not null default '',
+    day date not null,
+    submissions bigint not null default 0,
+    updated_at timestamptz not null default now(),
+    primary key (bill_id, stance, county, day)
+);
+
+create index if not exists feedback_daily_counts_day_idx on feedback_daily_counts (day);
+create index if not exists feedback_daily_counts_updated_at_idx on feedback_daily_counts (updated_at);
+
+-- Clients only read the counts; the triggers below are the only writers.
+alter table feedback_daily_counts enable row level security;
+drop policy if exists feedback_daily_counts_read on feedback_daily_counts;
+create policy feedback_daily_counts_read on feedback_daily_counts for select to anon, authenticated using (true);
+revoke all on feedback_daily_counts from anon, authenticated;
+grant select on feedback_daily_counts to anon, authenticated;
+
+-- Statement-level triggers: a batch insert from the write-behind queue
+-- updates each affected rollup row once, not once per feedback row. They run
+-- as the table owner (security definer), so the anonymous role that inserts
+-- feedback needs no write access to the counts.
+create or replace function feedback_daily_counts_add() returns trigger
+language plpgsql security definer set search_path = public as $$
+begin
+    insert into feedback_daily_counts as c (bill_id, stance, county, day, submissions, updated_at)
+    select bill_id, stance, coalesce(county, ''), (created_at at time zone 'Africa/Nairobi')::date, count(*), now()
+    from new_rows
+    where bill_id is not null
+    group by 1, 2, 3, 4
+    on conflict (bill_id, stance, county, day)
+    do update set submissions = c.submissions + excluded.submissions, updated_at = now();
+    return null;
+end;
+$$;
+
+create or replace function feedback_daily_counts_remove() returns trigger
+language plpgsql security definer set search_path = public as $$
+begin
+    update feedback_daily_counts c
+    set submissions = c.submissions - d.n, updated_at = now()
+    from (
+        select bill_id, stance, coalesce(county, '') as county,
+               (created_at at time zone 'Africa/Nairobi')::date as day, count(*) as n
+        from old_rows
+        where bill_id is not null
+        group by 1, 2, 3, 4
+    ) d
+    where c.bill_id = d.bill_id and c.stance = d.stance and c.county = d.county and c.day = d.day;
+    return null;
+end;
+$$;
+
+drop trigger if exists feedback_daily_counts_insert on feedback;
+create trigger feedback_daily_counts_insert
+    after insert on feedback
+    referencing new table as new_rows
+    for each statement execute function feedback_daily_counts_add();
+
+drop trigger if exists feedback_daily_counts_delete on feedback;
+create trigger feedback_daily_counts_delete
+    after delete on feedback
+    referencing old table as old_rows
+    for each statement execute function feedback_daily_counts_remove();
+
+-- Updates are a remove of the old version plus an add of the new one
+drop trigger if exists feedback_daily_counts_update_remove on feedback;
+create trigger feedback_daily_counts_update_remove
+    after update on feedback
+    referencing old table as old_rows
+    for each statement execute function feedback_daily_counts_remove();
+
+drop trigger if exists feedback_daily_counts_update_add on feedback;
+create trigger feedback_daily_counts_update_add
+    after update on feedback
+    referencing new table as new_rows
+    for each statement execute function feedback_daily_counts_add();
+
+-- Backfill from the existing feedback
+insert into feedback_daily_counts (bill_id, stance, county, day, submissions)
+select bill_id, stance, coalesce(county, ''), (created_at at time zone 'Africa/Nairobi')::date, count(*)
+from feedback
+where bill_id is not null
+group by 1, 2, 3, 4
+on conflict (bill_id, stance, county, day) do update set submissions = excluded.submissions, updated_at = now();
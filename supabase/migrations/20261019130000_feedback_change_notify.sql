@@ -0,0 +1,18 @@
+-- Push a notification whenever the dashboard rollup changes, so app servers
+-- LISTENing on `feedback_changes` (corefunc/live_feed.py) can refresh their
+-- shared dashboard data at once, not on a polling timer. Statement-level: a
+-- batch insert from the write-behind queue sends one notification, and
+-- Postgres folds identical notifications within a transaction.
+
+create or replace function feedback_changes_notify() returns trigger
+language plpgsql as $$
+begin
+    perform pg_notify('feedback_changes', json_build_object('table', tg_table_name, 'op', tg_op)::text);
+    return null;
+end;
+$$;
+
+drop trigger if exists feedback_daily_counts_notify on feedback_daily_counts;
+create trigger feedback_daily_counts_notify
+    after insert or update or delete on feedback_daily_counts
+    for each statement execute function feedback_changes_notify();
@@ -0,0 +1,11 @@
+-- Map-step summaries for the synthesis report (llm/synthesis.py), keyed by a
+-- hash of the chunk text and the map prompt version. Regenerating a report
+-- only sends chunks without a stored summary to the LLM.
+
+create table if not exists report_chunk_summaries (
+    bill_id bigint not null references bills (id) on delete cascade,
+    content_hash text not null,
+    summary text not null,
+    created_at timestamptz not null default now(),
+    primary key (bill_id, content_hash)
+);
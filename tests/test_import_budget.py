@@ -0,0 +1,16 @@
+# tests/test_import_budget.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from tools.import_budget import TARGETS, check
+
+
+@pytest.mark.parametrize("target", list(TARGETS))
+def test_cold_import_stays_lazy_and_within_budget(target):
+    result = check(target, runs=2, top=0)
+    assert result["eager"] == [], f"{target} imports {result['eager']} at load; move them to first use"
+    assert result["seconds"] <= result["budget"]
@@ -0,0 +1,42 @@
+# tests/test_moderation.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from corefunc.moderation import ModerationEngine, get_engine
+
+
+@pytest.mark.parametrize("text", [
+    "Like Nigeria did in 2020",
+    "Nigerian traders cross at Busia",
+    "the Niger Delta",
+    "Hon. Shitanda spoke in support",
+    "Shiitake mushrooms are taxed too",
+    "as I said, Scunthorpe and Dickens",
+    "Section 14 of the Act",
+])
+def test_ordinary_words_and_names_pass(text):
+    assert get_engine().find(text) == []
+
+
+@pytest.mark.parametrize("text, term", [
+    ("fuuuuck this bill", "fuck"),
+    ("shiiit", "shit"),
+    ("sh!t", "shit"),
+    ("f u c k", "fuck"),
+    ("niiigger", "nigger"),
+    ("NIGGERS", "nigger"),
+    ("you aaasshole", "asshole"),
+    ("bullshiiit", "bullshit"),
+])
+def test_obfuscated_terms_are_caught(text, term):
+    assert term in get_engine().find(text)
+
+
+def test_collapsing_never_shortens_a_term():
+    engine = ModerationEngine(["ass"])
+    assert engine.find("as we said") == []
+    assert engine.find("what an aaass") == ["ass"]
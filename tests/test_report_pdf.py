@@ -0,0 +1,38 @@
+# tests/test_report_pdf.py
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from corefunc.report_pdf import render_report
+
+
+def _feedback(n):
+    return pd.DataFrame({
+        "id": range(1, n + 1),
+        "stance": ["Support", "Oppose", "Neutral"] * (n // 3) + ["Support"] * (n % 3),
+        "county": ["NAIROBI CITY", None, "KISUMU"] * (n // 3) + ["MOMBASA"] * (n % 3),
+        "comment": [f"Comment {i}: the “fuel levy” hurts boda boda riders — tafadhali punguzeni ushuru" for i in range(n)],
+        "suggested_amendment": [None if i % 2 else "Delete clause 5" for i in range(n)],
+        "created_at": pd.Timestamp("2026-10-01", tz="UTC"),
+    })
+
+
+def test_renders_a_small_report():
+    df = _feedback(200)
+    stats = {"total": 200, "support": 68, "oppose": 66, "neutral": 66}
+    pdf = render_report("The Finance Bill, 2026", stats, "• Riders oppose the levy. • Many ask to delete clause 5.", df,
+                        report_date="19 October 2026")
+    assert pdf.startswith(b"%PDF-")
+
+    fitz = pytest.importorskip("pymupdf")
+    with fitz.open(stream=pdf, filetype="pdf") as doc:
+        text = " ".join(" ".join(page.get_text().split()) for page in doc)  # wrapped lines joined
+        assert doc.page_count >= 3
+    assert "The Finance Bill, 2026" in text
+    assert "tafadhali punguzeni ushuru" in text
+    assert "Comment 199" in text
+    assert "Delete clause 5" in text
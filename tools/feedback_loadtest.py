@@ -0,0 +1,206 @@
+# tools/feedback_loadtest.py
+"""
+Concurrent feedback-submission load test.
+
+Drives N simulated citizen sessions against a local Postgres + PostgREST
+stand-in for Supabase (tools/loadtest/docker-compose.yml). Each session loops
+over a weighted mix of:
+    submit     - components.feedback_form.submit_feedback (moderation, near-duplicate
+                 lookup, write-behind enqueue): the latency a citizen waits for
+    write      - a synchronous single-row insert into `feedback` (the DB write path itself)
+    dashboard  - the dashboard's feedback/bills reads
+
+For each concurrency level it reports throughput, p50/p95/p99 latency and error
+rate per scenario, plus how fast the write-behind queue drained into the DB.
+
+    docker compose -f tools/loadtest/docker-compose.yml up -d
+    SUPABASE_REST_URL=http://localhost:3000 python tools/feedback_loadtest.py \\
+        --levels 1,10,50,100 --duration 20 --json loadtest.json
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.dirname(SCRIPT_DIR))
+
+STANCES = ["Support", "Oppose", "Neutral"]
+COUNTIES = ["NAIROBI CITY", "MOMBASA", "KISUMU", "NAKURU", "KIAMBU", "MACHAKOS", "KAKAMEGA", "TURKANA", ""]
+CAMPAIGN_TEXT = "I strongly oppose the proposed 16% VAT on bread because it will hurt poor families across Kenya"
+TOPICS = ["VAT on bread", "the housing levy", "mobile money charges", "the motor vehicle tax", "county health funding"]
+REASONS = ["hurts small businesses", "raises the cost of living", "improves public services", "needs county approval"]
+
+
+def random_comment():
+    # A share of submissions are pasted campaign copies, as on hot bills
+    if random.random() < 0.3:
+        return CAMPAIGN_TEXT
+    return f"My view on {random.choice(TOPICS)}: it {random.choice(REASONS)}. Ref {uuid.uuid4().hex[:8]}"
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile: the smallest value with at least pct% of the values at or below it."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class Scenarios:
+    def __init__(self, client, bill_id):
+        from components.feedback_form import submit_feedback
+        from corefunc.feedback_data import load_feedback_rollup
+
+        self.client = client
+        self.bill_id = bill_id
+        self._submit_feedback = submit_feedback
+        self._load_feedback_rollup = load_feedback_rollup
+
+    def submit(self):
+        error = self._submit_feedback(
+            self.bill_id, random.choice(STANCES), random_comment(), "", random.choice(COUNTIES),
+            user_id=None, idempotency_key=str(uuid.uuid4()),
+        )
+        if error:
+            raise RuntimeError(f"rejected: {error}")
+
+    def write(self):
+        self.client.table("feedback").insert({
+            "idempotency_key": str(uuid.uuid4()),
+            "bill_id": self.bill_id,
+            "stance": random.choice(STANCES),
+            "comment": random_comment(),
+            "county": random.choice(COUNTIES) or None,
+        }).execute()
+
+    def dashboard(self):
+        # The uncached read behind Home.py and components/dashboard.py
+        self._load_feedback_rollup(self.client)
+
+
+def run_level(scenarios, mix, concurrency, duration, think_time):
+    names, weights = zip(*mix.items())
+    samples = defaultdict(list)  # scenario -> [(latency_s, ok)]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def session():
+        local = defaultdict(list)
+        while time.perf_counter() < deadline:
+            name = random.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                getattr(scenarios, name)()
+                ok = True
+            except Exception:
+                ok = False
+            local[name].append((time.perf_counter() - start, ok))
+            if think_time:
+                time.sleep(random.expovariate(1 / think_time))
+        with lock:
+            for name, values in local.items():
+                samples[name].extend(values)
+
+    threads = [threading.Thread(target=session, daemon=True) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for name, values in samples.items():
+        latencies = sorted(latency for latency, _ in values)
+        errors = sum(1 for _, ok in values if not ok)
+        results[name] = {
+            "requests": len(values),
+            "throughput_rps": len(values) / elapsed,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "error_rate": errors / len(values) if values else 0.0,
+        }
+    return results
+
+
+def drain_queue(timeout):
+    """Waits for the write-behind queue to empty; returns (rows drained, seconds)."""
+    from corefunc.feedback_queue import get_feedback_queue
+
+    queue = get_feedback_queue()
+    pending = queue.pending_count()
+    start = time.perf_counter()
+    while queue.pending_count() and time.perf_counter() - start < timeout:
+        time.sleep(0.05)
+    return pending - queue.pending_count(), time.perf_counter() - start
+
+
+def ensure_bill(client):
+    rows = client.table("bills").select("id").eq("title", "Load Test Bill").execute().data
+    if rows:
+        return rows[0]["id"]
+    return client.table("bills").insert({"title": "Load Test Bill", "status": "Published"}).execute().data[0]["id"]
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("submit", "write", "dashboard"):
+            raise argparse.ArgumentTypeError(f"unknown scenario: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--levels", default="1,5,10,25,50,100", help="comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=15, help="seconds per level")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("submit=6,dashboard=3,write=1"),
+                        help="scenario weights, e.g. submit=6,dashboard=3,write=1")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between actions (s)")
+    parser.add_argument("--drain-timeout", type=float, default=120, help="max seconds to wait for the queue")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    if not os.getenv("SUPABASE_REST_URL"):
+        parser.error("set SUPABASE_REST_URL to the PostgREST stand-in (never load test production)")
+    # Keep the run's write-behind journal apart from the app's
+    os.environ.setdefault("CIVICSENSE_QUEUE_PATH", os.path.join(tempfile.mkdtemp(), "loadtest_queue.sqlite3"))
+
+    from corefunc.db import supabase_client
+
+    scenarios = Scenarios(supabase_client, ensure_bill(supabase_client))
+    report = []
+    header = f"{'conc':>5} {'scenario':<10} {'reqs':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+    print(header)
+    print("-" * len(header))
+    for level in [int(x) for x in args.levels.split(",")]:
+        results = run_level(scenarios, args.mix, level, args.duration, args.think_time)
+        for name, r in sorted(results.items()):
+            print(f"{level:>5} {name:<10} {r['requests']:>7} {r['throughput_rps']:>8.1f} {r['p50_ms']:>8.1f} "
+                  f"{r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['error_rate']:>6.1%}")
+        entry = {"concurrency": level, "scenarios": results}
+        if "submit" in args.mix:
+            drained, seconds = drain_queue(args.drain_timeout)
+            entry["queue_drain"] = {"rows": drained, "seconds": seconds, "rows_per_s": drained / seconds if seconds else None}
+            print(f"{'':>5} queue backlog of {drained} rows drained in {seconds:.1f}s")
+        report.append(entry)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# tools/import_budget.py
+"""
+Import-time budget for the app's pages and the scraper.
+
+For each target, the module-level imports (the import statements outside
+functions, including those in top-level try/if blocks) are run in a fresh
+interpreter with `-X importtime`. That is what a cold start pays before the
+script's first line of real work. The tool prints the wall time and the
+heaviest top-level imports. It exits non-zero when a target is over its
+budget, or when it loads a module that must stay lazy (e.g. gTTS on the
+Bills page), so CI can run it as a regression check.
+
+    python tools/import_budget.py                        # every target
+    python tools/import_budget.py pages/2_Bills.py --top 20
+    python tools/import_budget.py --json import_budget.json
+
+Budgets are generous multiples of the measured times, to absorb slower CI
+machines; the lazy-module checks are exact.
+"""
+import argparse
+import ast
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
+ROOT = os.path.dirname(SCRIPT_DIR)
+
+# target -> (budget in seconds, modules that must not be imported at load).
+# Streamlit itself loads plotly's lightweight core, so it is plotly.express that must stay lazy.
+TARGETS = {
+    "Home.py": (4.0, ["langchain_core", "fpdf", "gtts"]),
+    "pages/2_Bills.py": (3.0, ["gtts", "langchain_core", "langchain_text_splitters", "plotly.express"]),
+    "pages/4_Synthesis_Report.py": (3.0, ["plotly.express", "xhtml2pdf", "fpdf", "langchain_core", "kaleido"]),
+    "scraper/bill_scraper.py": (2.5, ["unstructured", "fitz", "pymupdf"]),
+}
+RUNS = 3
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def module_imports(path) -> list:
+    """The import statements a script runs at load: not those inside functions or classes."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+
+    statements = []
+
+    def visit(body):
+        for node in body:
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                statements.append(node)
+            elif isinstance(node, ast.Try):
+                visit(node.body)
+            elif isinstance(node, (ast.If, ast.With)):
+                visit(node.body)
+                visit(getattr(node, "orelse", []))
+
+    visit(tree.body)
+    return statements
+
+
+def _roots(statements) -> set:
+    roots = set()
+    for node in statements:
+        names = [alias.name for alias in node.names] if isinstance(node, ast.Import) else [node.module or ""]
+        roots.update(name.split(".")[0] for name in names if name)
+    return roots
+
+
+def _snippet(path, statements) -> str:
+    return "\n".join([
+        "import sys, time",
+        f"sys.path[:0] = [{ROOT!r}, {os.path.dirname(path)!r}]",
+        "_started = time.perf_counter()",
+        *(ast.unparse(node) for node in statements),
+        "print(time.perf_counter() - _started)",
+    ])
+
+
+def measure(target, runs=RUNS) -> dict:
+    """Best-of-`runs` cold import time and the per-module import profile of that run."""
+    env = dict(os.environ)
+    # corefunc/db.py builds its client at import; point it at a stand-in so no secrets are needed
+    env.setdefault("SUPABASE_REST_URL", "http://localhost:9")
+    path = os.path.join(ROOT, target)
+    statements = module_imports(path)
+    roots = _roots(statements)
+    best = None
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _snippet(path, statements)],
+                              capture_output=True, text=True, cwd=ROOT, env=env)
+        if proc.returncode:
+            raise RuntimeError(f"{target}: imports failed:\n{proc.stderr[-2000:]}")
+        seconds = float(proc.stdout.strip().splitlines()[-1])
+        if best is None or seconds < best["seconds"]:
+            best = {"seconds": seconds, "importtime": proc.stderr}
+
+    modules, packages = set(), defaultdict(float)
+    for self_us, cumulative_us, indent, name in _IMPORTTIME.findall(best["importtime"]):
+        modules.add(name)
+        # Imported directly by the script, not by another module or interpreter startup
+        if len(indent) == 1 and name.split(".")[0] in roots:
+            packages[name.split(".")[0]] += int(cumulative_us) / 1e6
+    return {"seconds": best["seconds"], "modules": modules, "packages": dict(packages)}
+
+
+def check(target, runs=RUNS, top=8) -> dict:
+    budget, lazy = TARGETS[target]
+    result = measure(target, runs)
+    loaded = sorted(m for m in lazy if any(n == m or n.startswith(m + ".") for n in result["modules"]))
+    over = result["seconds"] > budget
+
+    status = "OVER BUDGET" if over else ("EAGER IMPORTS" if loaded else "ok")
+    print(f"{target:<32} {result['seconds']:6.2f}s / {budget:.1f}s  {status}")
+    for package, seconds in sorted(result["packages"].items(), key=lambda p: -p[1])[:top]:
+        print(f"    {seconds:6.3f}s  {package}")
+    if loaded:
+        print(f"    loaded at import but should be lazy: {', '.join(loaded)}")
+    return {"target": target, "seconds": round(result["seconds"], 3), "budget": budget,
+            "eager": loaded, "packages": {p: round(s, 3) for p, s in result["packages"].items()},
+            "ok": not over and not loaded}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("targets", nargs="*", default=list(TARGETS), help="scripts to check (default: all)")
+    parser.add_argument("--runs", type=int, default=RUNS, help="cold starts per target; the fastest counts")
+    parser.add_argument("--top", type=int, default=8, help="heaviest imports to list per target")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    unknown = [t for t in args.targets if t not in TARGETS]
+    if unknown:
+        parser.error(f"no budget for {', '.join(unknown)}; add it to TARGETS")
+
+    results = [check(target, args.runs, args.top) for target in args.targets]
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0 if all(r["ok"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,25 @@
+-- Tables as the app uses them on Supabase, before supabase/migrations are applied.
+create role anon nologin;
+
+create table bills (
+    id bigint generated by default as identity primary key,
+    title text not null,
+    pdf_url text,
+    pdf_hash text unique,
+    full_text text,
+    status text,
+    published_at timestamptz default now(),
+    summary_en text,
+    summary_sw text
+);
+
+create table feedback (
+    id bigint generated by default as identity primary key,
+    bill_id bigint references bills (id),
+    user_id uuid,
+    stance text not null,
+    comment text,
+    suggested_amendment text,
+    county text,
+    created_at timestamptz not null default now()
+);